@@ -6,47 +6,80 @@ Sets up FastAPI app instance, includes routers, and configures middleware and ev
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from typing import Optional
 import logging
 
-from .routes import expense_routes
-
-# Create the FastAPI app
-app = FastAPI(
-    title="Expense Management API",
-    description="API for managing personal and business expenses.",
-    version="1.0.0"
-)
-
-# CORS middleware setup
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Register routers
-app.include_router(expense_routes.router, prefix="/expenses", tags=["Expenses"])
-
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the Expense Management API"}
-
-# Custom exception handler
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    logging.error(f"Unhandled error: {exc}")
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "An unexpected error occurred."},
+from .routes import expense_routes, async_expense_routes
+from .responses import FastJSONResponse
+from .metrics import MetricsMiddleware, metrics_endpoint
+from app.services.metrics import REGISTRY, instrument_service
+from app.utils.helpers import configure_locale
+from config.settings import Settings, get_settings
+
+
+def create_app(config: Optional[Settings] = None) -> FastAPI:
+    """Build the FastAPI app; settings are read here rather than when the package is imported."""
+    config = config or get_settings()
+
+    # Create the FastAPI app
+    app = FastAPI(
+        title="Expense Management API",
+        description="API for managing personal and business expenses.",
+        version="1.0.0",
+        default_response_class=FastJSONResponse,
     )
 
-# Startup and shutdown events
-@app.on_event("startup")
-async def startup_event():
-    logging.info("Starting Expense Management API...")
+    # CORS middleware setup
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Register routers; the async router loads SQLAlchemy and its engine on its first request
+    app.include_router(expense_routes.router, prefix="/expenses", tags=["Expenses"])
+    app.include_router(async_expense_routes.router, prefix="/async/expenses", tags=["Expenses (async)"])
+
+    # Prometheus metrics: request latency/counts, service operation timings, store and cache figures
+    if config.ENABLE_METRICS:
+        app.add_middleware(MetricsMiddleware, registry=REGISTRY)
+        app.add_api_route("/metrics", metrics_endpoint(REGISTRY), include_in_schema=False)
+
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to the Expense Management API"}
+
+    # Custom exception handler
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request: Request, exc: Exception):
+        logging.error(f"Unhandled error: {exc}")
+        return JSONResponse(
+            status_code=500,
+            content={"detail": "An unexpected error occurred."},
+        )
+
+    # Startup and shutdown events
+    @app.on_event("startup")
+    async def startup_event():
+        logging.info("Starting Expense Management API...")
+        configure_locale()
+        if config.ENABLE_METRICS:
+            instrument_service(expense_routes.get_service(), REGISTRY)
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        logging.info("Shutting down Expense Management API...")
+        expense_routes.close_service()
+        await async_expense_routes.close_service()
+
+    return app
+
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    logging.info("Shutting down Expense Management API...")
+def __getattr__(name):
+    # `api.app` (e.g. `uvicorn api:app`) is built on first access, so importing the package reads no settings
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,71 @@
+"""
+Request instrumentation for the API.
+A plain ASGI middleware records per-route latency, request counts by status
+and in-flight requests; `/metrics` serves them in the Prometheus text format.
+"""
+
+from time import perf_counter
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+from app.services.metrics import REGISTRY, MetricsRegistry
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+# Label for requests no route matched, so unknown paths cannot grow the label set.
+UNMATCHED = "<unmatched>"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.latency = registry.histogram("http_request_duration_seconds", "HTTP request latency",
+                                          ("method", "route"))
+        self.requests = registry.counter("http_requests_total", "HTTP requests served",
+                                         ("method", "route", "status"))
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+        self._routes = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            self.in_flight.dec()
+            method, route = scope["method"], self._route(scope)
+            self.latency.observe(elapsed, method, route)
+            self.requests.inc(method, route, str(status))
+
+    def _route(self, scope) -> str:
+        """Path template of the route that served the request, e.g. "/expenses/{expense_id}"."""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+        route = self._routes.get(endpoint)
+        if route is not None:
+            return route
+        candidates = [r for r in scope["router"].routes if getattr(r, "endpoint", None) is endpoint]
+        for candidate in candidates:
+            if candidate.matches(scope)[0] != Match.NONE:
+                if len(candidates) == 1:
+                    # An endpoint served by a single route always maps to it; cache that.
+                    self._routes[endpoint] = candidate.path
+                return candidate.path
+        return UNMATCHED
+
+
+def metrics_endpoint(registry: MetricsRegistry = REGISTRY):
+    def metrics():
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+    return metrics
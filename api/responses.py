@@ -0,0 +1,15 @@
+"""
+Response classes for the API.
+"""
+
+from fastapi.responses import JSONResponse
+from app.services.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response that passes pre-encoded bytes through and encodes anything else with orjson."""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
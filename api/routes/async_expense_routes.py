@@ -0,0 +1,129 @@
+"""
+Async expense API routes.
+`async def` counterparts of the expense endpoints, served by AsyncExpenseService
+over an async database session so I/O-bound requests do not occupy the threadpool.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional
+from datetime import date
+from ..schemas.expense_schema import ExpenseFilter, ExpenseOut
+from ..responses import FastJSONResponse
+from app.services.async_expense_service import AsyncExpenseService
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
+from app.services.serialization import ExpenseSerializer
+
+router = APIRouter()
+_service: Optional[AsyncExpenseService] = None
+# Rows come fresh from the database on every request, so nothing is memoized.
+_serializer = ExpenseSerializer(cache=False)
+
+async def get_service() -> AsyncExpenseService:
+    global _service
+    if _service is None:
+        # The database module, the async engine and the tables are only set up once these routes are hit.
+        from app.database.db import get_async_engine, init_async_db
+        engine = get_async_engine()
+        await init_async_db(engine)
+        _service = AsyncExpenseService.from_engine(engine)
+    return _service
+
+async def close_service() -> None:
+    """Dispose of the async engine on shutdown, if a request built it; the next request builds a new one."""
+    global _service
+    if _service is not None:
+        from app.database.db import dispose_async_engine
+        _service = None
+        await dispose_async_engine()
+
+async def _page_response(service: AsyncExpenseService, fields: Optional[str], **query) -> FastJSONResponse:
+    try:
+        projection = parse_fields(fields)
+        page = await service.get_page(**query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return FastJSONResponse(_serializer.dumps_many(page.items, projection), headers=headers)
+
+@router.get("/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+async def get_all_expenses(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                           cursor: Optional[str] = None, fields: Optional[str] = None,
+                           service: AsyncExpenseService = Depends(get_service)):
+    return await _page_response(service, fields, limit=limit, cursor=cursor)
+
+@router.get("/{expense_id}", response_model=ExpenseOut, response_class=FastJSONResponse)
+async def get_expense(expense_id: int, service: AsyncExpenseService = Depends(get_service)):
+    expense = await service.get_expense_by_id(expense_id)
+    if expense is None:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    return FastJSONResponse(_serializer.dumps_one(expense))
+
+@router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_expense(expense_id: int, service: AsyncExpenseService = Depends(get_service)):
+    if not await service.delete_expense(expense_id):
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+@router.get("/filter/by-category/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+async def filter_expenses_by_category(category: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                      cursor: Optional[str] = None, fields: Optional[str] = None,
+                                      service: AsyncExpenseService = Depends(get_service)):
+    return await _page_response(service, fields, limit=limit, cursor=cursor, category=category)
+
+@router.get("/filter/by-date/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+async def filter_expenses_by_date_range(start_date: date = Query(...), end_date: date = Query(...),
+                                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                        cursor: Optional[str] = None, fields: Optional[str] = None,
+                                        service: AsyncExpenseService = Depends(get_service)):
+    return await _page_response(service, fields, limit=limit, cursor=cursor,
+                                start_date=start_date, end_date=end_date)
+
+@router.get("/summary/by-category/", response_model=dict)
+async def get_summary_by_category(service: AsyncExpenseService = Depends(get_service)):
+    try:
+        return await service.get_expense_summary_by_category()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats/top-categories/", response_model=List[dict])
+async def get_top_expense_categories(limit: int = 5, service: AsyncExpenseService = Depends(get_service)):
+    try:
+        return await service.get_top_expense_categories(limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats/total/", response_model=dict)
+async def get_total_expense(service: AsyncExpenseService = Depends(get_service)):
+    try:
+        return await service.get_total_expense()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+async def search_expenses(keyword: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                          cursor: Optional[str] = None, fields: Optional[str] = None,
+                          service: AsyncExpenseService = Depends(get_service)):
+    return await _page_response(service, fields, limit=limit, cursor=cursor, keyword=keyword)
+
+@router.get("/query/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+async def query_expenses(filters: ExpenseFilter = Depends(),
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                         cursor: Optional[str] = None, fields: Optional[str] = None,
+                         service: AsyncExpenseService = Depends(get_service)):
+    return await _page_response(service, fields, limit=limit, cursor=cursor, **filters.dict())
+
+@router.get("/stats/daily-average/", response_model=dict)
+async def get_daily_average(start_date: Optional[date] = None, end_date: Optional[date] = None,
+                            service: AsyncExpenseService = Depends(get_service)):
+    try:
+        return await service.get_daily_average(start_date, end_date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats/peak-day/", response_model=dict)
+async def get_peak_expense_day(service: AsyncExpenseService = Depends(get_service)):
+    try:
+        return await service.get_peak_expense_day()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
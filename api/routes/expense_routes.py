@@ -3,109 +3,251 @@ Expense API routes.
 Defines endpoints for managing expenses.
 """
 
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from threading import Lock
 from typing import List, Optional
 from datetime import date
-from ..schemas.expense_schema import ExpenseCreate, ExpenseResponse
-from ...app.services.expense_service import ExpenseService
+from ..schemas.expense_schema import (
+    BatchDelete, BatchPatch, BatchResultOut, DiscountRequest, ExpenseCreate, ExpenseFilter, ExpenseIn,
+    ExpenseOut, ExpenseResponse, RecategorizeRequest,
+)
+from ..responses import FastJSONResponse
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from app.services.cache import create_cache
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
+from app.services.query import ExpenseQuery
+from config.settings import get_settings
 
 router = APIRouter()
-service = ExpenseService()
+# Built on first use, not on import: opening a WAL_DIR replays the log and starts its sync thread.
+_service: Optional[ExpenseService] = None
+_service_lock = Lock()
+
+def create_service() -> ExpenseService:
+    """A service configured from settings, persisted in WAL_DIR when one is set."""
+    settings = get_settings()
+    options = dict(
+        cache=create_cache(settings),
+        duplicate_policy=settings.DUPLICATE_POLICY,
+        duplicate_window=settings.DUPLICATE_WINDOW,
+    )
+    if not settings.WAL_DIR:
+        return ExpenseService(**options)
+    return ExpenseService.open(
+        settings.WAL_DIR,
+        fsync=settings.WAL_FSYNC,
+        sync_interval=settings.WAL_SYNC_INTERVAL,
+        checkpoint_bytes=settings.WAL_CHECKPOINT_BYTES,
+        **options,
+    )
+
+def get_service() -> ExpenseService:
+    global _service
+    # Sync routes run in a threadpool; the lock keeps two first requests from opening the log twice.
+    with _service_lock:
+        if _service is None:
+            _service = create_service()
+        return _service
+
+def close_service() -> None:
+    """Close the service's write-ahead log, if it was opened; the next request builds a new one."""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+            _service = None
+
+def _page_response(service: ExpenseService, fields: Optional[str], **query) -> FastJSONResponse:
+    """Serve one keyset page; the cursor for the next page is sent in X-Next-Cursor."""
+    try:
+        data, next_cursor = service.page_json(parse_fields(fields), **query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return FastJSONResponse(data, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
 @router.post("/", response_model=ExpenseResponse, status_code=status.HTTP_201_CREATED)
-def create_expense(expense: ExpenseCreate):
+def create_expense(expense: ExpenseCreate, service: ExpenseService = Depends(get_service)):
     try:
         return service.create_expense(expense)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/", response_model=List[ExpenseResponse])
-def get_all_expenses():
+# Batch routes are declared before "/{expense_id}" so "batch" is not taken for an id.
+
+@router.post("/batch", response_model=BatchResultOut)
+def create_expenses_batch(items: List[ExpenseIn], service: ExpenseService = Depends(get_service)):
+    """Create many expenses in one operation; each item gets its own result."""
     try:
-        return service.get_all_expenses()
+        return service.create_many([Expense(**item.dict()) for item in items]).as_dict()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{expense_id}", response_model=ExpenseResponse)
-def get_expense(expense_id: int):
+@router.patch("/batch", response_model=BatchResultOut)
+def update_expenses_batch(body: BatchPatch, service: ExpenseService = Depends(get_service)):
+    if (body.items is None) == (body.filter is None) or (body.filter is not None and body.changes is None):
+        raise HTTPException(status_code=400, detail="Provide either items, or filter and changes")
     try:
-        return service.get_expense_by_id(expense_id)
+        if body.items is not None:
+            result = service.update_many([item.dict(exclude_unset=True) for item in body.items])
+        else:
+            query = ExpenseQuery.build(**body.filter.dict())
+            result = service.update_where(query, **body.changes.dict(exclude_unset=True))
+        return result.as_dict()
     except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/batch", response_model=BatchResultOut)
+def delete_expenses_batch(body: BatchDelete, service: ExpenseService = Depends(get_service)):
+    if (body.ids is None) == (body.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or filter")
+    try:
+        if body.ids is not None:
+            return service.delete_many(body.ids).as_dict()
+        return service.delete_where(ExpenseQuery.build(**body.filter.dict())).as_dict()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch/recategorize", response_model=dict)
+def recategorize_expenses(body: RecategorizeRequest, service: ExpenseService = Depends(get_service)):
+    try:
+        return {"updated": service.categorize_all(body.mapping)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch/discount", response_model=dict)
+def discount_category(body: DiscountRequest, service: ExpenseService = Depends(get_service)):
+    try:
+        return {"updated": service.apply_discount_to_category(body.category, body.percent)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+def get_all_expenses(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                     cursor: Optional[str] = None, fields: Optional[str] = None,
+                     service: ExpenseService = Depends(get_service)):
+    return _page_response(service, fields, limit=limit, cursor=cursor)
+
+@router.get("/{expense_id}", response_model=ExpenseOut, response_class=FastJSONResponse)
+def get_expense(expense_id: int, service: ExpenseService = Depends(get_service)):
+    data = service.expense_json(expense_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    return FastJSONResponse(data)
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_expense(expense_id: int):
+def delete_expense(expense_id: int, service: ExpenseService = Depends(get_service)):
     try:
         service.delete_expense(expense_id)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.put("/{expense_id}", response_model=ExpenseResponse)
-def update_expense(expense_id: int, expense: ExpenseCreate):
+def update_expense(expense_id: int, expense: ExpenseCreate, service: ExpenseService = Depends(get_service)):
     try:
         return service.update_expense(expense_id, expense)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/filter/by-category/", response_model=List[ExpenseResponse])
-def filter_expenses_by_category(category: str):
-    try:
-        return service.get_expenses_by_category(category)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/filter/by-category/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+def filter_expenses_by_category(category: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                cursor: Optional[str] = None, fields: Optional[str] = None,
+                                service: ExpenseService = Depends(get_service)):
+    return _page_response(service, fields, limit=limit, cursor=cursor, category=category)
 
-@router.get("/filter/by-date/", response_model=List[ExpenseResponse])
-def filter_expenses_by_date_range(start_date: date = Query(...), end_date: date = Query(...)):
+@router.get("/filter/by-date/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+def filter_expenses_by_date_range(start_date: date = Query(...), end_date: date = Query(...),
+                                  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                  cursor: Optional[str] = None, fields: Optional[str] = None,
+                                  service: ExpenseService = Depends(get_service)):
+    return _page_response(service, fields, limit=limit, cursor=cursor, start_date=start_date, end_date=end_date)
+
+@router.get("/summary/monthly/", response_model=dict)
+def get_monthly_summary(year: int, month: int, user_id: Optional[int] = None,
+                        service: ExpenseService = Depends(get_service)):
     try:
-        return service.get_expenses_by_date_range(start_date, end_date)
+        return service.get_monthly_summary(year, month, user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/summary/monthly/", response_model=dict)
-def get_monthly_summary(year: int, month: int):
+@router.get("/summary/weekly/", response_model=dict)
+def get_weekly_summary(day: date, user_id: Optional[int] = None,
+                       service: ExpenseService = Depends(get_service)):
     try:
-        return service.get_monthly_summary(year, month)
+        return service.get_weekly_summary(day, user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/summary/by-category/", response_model=dict)
-def get_summary_by_category():
+def get_summary_by_category(user_id: Optional[int] = None, service: ExpenseService = Depends(get_service)):
     try:
-        return service.get_expense_summary_by_category()
+        return service.get_expense_summary_by_category(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats/top-categories/", response_model=List[dict])
-def get_top_expense_categories(limit: int = 5):
+def get_top_expense_categories(limit: int = 5, service: ExpenseService = Depends(get_service)):
     try:
         return service.get_top_expense_categories(limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats/total/", response_model=dict)
-def get_total_expense():
+def get_total_expense(service: ExpenseService = Depends(get_service)):
     try:
         return service.get_total_expense()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/search/", response_model=List[ExpenseResponse])
-def search_expenses(keyword: str):
-    try:
-        return service.search_expenses(keyword)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/search/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+def search_expenses(keyword: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    cursor: Optional[str] = None, fields: Optional[str] = None,
+                    service: ExpenseService = Depends(get_service)):
+    return _page_response(service, fields, limit=limit, cursor=cursor, keyword=keyword)
+
+@router.get("/query/", response_model=List[ExpenseOut], response_class=FastJSONResponse)
+def query_expenses(filters: ExpenseFilter = Depends(),
+                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                   cursor: Optional[str] = None, fields: Optional[str] = None,
+                   service: ExpenseService = Depends(get_service)):
+    return _page_response(service, fields, limit=limit, cursor=cursor, **filters.dict())
 
 @router.get("/stats/daily-average/", response_model=dict)
-def get_daily_average(start_date: Optional[date] = None, end_date: Optional[date] = None):
+def get_daily_average(start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      service: ExpenseService = Depends(get_service)):
     try:
         return service.get_daily_average(start_date, end_date)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats/peak-day/", response_model=dict)
-def get_peak_expense_day():
+def get_peak_expense_day(user_id: Optional[int] = None, service: ExpenseService = Depends(get_service)):
     try:
-        return service.get_peak_expense_day()
+        return service.get_peak_expense_day(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats/cache/", response_model=dict)
+def get_cache_stats(service: ExpenseService = Depends(get_service)):
+    if service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **service.cache.stats.as_dict()}
+
+@router.get("/export/csv", response_class=StreamingResponse)
+def export_expenses_csv(filters: ExpenseFilter = Depends(), service: ExpenseService = Depends(get_service)):
+    return StreamingResponse(
+        service.stream_csv(query=ExpenseQuery.build(**filters.dict())),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=expenses.csv"},
+    )
+
+@router.get("/export/json", response_class=StreamingResponse)
+def export_expenses_json(filters: ExpenseFilter = Depends(), service: ExpenseService = Depends(get_service)):
+    return StreamingResponse(
+        service.stream_json(query=ExpenseQuery.build(**filters.dict())),
+        media_type="application/json",
+        headers={"Content-Disposition": "attachment; filename=expenses.json"},
+    )
@@ -4,20 +4,21 @@ Schemas for expense request and response validation.
 
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
-from datetime import date
+from datetime import date, datetime
+import datetime as dt
 
 class ExpenseCreate(BaseModel):
     title: str = Field(..., example="Grocery shopping")
     amount: float = Field(..., gt=0, example=75.50)
     category: str = Field(..., example="Food")
-    date: date = Field(..., example="2024-05-01")
+    date: dt.date = Field(..., example="2024-05-01")  # dt.date: the field name shadows the type
     notes: Optional[str] = Field(None, example="Weekly groceries")
 
 class ExpenseUpdate(BaseModel):
     title: Optional[str] = Field(None, example="Grocery shopping")
     amount: Optional[float] = Field(None, gt=0, example=75.50)
     category: Optional[str] = Field(None, example="Food")
-    date: Optional[date] = Field(None, example="2024-05-01")
+    date: Optional[dt.date] = Field(None, example="2024-05-01")
     notes: Optional[str] = Field(None, example="Weekly groceries")
 
 class ExpenseResponse(ExpenseCreate):
@@ -26,6 +27,14 @@ class ExpenseResponse(ExpenseCreate):
     class Config:
         orm_mode = True
 
+class ExpenseOut(BaseModel):
+    id: int
+    user_id: int
+    amount: float
+    category: str
+    description: str
+    date: datetime
+
 class ExpenseSummaryByCategory(BaseModel):
     category: str
     total_amount: float
@@ -39,7 +48,7 @@ class DailyAverageExpense(BaseModel):
     end_date: Optional[date]
 
 class PeakExpenseDay(BaseModel):
-    date: date
+    date: dt.date
     total_amount: float
 
 class SearchResult(BaseModel):
@@ -52,6 +61,55 @@ class ExpenseFilter(BaseModel):
     max_amount: Optional[float] = None
     start_date: Optional[date] = None
     end_date: Optional[date] = None
+    user_id: Optional[int] = None
+    keyword: Optional[str] = None
+
+class ExpenseIn(BaseModel):
+    id: Optional[int] = None
+    user_id: int
+    amount: float
+    category: str
+    description: str
+    date: datetime
+
+class ExpenseChanges(BaseModel):
+    user_id: Optional[int] = None
+    amount: Optional[float] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    date: Optional[datetime] = None
+
+class ExpensePatch(ExpenseChanges):
+    id: int
+
+class BatchPatch(BaseModel):
+    """Either `items` (per-id changes) or `filter` plus `changes` (the same changes for every match)."""
+    items: Optional[List[ExpensePatch]] = None
+    filter: Optional[ExpenseFilter] = None
+    changes: Optional[ExpenseChanges] = None
+
+class BatchDelete(BaseModel):
+    """Either `ids` or `filter`."""
+    ids: Optional[List[int]] = None
+    filter: Optional[ExpenseFilter] = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResultOut(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[BatchItemResult]
+
+class RecategorizeRequest(BaseModel):
+    mapping: Dict[str, str] = Field(..., example={"food": "Meals"})
+
+class DiscountRequest(BaseModel):
+    category: str
+    percent: float = Field(..., gt=0, lt=100)
 
 class ExportSummary(BaseModel):
     format: str = Field(..., example="csv")
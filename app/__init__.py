@@ -1,12 +1,18 @@
 """
 App package initializer.
 This module sets up the core components of the expense manager application.
+Submodules are imported on first attribute access, so importing one of them
+(or the package) does not pull in SQLAlchemy, settings or the locale.
 """
 
-from .models import expense
-from .services import expense_service
-from .database import db
-from .utils import helpers
+from importlib import import_module
+
+_SUBMODULES = {
+    "expense": ".models.expense",
+    "expense_service": ".services.expense_service",
+    "db": ".database.db",
+    "helpers": ".utils.helpers",
+}
 
 __all__ = [
     "expense",
@@ -14,3 +20,15 @@ __all__ = [
     "db",
     "helpers",
 ]
+
+
+def __getattr__(name):
+    if name not in _SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = import_module(_SUBMODULES[name], __name__)
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,143 @@
+"""
+Async SQLAlchemy-backed expense repository.
+Async counterpart of SqlExpenseStore for the async request path.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from app.models.expense import Expense
+from app.models.expense_record import ExpenseRecord
+from app.database.repository import (
+    amount_by_category_statement,
+    between_statement,
+    category_condition,
+    count_statement,
+    date_bounds_statement,
+    filter_conditions,
+    page_statement,
+    peak_day_statement,
+    recent_statement,
+    search_conditions,
+    select_expenses,
+    summary_statement,
+    top_categories_statement,
+    total_statement,
+)
+
+
+class AsyncSqlExpenseStore:
+    """Store operations over the `expenses` table using an AsyncSession per call."""
+
+    def __init__(self, engine: AsyncEngine, session_factory: Optional[async_sessionmaker] = None):
+        self.engine = engine
+        self.session_factory = session_factory or async_sessionmaker(engine, expire_on_commit=False)
+
+    async def count(self) -> int:
+        async with self.session_factory() as session:
+            return await session.scalar(count_statement())
+
+    async def add_many(self, expenses: List[Expense]) -> List[Expense]:
+        if not expenses:
+            return expenses
+        records = [ExpenseRecord.from_expense(e) for e in expenses]
+        try:
+            async with self.session_factory() as session, session.begin():
+                session.add_all(records)
+                await session.flush()
+        except IntegrityError as e:
+            raise ValueError("Batch contains duplicate or existing expense ids") from e
+        for expense, record in zip(expenses, records):
+            expense.id = record.id
+        return expenses
+
+    async def add(self, expense: Expense) -> Expense:
+        return (await self.add_many([expense]))[0]
+
+    async def get(self, expense_id: int) -> Optional[Expense]:
+        async with self.session_factory() as session:
+            record = await session.get(ExpenseRecord, expense_id)
+            return None if record is None else record.to_expense()
+
+    async def remove(self, expense_id: int) -> Optional[Expense]:
+        async with self.session_factory() as session, session.begin():
+            record = await session.get(ExpenseRecord, expense_id)
+            if record is None:
+                return None
+            expense = record.to_expense()
+            await session.delete(record)
+        return expense
+
+    async def update(self, expense_id: int, **updates) -> Optional[Expense]:
+        updates.pop("id", None)
+        async with self.session_factory() as session, session.begin():
+            record = await session.get(ExpenseRecord, expense_id, with_for_update=True)
+            if record is None:
+                return None
+            expense = record.to_expense()
+            expense.update(**updates)
+            for column, value in ExpenseRecord.values_from(expense).items():
+                setattr(record, column, value)
+        return expense
+
+    async def all(self) -> List[Expense]:
+        return await self._fetch(select_expenses())
+
+    async def by_user(self, user_id: int) -> List[Expense]:
+        return await self._fetch(select_expenses(ExpenseRecord.user_id == user_id))
+
+    async def by_category(self, category: str) -> List[Expense]:
+        return await self._fetch(select_expenses(category_condition(category)))
+
+    async def between(self, start: datetime, end: datetime) -> List[Expense]:
+        return await self._fetch(between_statement(start, end))
+
+    async def recent(self, limit: int) -> List[Expense]:
+        return [] if limit <= 0 else await self._fetch(recent_statement(limit))
+
+    async def summary(self, start: datetime, end: datetime,
+                      user_id: Optional[int] = None) -> List[Tuple[str, float, int, float, float]]:
+        """(category, sum, count, min, max) rows for start <= date <= end."""
+        conditions = filter_conditions(start=start, end=end, user_id=user_id)
+        async with self.session_factory() as session:
+            rows = await session.execute(summary_statement(*conditions))
+            return [(category, float(total), count, float(low), float(high))
+                    for category, total, count, low, high in rows]
+
+    async def search(self, terms: List[str], limit: Optional[int] = None) -> List[Expense]:
+        return await self._fetch(select_expenses(*search_conditions(terms), limit=limit))
+
+    async def page(self, limit: int, after: Optional[Tuple[datetime, int]] = None,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   conditions=()) -> List[Expense]:
+        conditions = [*conditions, *filter_conditions(start=start, end=end)]
+        return await self._fetch(page_statement(limit, after, conditions))
+
+    async def date_bounds(self) -> Optional[Tuple[datetime, datetime]]:
+        async with self.session_factory() as session:
+            first, last = (await session.execute(date_bounds_statement())).one()
+        return None if first is None else (first, last)
+
+    async def total_amount(self) -> float:
+        async with self.session_factory() as session:
+            return float(await session.scalar(total_statement()))
+
+    async def amount_by_category(self) -> Dict[str, float]:
+        async with self.session_factory() as session:
+            rows = await session.execute(amount_by_category_statement())
+            return {category: float(total) for category, total in rows}
+
+    async def top_categories(self, limit: int) -> List[Tuple[str, float]]:
+        async with self.session_factory() as session:
+            rows = await session.execute(top_categories_statement(limit))
+            return [(category, float(total)) for category, total in rows]
+
+    async def peak_day(self) -> Optional[Tuple[date, float]]:
+        async with self.session_factory() as session:
+            row = (await session.execute(peak_day_statement())).first()
+        return None if row is None else (row.day, float(row.total))
+
+    async def _fetch(self, statement) -> List[Expense]:
+        async with self.session_factory() as session:
+            return [record.to_expense() for record in await session.scalars(statement)]
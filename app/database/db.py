@@ -4,52 +4,178 @@ Includes utility functions for database initialization, teardown, and session ha
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.exc import SQLAlchemyError
-import os
+from typing import TYPE_CHECKING, Optional
 import logging
 
-# تنظیمات اتصال پایگاه‌داده از محیط
-DB_USER = os.getenv("DB_USER", "root")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "3306")
-DB_NAME = os.getenv("DB_NAME", "expense_db")
+from config.settings import Settings, get_settings
 
-DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+
+def build_database_url(config: Optional[Settings] = None) -> str:
+    """ساخت آدرس اتصال پایگاه‌داده از تنظیمات (DATABASE_URL در صورت وجود اولویت دارد)."""
+    config = config or get_settings()
+    if config.DATABASE_URL:
+        return config.DATABASE_URL
+    return (
+        f"mysql+mysqlconnector://{config.DB_USER}:{config.DB_PASSWORD}"
+        f"@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+    )
+
+
+# درایورهای async متناظر با هر پایگاه‌داده
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """تبدیل آدرس اتصال sync به آدرس معادل با درایور async."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _engine_options(url: str, config: Settings, overrides: dict) -> dict:
+    options = {
+        "echo": config.DB_ECHO,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if make_url(url).database in (None, "", ":memory:"):
+            # پایگاه‌داده حافظه‌ای باید یک اتصال مشترک داشته باشد
+            options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_TIMEOUT,
+        )
+    options.update(overrides)
+    return options
+
+
+def create_db_engine(url: Optional[str] = None, config: Optional[Settings] = None, **overrides) -> Engine:
+    """ساخت Engine با تنظیمات Pool از Settings؛ برای SQLite تنظیمات مناسب آن اعمال می‌شود."""
+    config = config or get_settings()
+    url = url or build_database_url(config)
+    return create_engine(url, **_engine_options(url, config, overrides))
+
+
+def create_async_db_engine(url: Optional[str] = None, config: Optional[Settings] = None,
+                           **overrides) -> "AsyncEngine":
+    """ساخت AsyncEngine با همان تنظیمات Pool برای مسیرهای async."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    config = config or get_settings()
+    url = to_async_url(url or build_database_url(config))
+    return create_async_engine(url, **_engine_options(url, config, overrides))
 
-# ساخت Engine و Session
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
 # پایه مدل‌ها
 Base = declarative_base()
 
-def init_db():
+# Engine و Session در اولین استفاده ساخته می‌شوند تا import این ماژول به تنظیمات و درایور پایگاه‌داده دست نزند
+_engine: Optional[Engine] = None
+_session_factory: Optional[scoped_session] = None
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine()
+    return _engine
+
+
+def get_sessionmaker() -> scoped_session:
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=get_engine()))
+    return _session_factory
+
+
+def __getattr__(name):
+    # سازگاری با نام‌های قبلی ماژول (engine، SessionLocal و DATABASE_URL)
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    if name == "DATABASE_URL":
+        return build_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def init_db(bind: Optional[Engine] = None):
     """ایجاد جداول در پایگاه‌داده در صورت عدم وجود."""
-    import app.models.expense  # بارگذاری مدل‌ها
+    import app.models.expense_record  # بارگذاری مدل‌ها
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=bind or get_engine())
         logging.info("Database initialized successfully.")
     except SQLAlchemyError as e:
         logging.error(f"Database initialization failed: {e}")
 
 
-def drop_db():
+async def init_async_db(bind: Optional["AsyncEngine"] = None):
+    """ایجاد جداول از طریق AsyncEngine (برای راه‌اندازی مسیرهای async)."""
+    import app.models.expense_record  # بارگذاری مدل‌ها
+    async with (bind or get_async_engine()).begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def drop_db(bind: Optional[Engine] = None):
     """حذف تمام جداول پایگاه‌داده (با احتیاط استفاده شود)."""
-    import app.models.expense
+    import app.models.expense_record
     try:
-        Base.metadata.drop_all(bind=engine)
+        Base.metadata.drop_all(bind=bind or get_engine())
         logging.warning("Database dropped successfully.")
     except SQLAlchemyError as e:
         logging.error(f"Database drop failed: {e}")
 
 
+_async_engine: Optional["AsyncEngine"] = None
+_async_session_factory: Optional["async_sessionmaker"] = None
+
+
+def get_async_engine() -> "AsyncEngine":
+    """AsyncEngine در اولین استفاده ساخته می‌شود تا درایور async فقط در صورت نیاز بارگذاری شود."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+
+def get_async_sessionmaker() -> "async_sessionmaker":
+    global _async_session_factory
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_session_factory
+
+
+async def dispose_async_engine() -> None:
+    """بستن AsyncEngine (اگر ساخته شده باشد) هنگام خاموش شدن برنامه."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        engine, _async_engine, _async_session_factory = _async_engine, None, None
+        await engine.dispose()
+
+
+async def get_async_db():
+    """دریافت یک AsyncSession برای استفاده در مسیرهای async (معادل get_db)."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
 def get_db():
     """دریافت یک سشن از پایگاه‌داده برای استفاده در توابع.
     استفاده همراه با dependency injection یا context manager توصیه می‌شود.
     """
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
@@ -0,0 +1,408 @@
+"""
+SQLAlchemy-backed expense repository.
+Implements the ExpenseStore interface on top of the `expenses` table so that
+ExpenseService can persist through the database engine.
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import Date, and_, delete, func, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from app.models.expense import Expense
+from app.models.expense_record import ExpenseRecord
+from app.utils.helpers import normalize_text, tokenize_text
+
+# Upper bound for ids bound into a single IN (...) clause.
+IN_CLAUSE_CHUNK = 500
+STREAM_BATCH_SIZE = 1000
+
+
+# Statement builders shared by the sync and async stores.
+
+def select_expenses(*conditions, order_by=(ExpenseRecord.id,), limit: Optional[int] = None):
+    statement = select(ExpenseRecord).where(*conditions).order_by(*order_by)
+    return statement if limit is None else statement.limit(limit)
+
+
+def between_statement(start: datetime, end: datetime):
+    return select_expenses(ExpenseRecord.date >= start, ExpenseRecord.date <= end,
+                           order_by=(ExpenseRecord.date, ExpenseRecord.id))
+
+
+def recent_statement(limit: int):
+    return select_expenses(order_by=(ExpenseRecord.date.desc(), ExpenseRecord.id.desc()), limit=limit)
+
+
+def category_condition(category: str):
+    return ExpenseRecord.category_key == normalize_text(category)
+
+
+def day_conditions(day: date):
+    day = day.date() if isinstance(day, datetime) else day
+    return (ExpenseRecord.date >= datetime.combine(day, time.min),
+            ExpenseRecord.date <= datetime.combine(day, time.max))
+
+
+def search_conditions(terms: List[str]):
+    """Every term must occur in the description or the category (case insensitive)."""
+    return [
+        func.lower(ExpenseRecord.description).contains(term, autoescape=True) |
+        ExpenseRecord.category_key.contains(term, autoescape=True)
+        for term in terms
+    ]
+
+
+def filter_conditions(category: Optional[str] = None, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, terms: Optional[List[str]] = None,
+                      min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                      user_id: Optional[int] = None) -> list:
+    conditions = search_conditions(terms) if terms else []
+    if category is not None:
+        conditions.append(category_condition(category))
+    if user_id is not None:
+        conditions.append(ExpenseRecord.user_id == user_id)
+    if min_amount is not None:
+        conditions.append(ExpenseRecord.amount >= min_amount)
+    if max_amount is not None:
+        conditions.append(ExpenseRecord.amount <= max_amount)
+    if start is not None:
+        conditions.append(ExpenseRecord.date >= start)
+    if end is not None:
+        conditions.append(ExpenseRecord.date <= end)
+    return conditions
+
+
+def query_conditions(query) -> Optional[list]:
+    """
+    WHERE conditions for an ExpenseQuery, so the whole filter runs as one
+    statement; None when the keyword has no searchable terms (no rows match).
+    """
+    terms = None
+    if query.keyword is not None:
+        terms = tokenize_text(query.keyword)
+        if not terms:
+            return None
+    return filter_conditions(query.category, query.start, query.end, terms,
+                             query.min_amount, query.max_amount, query.user_id)
+
+
+def page_statement(limit: int, after: Optional[Tuple[datetime, int]] = None, conditions=()):
+    """Keyset page in (date, id) order; the (date, id) index serves it without an offset scan."""
+    if after is not None:
+        after_date, after_id = after
+        conditions = [*conditions, or_(
+            ExpenseRecord.date > after_date,
+            and_(ExpenseRecord.date == after_date, ExpenseRecord.id > after_id),
+        )]
+    return select_expenses(*conditions, order_by=(ExpenseRecord.date, ExpenseRecord.id), limit=limit)
+
+
+def count_statement():
+    return select(func.count(ExpenseRecord.id))
+
+
+def total_statement():
+    return select(func.coalesce(func.sum(ExpenseRecord.amount), 0.0))
+
+
+def date_bounds_statement():
+    return select(func.min(ExpenseRecord.date), func.max(ExpenseRecord.date))
+
+
+def amount_by_category_statement():
+    return select(ExpenseRecord.category, func.sum(ExpenseRecord.amount)).group_by(ExpenseRecord.category)
+
+
+def top_categories_statement(limit: int):
+    total = func.sum(ExpenseRecord.amount).label("total")
+    return (
+        select(ExpenseRecord.category, total)
+        .group_by(ExpenseRecord.category)
+        .order_by(total.desc(), ExpenseRecord.category)
+        .limit(max(limit, 0))
+    )
+
+
+def peak_day_statement(*conditions):
+    day = func.date(ExpenseRecord.date, type_=Date).label("day")
+    total = func.sum(ExpenseRecord.amount).label("total")
+    return select(day, total).where(*conditions).group_by(day).order_by(total.desc(), day).limit(1)
+
+
+def daily_totals_statement(*conditions):
+    day = func.date(ExpenseRecord.date, type_=Date).label("day")
+    return select(day, func.sum(ExpenseRecord.amount)).where(*conditions).group_by(day).order_by(day)
+
+
+def summary_statement(*conditions):
+    """Per-category sum, count, min and max; the overall figures are folded from these rows."""
+    return (
+        select(
+            ExpenseRecord.category,
+            func.sum(ExpenseRecord.amount),
+            func.count(),
+            func.min(ExpenseRecord.amount),
+            func.max(ExpenseRecord.amount),
+        )
+        .where(*conditions)
+        .group_by(ExpenseRecord.category)
+    )
+
+
+class SqlExpenseStore:
+    """
+    Store interface over the `expenses` table.
+
+    Every call runs in its own short transaction from `session_factory`;
+    bulk inserts and updates are issued as a single executemany statement.
+    """
+
+    def __init__(self, engine: Engine, session_factory: Optional[Callable[[], Session]] = None):
+        self.engine = engine
+        self.session_factory = session_factory or sessionmaker(bind=engine, expire_on_commit=False)
+
+    def __len__(self) -> int:
+        with self.session_factory() as session:
+            return session.scalar(count_statement())
+
+    def __iter__(self) -> Iterator[Expense]:
+        with self.session_factory() as session:
+            result = session.scalars(
+                select(ExpenseRecord).order_by(ExpenseRecord.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            for record in result:
+                yield record.to_expense()
+
+    def __contains__(self, expense_id: int) -> bool:
+        with self.session_factory() as session:
+            return session.get(ExpenseRecord, expense_id) is not None
+
+    def add(self, expense: Expense) -> Expense:
+        return self.add_many([expense])[0]
+
+    def add_many(self, expenses: List[Expense]) -> List[Expense]:
+        """Insert a batch in one transaction; raises ValueError on id conflicts."""
+        if not expenses:
+            return expenses
+        records = [ExpenseRecord.from_expense(e) for e in expenses]
+        try:
+            with self.session_factory() as session, session.begin():
+                session.add_all(records)
+                session.flush()
+        except IntegrityError as e:
+            raise ValueError("Batch contains duplicate or existing expense ids") from e
+        for expense, record in zip(expenses, records):
+            expense.id = record.id
+        return expenses
+
+    def get(self, expense_id: int) -> Optional[Expense]:
+        with self.session_factory() as session:
+            record = session.get(ExpenseRecord, expense_id)
+            return None if record is None else record.to_expense()
+
+    def ids(self) -> List[int]:
+        with self.session_factory() as session:
+            return list(session.scalars(select(ExpenseRecord.id).order_by(ExpenseRecord.id)))
+
+    def get_many(self, ids: Iterable[int]) -> List[Expense]:
+        ids = list(ids)
+        found: Dict[int, Expense] = {}
+        with self.session_factory() as session:
+            for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+                chunk = ids[start:start + IN_CLAUSE_CHUNK]
+                for record in session.scalars(select(ExpenseRecord).where(ExpenseRecord.id.in_(chunk))):
+                    found[record.id] = record.to_expense()
+        return [found[i] for i in ids if i in found]
+
+    def remove(self, expense_id: int) -> Optional[Expense]:
+        with self.session_factory() as session, session.begin():
+            record = session.get(ExpenseRecord, expense_id)
+            if record is None:
+                return None
+            expense = record.to_expense()
+            session.delete(record)
+        return expense
+
+    def update(self, expense_id: int, **updates) -> Optional[Expense]:
+        updates.pop("id", None)
+        return self.mutate(expense_id, lambda e: e.update(**updates))
+
+    def mutate(self, expense_id: int, func) -> Optional[Expense]:
+        """Load, modify and write back one expense inside a single transaction."""
+        with self.session_factory() as session, session.begin():
+            record = session.get(ExpenseRecord, expense_id, with_for_update=True)
+            if record is None:
+                return None
+            expense = record.to_expense()
+            func(expense)
+            for column, value in ExpenseRecord.values_from(expense).items():
+                setattr(record, column, value)
+        return expense
+
+    def update_many(self, expenses: List[Expense]) -> None:
+        """Write back a batch of modified expenses with one bulk UPDATE by primary key."""
+        if not expenses:
+            return
+        rows = [dict(ExpenseRecord.values_from(e), id=e.id) for e in expenses]
+        with self.session_factory() as session, session.begin():
+            session.execute(update(ExpenseRecord), rows)
+
+    def mutate_many(self, ids: Iterable[int], func) -> List[Tuple[Expense, Expense]]:
+        """`mutate` every known id inside one transaction; returns (before, after) pairs."""
+        ids = list(ids)
+        changed = []
+        with self.session_factory() as session, session.begin():
+            for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+                chunk = ids[start:start + IN_CLAUSE_CHUNK]
+                statement = select(ExpenseRecord).where(ExpenseRecord.id.in_(chunk)).with_for_update()
+                for record in session.scalars(statement):
+                    before, after = record.to_expense(), record.to_expense()
+                    func(after)
+                    for column, value in ExpenseRecord.values_from(after).items():
+                        setattr(record, column, value)
+                    changed.append((before, after))
+        return changed
+
+    def remove_many(self, ids: Iterable[int]) -> List[Expense]:
+        """Delete the known ids inside one transaction and return the removed expenses."""
+        ids = list(ids)
+        removed = []
+        with self.session_factory() as session, session.begin():
+            for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+                chunk = ids[start:start + IN_CLAUSE_CHUNK]
+                records = session.scalars(select(ExpenseRecord).where(ExpenseRecord.id.in_(chunk)))
+                removed.extend(record.to_expense() for record in records)
+                session.execute(delete(ExpenseRecord).where(ExpenseRecord.id.in_(chunk)))
+        return removed
+
+    def ids_for_user(self, user_id: int) -> List[int]:
+        return self._ids_where(ExpenseRecord.user_id == user_id)
+
+    def ids_for_category(self, category: str) -> List[int]:
+        return self._ids_where(category_condition(category))
+
+    def ids_for_day(self, day: date) -> List[int]:
+        return self._ids_where(*day_conditions(day))
+
+    def by_user(self, user_id: int) -> List[Expense]:
+        return self._select(ExpenseRecord.user_id == user_id)
+
+    def by_category(self, category: str) -> List[Expense]:
+        return self._select(category_condition(category))
+
+    def by_day(self, day: date) -> List[Expense]:
+        return self._select(*day_conditions(day))
+
+    def categories(self) -> List[str]:
+        with self.session_factory() as session:
+            return list(session.scalars(select(ExpenseRecord.category_key).distinct()))
+
+    def between(self, start: datetime, end: datetime) -> List[Expense]:
+        """Expenses dated within [start, end], oldest first."""
+        return self._fetch(between_statement(start, end))
+
+    def recent(self, limit: int) -> List[Expense]:
+        """The `limit` most recent expenses, newest first."""
+        if limit <= 0:
+            return []
+        return self._fetch(recent_statement(limit))
+
+    def page(self, limit: int, after: Optional[Tuple[datetime, int]] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None,
+             conditions=()) -> List[Expense]:
+        """Up to `limit` expenses in (date, id) order after the keyset `after`."""
+        conditions = [*conditions, *filter_conditions(start=start, end=end)]
+        return self._fetch(page_statement(limit, after, conditions))
+
+    def similar(self, expenses: List[Expense], window: timedelta) -> List[Expense]:
+        """
+        Stored expenses that could duplicate one of `expenses`: same user and
+        category, dated within `window` of it. Candidates are over-fetched per
+        chunk of IN_CLAUSE_CHUNK date-ordered expenses (one query each); amounts
+        and descriptions are compared by the caller.
+        """
+        expenses = sorted(expenses, key=lambda e: e.date)
+        found: Dict[int, Expense] = {}
+        with self.session_factory() as session:
+            for start in range(0, len(expenses), IN_CLAUSE_CHUNK):
+                chunk = expenses[start:start + IN_CLAUSE_CHUNK]
+                statement = select(ExpenseRecord).where(
+                    ExpenseRecord.user_id.in_({e.user_id for e in chunk}),
+                    ExpenseRecord.category_key.in_({normalize_text(e.category) for e in chunk}),
+                    ExpenseRecord.date >= chunk[0].date - window,
+                    ExpenseRecord.date <= chunk[-1].date + window,
+                )
+                for record in session.scalars(statement):
+                    found[record.id] = record.to_expense()
+        return list(found.values())
+
+    def existing_ids(self, ids: Iterable[int]) -> Set[int]:
+        """The subset of `ids` already stored, in one IN (...) query per IN_CLAUSE_CHUNK ids."""
+        ids = list(dict.fromkeys(ids))
+        found: Set[int] = set()
+        with self.session_factory() as session:
+            for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+                chunk = ids[start:start + IN_CLAUSE_CHUNK]
+                found.update(session.scalars(select(ExpenseRecord.id).where(ExpenseRecord.id.in_(chunk))))
+        return found
+
+    def date_bounds(self) -> Optional[Tuple[datetime, datetime]]:
+        with self.session_factory() as session:
+            first, last = session.execute(date_bounds_statement()).one()
+        return None if first is None else (first, last)
+
+    def total_amount(self) -> float:
+        with self.session_factory() as session:
+            return float(session.scalar(total_statement()))
+
+    def amount_by_category(self) -> Dict[str, float]:
+        with self.session_factory() as session:
+            rows = session.execute(amount_by_category_statement())
+            return {category: float(total) for category, total in rows}
+
+    def top_categories(self, limit: int) -> List[Tuple[str, float]]:
+        with self.session_factory() as session:
+            rows = session.execute(top_categories_statement(limit))
+            return [(category, float(amount)) for category, amount in rows]
+
+    def peak_day(self, user_id: Optional[int] = None) -> Optional[Tuple[date, float]]:
+        conditions = () if user_id is None else (ExpenseRecord.user_id == user_id,)
+        with self.session_factory() as session:
+            row = session.execute(peak_day_statement(*conditions)).first()
+        return None if row is None else (row.day, float(row.total))
+
+    def daily_totals(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     user_id: Optional[int] = None) -> Dict[date, float]:
+        conditions = filter_conditions(start=start, end=end, user_id=user_id)
+        with self.session_factory() as session:
+            return {day: float(total) for day, total in session.execute(daily_totals_statement(*conditions))}
+
+    def summary(self, start: datetime, end: datetime,
+                user_id: Optional[int] = None) -> List[Tuple[str, float, int, float, float]]:
+        """(category, sum, count, min, max) rows for start <= date <= end."""
+        conditions = filter_conditions(start=start, end=end, user_id=user_id)
+        with self.session_factory() as session:
+            rows = session.execute(summary_statement(*conditions))
+            return [(category, float(total), count, float(low), float(high))
+                    for category, total, count, low, high in rows]
+
+    def search(self, terms: List[str], limit: Optional[int] = None) -> List[Expense]:
+        """Expenses whose description or category contains every term (case insensitive)."""
+        return self._fetch(select_expenses(*search_conditions(terms), limit=limit))
+
+    def clear(self) -> None:
+        with self.session_factory() as session, session.begin():
+            session.execute(delete(ExpenseRecord))
+
+    def _ids_where(self, *conditions) -> List[int]:
+        with self.session_factory() as session:
+            return list(session.scalars(select(ExpenseRecord.id).where(*conditions).order_by(ExpenseRecord.id)))
+
+    def _select(self, *conditions) -> List[Expense]:
+        return self._fetch(select_expenses(*conditions))
+
+    def _fetch(self, statement) -> List[Expense]:
+        with self.session_factory() as session:
+            return [record.to_expense() for record in session.scalars(statement)]
@@ -4,17 +4,37 @@ Defines the structure of an expense record for the system.
 """
 
 from datetime import datetime
-from dataclasses import dataclass, field
-from typing import Optional, List
+from dataclasses import dataclass, fields
+from typing import Iterable, Optional, List
+import sys
+from app.utils.helpers import format_dates, format_rows, parse_dates
 
-@dataclass
+def intern_category(category: str) -> str:
+    """Shared copy of a category name, so millions of expenses hold one string per category."""
+    return sys.intern(category) if type(category) is str else category
+
+@dataclass(init=False)
 class Expense:
+    # Slotted: no per-instance __dict__. `__slots__` is written out (rather than dataclass(slots=True),
+    # Python 3.10+) and so is `__init__`, since a field default would clash with its slot.
+    # Categories are interned on construction, update and categorize.
+    __slots__ = ("id", "user_id", "amount", "category", "description", "date")
+
     id: Optional[int]
     user_id: int
     amount: float
     category: str
     description: str
-    date: datetime = field(default_factory=datetime.now)
+    date: datetime
+
+    def __init__(self, id: Optional[int], user_id: int, amount: float, category: str, description: str,
+                 date: Optional[datetime] = None) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.amount = amount
+        self.category = intern_category(category)
+        self.description = description
+        self.date = datetime.now() if date is None else date
 
     def to_dict(self) -> dict:
         return {
@@ -28,28 +48,50 @@ class Expense:
 
     @staticmethod
     def from_dict(data: dict) -> "Expense":
-        return Expense(
-            id=data.get("id"),
-            user_id=data["user_id"],
-            amount=data["amount"],
-            category=data["category"],
-            description=data["description"],
-            date=datetime.fromisoformat(data["date"])
-        )
+        return Expense.from_dicts((data,))[0]
+
+    @staticmethod
+    def from_dicts(records: Iterable[dict]) -> List["Expense"]:
+        """Build expenses from `to_dict` output, parsing the date column in one batch."""
+        records = list(records)
+        dates = parse_dates([data["date"] for data in records])
+        return [
+            Expense(
+                id=data.get("id"),
+                user_id=data["user_id"],
+                amount=data["amount"],
+                category=data["category"],
+                description=data["description"],
+                date=day,
+            )
+            for data, day in zip(records, dates)
+        ]
 
     def is_valid(self) -> bool:
         """Check if the expense contains valid data."""
         return self.amount > 0 and bool(self.category.strip()) and bool(self.description.strip())
 
     def update(self, **kwargs) -> None:
-        """Update expense fields dynamically."""
+        """Update expense fields dynamically; unknown names are ignored."""
         for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
+            if key in _FIELD_NAMES:
+                setattr(self, key, intern_category(value) if key == "category" else value)
 
     def summary(self) -> str:
         """Generate a brief summary string of the expense."""
-        return f"{self.date.date()} - {self.category}: ${self.amount:.2f} ({self.description})"
+        return Expense.summaries((self,))[0]
+
+    @staticmethod
+    def summaries(expenses: Iterable["Expense"]) -> List[str]:
+        """`summary()` for many expenses, formatting each column at once."""
+        expenses = list(expenses)
+        return format_rows(
+            "{} - {}: ${:.2f} ({})",
+            format_dates([e.date for e in expenses], "%Y-%m-%d"),
+            [e.category for e in expenses],
+            [e.amount for e in expenses],
+            [e.description for e in expenses],
+        )
 
     def matches_category(self, target_category: str) -> bool:
         """Check if the expense belongs to a given category (case insensitive)."""
@@ -61,7 +103,20 @@ class Expense:
 
     def formatted(self, currency_symbol: str = "$") -> str:
         """Return a formatted string of the expense for display."""
-        return f"{self.date.strftime('%Y-%m-%d')} | {self.category:<15} | {currency_symbol}{self.amount:>8.2f} | {self.description}"
+        return Expense.formatted_all((self,), currency_symbol)[0]
+
+    @staticmethod
+    def formatted_all(expenses: Iterable["Expense"], currency_symbol: str = "$") -> List[str]:
+        """`formatted()` for many expenses, e.g. a report's lines."""
+        expenses = list(expenses)
+        symbol = currency_symbol.replace("{", "{{").replace("}", "}}")
+        return format_rows(
+            f"{{}} | {{:<15}} | {symbol}{{:>8.2f}} | {{}}",
+            format_dates([e.date for e in expenses], "%Y-%m-%d"),
+            [e.category for e in expenses],
+            [e.amount for e in expenses],
+            [e.description for e in expenses],
+        )
 
     def clone(self, new_id: Optional[int] = None) -> "Expense":
         """Create a copy of the expense, optionally with a new ID."""
@@ -83,7 +138,7 @@ class Expense:
         """Reassign the category based on a mapping if matched."""
         key = self.category.lower()
         if key in category_mapping:
-            self.category = category_mapping[key]
+            self.category = intern_category(category_mapping[key])
 
     def __eq__(self, other: object) -> bool:
         """Check if two expenses are equal (excluding ID)."""
@@ -108,3 +163,6 @@ class Expense:
     @staticmethod
     def filter_by_date_range(expenses: List["Expense"], start: datetime, end: datetime) -> List["Expense"]:
         return [e for e in expenses if e.is_within_date_range(start, end)]
+
+
+_FIELD_NAMES = frozenset(f.name for f in fields(Expense))
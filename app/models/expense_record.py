@@ -0,0 +1,53 @@
+"""
+Expense table definition.
+SQLAlchemy mapping used by the database-backed expense store.
+"""
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
+from app.database.db import Base
+from app.models.expense import Expense
+from app.utils.helpers import normalize_text
+
+class ExpenseRecord(Base):
+    __tablename__ = "expenses"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+    category = Column(String(100), nullable=False)
+    category_key = Column(String(100), nullable=False, index=True)
+    description = Column(String(255), nullable=False)
+    date = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_expenses_user_date", "user_id", "date"),
+        # Keyset pagination walks (date, id), optionally within one category.
+        Index("ix_expenses_date_id", "date", "id"),
+        Index("ix_expenses_category_date_id", "category_key", "date", "id"),
+    )
+
+    @staticmethod
+    def values_from(expense: Expense) -> dict:
+        """Column values for an expense (normalized category included)."""
+        return {
+            "user_id": expense.user_id,
+            "amount": expense.amount,
+            "category": expense.category,
+            "category_key": normalize_text(expense.category),
+            "description": expense.description,
+            "date": expense.date,
+        }
+
+    @classmethod
+    def from_expense(cls, expense: Expense) -> "ExpenseRecord":
+        return cls(id=expense.id, **cls.values_from(expense))
+
+    def to_expense(self) -> Expense:
+        return Expense(
+            id=self.id,
+            user_id=self.user_id,
+            amount=self.amount,
+            category=self.category,
+            description=self.description,
+            date=self.date,
+        )
@@ -0,0 +1,154 @@
+"""
+Incrementally maintained expense aggregates.
+Totals, per-category and per-day sums are updated as deltas on every write.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date
+from bisect import bisect_left, insort
+from threading import Lock
+import heapq
+import math
+from app.models.expense import Expense
+from app.services.expense_store import day_key
+
+
+class ExpenseAggregates:
+    """
+    Running total, count, per-category sum/count and per-day totals.
+
+    Categories are kept ranked by total in a sorted list, so the top k are
+    read in O(k). The peak day comes from a max-heap whose stale entries are
+    skipped lazily; that cleanup is guarded so concurrent readers can ask
+    for the peak day at the same time.
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self.category_totals: Dict[str, float] = {}
+        self.category_counts: Dict[str, int] = {}
+        self.day_totals: Dict[date, float] = {}
+        self._day_counts: Dict[date, int] = {}
+        self._ranked: List[Tuple[float, str]] = []
+        self._day_heap: List[Tuple[float, date]] = []
+        self._heap_lock = Lock()
+
+    @classmethod
+    def from_expenses(cls, expenses: Iterable[Expense]) -> "ExpenseAggregates":
+        aggregates = cls()
+        aggregates.add_many(expenses)
+        return aggregates
+
+    def add(self, expense: Expense) -> None:
+        self._apply(expense, 1)
+
+    def remove(self, expense: Expense) -> None:
+        self._apply(expense, -1)
+
+    def add_many(self, expenses: Iterable[Expense]) -> None:
+        """Fold a batch into the aggregates, touching each category and day once."""
+        category_sums: Dict[str, float] = {}
+        category_counts: Dict[str, int] = {}
+        day_sums: Dict[date, float] = {}
+        day_counts: Dict[date, int] = {}
+        for expense in expenses:
+            category, day, amount = expense.category, day_key(expense.date), expense.amount
+            category_sums[category] = category_sums.get(category, 0.0) + amount
+            category_counts[category] = category_counts.get(category, 0) + 1
+            day_sums[day] = day_sums.get(day, 0.0) + amount
+            day_counts[day] = day_counts.get(day, 0) + 1
+        self.count += sum(category_counts.values())
+        self.total += sum(category_sums.values())
+        for category, amount in category_sums.items():
+            old_total = self.category_totals.get(category)
+            if old_total is not None:
+                del self._ranked[bisect_left(self._ranked, (-old_total, category))]
+            new_total = (old_total or 0.0) + amount
+            self.category_totals[category] = new_total
+            self.category_counts[category] = self.category_counts.get(category, 0) + category_counts[category]
+            insort(self._ranked, (-new_total, category))
+        for day, amount in day_sums.items():
+            day_total = self.day_totals.get(day, 0.0) + amount
+            self.day_totals[day] = day_total
+            self._day_counts[day] = self._day_counts.get(day, 0) + day_counts[day]
+            heapq.heappush(self._day_heap, (-day_total, day))
+        self._compact_day_heap()
+
+    def top_categories(self, limit: int) -> List[Tuple[str, float]]:
+        """Up to `limit` (category, total) pairs, largest total first."""
+        return [(category, -negated) for negated, category in self._ranked[:max(limit, 0)]]
+
+    def peak_day(self) -> Optional[Tuple[date, float]]:
+        """The day with the highest total, or None when empty."""
+        with self._heap_lock:
+            heap = self._day_heap
+            while heap:
+                negated, day = heap[0]
+                if self.day_totals.get(day) == -negated:
+                    return day, -negated
+                heapq.heappop(heap)
+            return None
+
+    def differences(self, other: "ExpenseAggregates") -> List[str]:
+        """Human-readable mismatches between two aggregate sets (empty when consistent)."""
+        problems = []
+        if self.count != other.count:
+            problems.append(f"count: {self.count} != {other.count}")
+        if not math.isclose(self.total, other.total, abs_tol=1e-6):
+            problems.append(f"total: {self.total} != {other.total}")
+        if self.category_counts != other.category_counts:
+            problems.append("category counts differ")
+        for name, mine, theirs in (
+            ("category", self.category_totals, other.category_totals),
+            ("day", self.day_totals, other.day_totals),
+        ):
+            if mine.keys() != theirs.keys():
+                problems.append(f"{name} keys differ")
+                continue
+            for key, value in mine.items():
+                if not math.isclose(value, theirs[key], abs_tol=1e-6):
+                    problems.append(f"{name} {key}: {value} != {theirs[key]}")
+        mine, theirs = self.peak_day(), other.peak_day()
+        if (mine is None) != (theirs is None) or (mine and not math.isclose(mine[1], theirs[1], abs_tol=1e-6)):
+            problems.append(f"peak day: {mine} != {theirs}")
+        return problems
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _apply(self, expense: Expense, sign: int) -> None:
+        amount = sign * expense.amount
+        self.count += sign
+        self.total = self.total + amount if self.count else 0.0
+
+        category = expense.category
+        old_total = self.category_totals.get(category)
+        if old_total is not None:
+            del self._ranked[bisect_left(self._ranked, (-old_total, category))]
+        count = self.category_counts.get(category, 0) + sign
+        if count:
+            new_total = (old_total or 0.0) + amount
+            self.category_counts[category] = count
+            self.category_totals[category] = new_total
+            insort(self._ranked, (-new_total, category))
+        else:
+            self.category_counts.pop(category, None)
+            self.category_totals.pop(category, None)
+
+        day = day_key(expense.date)
+        day_count = self._day_counts.get(day, 0) + sign
+        if day_count:
+            day_total = self.day_totals.get(day, 0.0) + amount
+            self._day_counts[day] = day_count
+            self.day_totals[day] = day_total
+            heapq.heappush(self._day_heap, (-day_total, day))
+        else:
+            self._day_counts.pop(day, None)
+            self.day_totals.pop(day, None)
+        self._compact_day_heap()
+
+    def _compact_day_heap(self) -> None:
+        if len(self._day_heap) > 2 * len(self.day_totals) + 64:
+            self._day_heap = [(-total, d) for d, total in self.day_totals.items()]
+            heapq.heapify(self._day_heap)
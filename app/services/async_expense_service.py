@@ -0,0 +1,114 @@
+"""
+Async expense service layer.
+Async variant of the database-backed ExpenseService for `async def` routes.
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Optional
+from datetime import date, datetime, time
+from app.models.expense import Expense
+from app.services.pagination import Page, clamp_page_size, decode_cursor, encode_cursor
+from app.services.query import ExpenseQuery
+from app.utils.helpers import tokenize_text
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+    from app.database.async_repository import AsyncSqlExpenseStore
+
+# SQLAlchemy is imported when the first store is built, so mounting the async routes stays cheap.
+
+class AsyncExpenseService:
+    def __init__(self, store: "AsyncSqlExpenseStore"):
+        self.store = store
+
+    @classmethod
+    def from_engine(cls, engine: "AsyncEngine") -> "AsyncExpenseService":
+        from app.database.async_repository import AsyncSqlExpenseStore
+        return cls(AsyncSqlExpenseStore(engine))
+
+    async def add_expense(self, expense: Expense) -> Expense:
+        if not expense.is_valid():
+            raise ValueError("Invalid expense data")
+        return await self.store.add(expense)
+
+    async def add_expenses(self, expenses: List[Expense]) -> List[Expense]:
+        if not all(expense.is_valid() for expense in expenses):
+            raise ValueError("Invalid expense data")
+        return await self.store.add_many(expenses)
+
+    async def get_all_expenses(self) -> List[Expense]:
+        return await self.store.all()
+
+    async def get_expense_by_id(self, expense_id: int) -> Optional[Expense]:
+        return await self.store.get(expense_id)
+
+    async def delete_expense(self, expense_id: int) -> bool:
+        return await self.store.remove(expense_id) is not None
+
+    async def update_expense(self, expense_id: int, **updates) -> bool:
+        return await self.store.update(expense_id, **updates) is not None
+
+    async def get_expenses_by_user(self, user_id: int) -> List[Expense]:
+        return await self.store.by_user(user_id)
+
+    async def get_expenses_by_category(self, category: str) -> List[Expense]:
+        return await self.store.by_category(category)
+
+    async def get_expenses_by_date_range(self, start_date: date, end_date: date) -> List[Expense]:
+        return await self.store.between(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
+
+    async def get_recent_expenses(self, limit: int = 5) -> List[Expense]:
+        return await self.store.recent(limit)
+
+    async def search_expenses(self, keyword: str, limit: Optional[int] = None) -> List[Expense]:
+        terms = tokenize_text(keyword)
+        return await self.store.search(terms, limit=limit) if terms else []
+
+    async def get_page(self, limit: Optional[int] = None, cursor: Optional[str] = None, **filters) -> Page:
+        return await self.query_expenses(ExpenseQuery.build(**filters), limit, cursor)
+
+    async def query_expenses(self, query: ExpenseQuery, limit: Optional[int] = None,
+                             cursor: Optional[str] = None) -> Page:
+        from app.database.repository import query_conditions
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor) if cursor else None
+        conditions = query_conditions(query)
+        if conditions is None:
+            return Page()
+        items = await self.store.page(limit + 1, after, conditions=conditions)
+        if len(items) > limit:
+            return Page(items[:limit], encode_cursor(items[limit - 1]))
+        return Page(items)
+
+    async def get_total_expense(self) -> dict:
+        return {"total_expense": await self.store.total_amount()}
+
+    async def get_expense_summary_by_category(self) -> Dict[str, float]:
+        return await self.store.amount_by_category()
+
+    async def get_top_expense_categories(self, limit: int = 5) -> List[dict]:
+        return [
+            {"category": category, "total_amount": total}
+            for category, total in await self.store.top_categories(limit)
+        ]
+
+    async def get_peak_expense_day(self) -> dict:
+        peak = await self.store.peak_day()
+        if peak is None:
+            return {"date": None, "total_amount": 0.0}
+        return {"date": peak[0], "total_amount": peak[1]}
+
+    async def get_daily_average(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
+        bounds = await self.store.date_bounds()
+        if bounds is None:
+            return {"average": 0.0, "start_date": start_date, "end_date": end_date}
+        start_date = start_date or bounds[0].date()
+        end_date = end_date or bounds[1].date()
+        days = (end_date - start_date).days + 1
+        # Summed in SQL, one row per category, instead of fetching every expense in the range.
+        rows = await self.store.summary(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
+        total = sum(row[1] for row in rows)
+        return {
+            "average": total / days if days > 0 else 0.0,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
@@ -0,0 +1,43 @@
+"""
+Per-item results for bulk create, update and delete.
+A batch is applied in one store operation; each input item still gets its
+own outcome so clients can retry just the failures.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+# Statuses that mean the item was applied.
+APPLIED = ("created", "updated", "deleted")
+
+
+@dataclass
+class ItemResult:
+    index: int
+    status: str  # "created", "updated", "deleted", "not_found" or "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    items: List[ItemResult] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for item in self.items if item.status in APPLIED)
+
+    @property
+    def failed(self) -> int:
+        return len(self.items) - self.succeeded
+
+    def add(self, index: int, status: str, expense_id: Optional[int] = None, error: Optional[str] = None) -> None:
+        self.items.append(ItemResult(index, status, expense_id, error))
+
+    def as_dict(self) -> dict:
+        self.items.sort(key=lambda item: item.index)
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "items": [asdict(item) for item in self.items],
+        }
@@ -0,0 +1,234 @@
+"""
+Response cache for summary and statistics queries.
+Results are stored under a key built from the query and its arguments, together
+with tags naming the months, categories and users they depend on; writes
+invalidate exactly the tags they touch.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from datetime import date
+from threading import Lock
+import functools
+import inspect
+import pickle
+import time
+from app.models.expense import Expense
+from app.services.expense_store import category_key
+
+try:
+    import redis
+except ImportError:  # redis is optional; only needed for CACHE_BACKEND=redis
+    redis = None
+
+MISSING = object()
+ALL = "all"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def month_tag(year: int, month: int, user_id: Optional[int] = None) -> str:
+    tag = f"month:{year:04d}-{month:02d}"
+    return tag if user_id is None else f"user:{user_id}:{tag}"
+
+
+def user_tag(user_id: Optional[int]) -> str:
+    return ALL if user_id is None else f"user:{user_id}"
+
+
+def months_between(start: date, end: date) -> Iterable[Tuple[int, int]]:
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def expense_tags(expense: Expense) -> Set[str]:
+    """Every tag whose cached results may change when `expense` is written."""
+    day = expense.date
+    return {
+        ALL,
+        user_tag(expense.user_id),
+        month_tag(day.year, day.month),
+        month_tag(day.year, day.month, expense.user_id),
+        f"category:{category_key(expense.category)}",
+    }
+
+
+class MemoryCache:
+    """In-process LRU cache with a per-entry time to live."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (self._clock() + self.ttl, value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._discard(key)
+            self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self.stats.invalidations += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class RedisCache:
+    """
+    Cache stored in Redis (or any client with the same commands).
+
+    Values are pickled; each tag is a Redis set of the keys that depend on it.
+    Only point the cache at a Redis instance the application trusts.
+    """
+
+    def __init__(self, client, ttl: float = 60.0, prefix: str = "expense-cache:"):
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Any:
+        payload = self.client.get(self.prefix + key)
+        if payload is None:
+            self.stats.misses += 1
+            return MISSING
+        self.stats.hits += 1
+        return pickle.loads(payload)
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None:
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            self.client.sadd(tag_key, key)
+            self.client.expire(tag_key, self.ttl)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = self.client.smembers(tag_key)
+            self.client.delete(tag_key, *(self.prefix + self._decode(k) for k in keys))
+        self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+        self.stats.invalidations += 1
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    @staticmethod
+    def _decode(key) -> str:
+        return key.decode() if isinstance(key, bytes) else key
+
+
+def create_cache(config=None):
+    """Build the cache selected by CACHE_BACKEND ("memory", "redis" or "none")."""
+    if config is None:
+        from config.settings import settings as config
+    backend = config.CACHE_BACKEND.lower()
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(max_entries=config.CACHE_MAX_ENTRIES, ttl=config.CACHE_TTL)
+    if backend == "redis":
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        client = redis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD,
+        )
+        return RedisCache(client, ttl=config.CACHE_TTL)
+    raise ValueError(f"Unknown cache backend: {config.CACHE_BACKEND}")
+
+
+def cached(tags: Callable[..., Iterable[str]]):
+    """
+    Cache a service method in `self.cache` (when set).
+    `tags` receives the method's arguments, defaults applied, and returns the
+    tags the result depends on. Cached results are shared, so treat them as read-only.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.cache
+            if cache is None:
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            del arguments["self"]
+            key = name + ":" + ",".join(f"{k}={v!r}" for k, v in arguments.items())
+            value = cache.get(key)
+            if value is MISSING:
+                value = method(self, *args, **kwargs)
+                cache.set(key, value, tags(**arguments))
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,389 @@
+"""
+Columnar expense store.
+Keeps expense fields in contiguous typed arrays with dictionary-encoded categories,
+so that sums and group-bys run as vectorized operations.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date, datetime
+from app.models.expense import Expense
+from app.services.expense_store import KeyedDateIndex, SortedDateIndex, category_key, day_key, keyset_page
+from app.utils.helpers import from_micros, to_micros
+
+try:  # NumPy is optional; without it the same operations run as plain loops.
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+@dataclass
+class Columns:
+    """
+    The numeric columns analytics need: amounts, category codes, timestamps
+    (int64 microseconds) and user ids, with the category of each code.
+    """
+
+    amounts: array = field(default_factory=lambda: array("d"))
+    codes: array = field(default_factory=lambda: array("i"))
+    timestamps: array = field(default_factory=lambda: array("q"))
+    user_ids: array = field(default_factory=lambda: array("q"))
+    categories: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @classmethod
+    def from_expenses(cls, expenses: Iterable[Expense]) -> "Columns":
+        columns = cls()
+        codes: Dict[str, int] = {}
+        for expense in expenses:
+            code = codes.get(expense.category)
+            if code is None:
+                code = codes[expense.category] = len(columns.categories)
+                columns.categories.append(expense.category)
+            columns.amounts.append(expense.amount)
+            columns.codes.append(code)
+            columns.timestamps.append(to_micros(expense.date))
+            columns.user_ids.append(expense.user_id)
+        return columns
+
+    @classmethod
+    def from_store(cls, store) -> "Columns":
+        """A copy of the store's columns; a plain copy of the arrays for a columnar store."""
+        if isinstance(store, ColumnarExpenseStore):
+            return store.columns()
+        return cls.from_expenses(store)
+
+
+def _typed_date_index() -> SortedDateIndex:
+    return SortedDateIndex(array("q"), array("q"))
+
+
+class ColumnarExpenseStore:
+    """
+    Array-backed drop-in replacement for `ExpenseStore`.
+
+    Rows are stored column by column: ids, user ids, amounts, timestamps
+    (int64 microseconds) and int32 category codes, plus a list of
+    descriptions. Deletes swap the last row into the freed slot, so row
+    order is not insertion order once rows have been removed. A
+    `SortedDateIndex` over two more int64 arrays serves date ranges and
+    "most recent" queries; one per user and per category serves filtered pages.
+
+    Expenses returned by the store are materialized copies; changes must go
+    through `update` or `mutate` to be persisted.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._user_ids = array("q")
+        self._amounts = array("d")
+        self._timestamps = array("q")
+        self._codes = array("i")
+        self._descriptions: List[str] = []
+        self._rows: Dict[int, int] = {}
+        self._categories: List[str] = []
+        self._category_keys: List[str] = []
+        self._code_by_category: Dict[str, int] = {}
+        self._by_date = _typed_date_index()
+        self._dates_by_user = KeyedDateIndex(_typed_date_index)
+        self._dates_by_category = KeyedDateIndex(_typed_date_index)
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[Expense]:
+        for row in range(len(self._ids)):
+            yield self._materialize(row)
+
+    def __contains__(self, expense_id: int) -> bool:
+        return expense_id in self._rows
+
+    def add(self, expense: Expense) -> Expense:
+        """Insert an expense, assigning the next free id when it has none."""
+        if expense.id is None:
+            expense.id = self._next_id
+        elif expense.id in self._rows:
+            raise ValueError(f"Expense with id {expense.id} already exists")
+        self._next_id = max(self._next_id, expense.id + 1)
+        self._rows[expense.id] = len(self._ids)
+        self._ids.append(expense.id)
+        self._user_ids.append(expense.user_id)
+        self._amounts.append(expense.amount)
+        stamp = to_micros(expense.date)
+        self._timestamps.append(stamp)
+        self._codes.append(self._encode(expense.category))
+        self._descriptions.append(expense.description)
+        self._index_dates(len(self._ids) - 1)
+        return expense
+
+    def add_many(self, expenses: List[Expense]) -> List[Expense]:
+        """Append a batch of expenses column by column."""
+        rows = self._rows
+        given = [e.id for e in expenses if e.id is not None]
+        if len(set(given)) != len(given) or any(i in rows for i in given):
+            raise ValueError("Batch contains duplicate or existing expense ids")
+        row = len(self._ids)
+        for expense in expenses:
+            if expense.id is None:
+                expense.id = self._next_id
+            self._next_id = max(self._next_id, expense.id + 1)
+            rows[expense.id] = row
+            row += 1
+        stamps = [to_micros(e.date) for e in expenses]
+        self._ids.extend(e.id for e in expenses)
+        self._user_ids.extend(e.user_id for e in expenses)
+        self._amounts.extend(e.amount for e in expenses)
+        self._timestamps.extend(stamps)
+        self._codes.extend(self._encode(e.category) for e in expenses)
+        self._descriptions.extend(e.description for e in expenses)
+        self._by_date.add_many(zip(stamps, (e.id for e in expenses)))
+        self._dates_by_user.add_many(zip((e.user_id for e in expenses), stamps, (e.id for e in expenses)))
+        self._dates_by_category.add_many(
+            zip((category_key(e.category) for e in expenses), stamps, (e.id for e in expenses)))
+        return expenses
+
+    def get(self, expense_id: int) -> Optional[Expense]:
+        row = self._rows.get(expense_id)
+        return None if row is None else self._materialize(row)
+
+    def ids(self) -> List[int]:
+        """Snapshot of all ids, safe to iterate while the store changes."""
+        return list(self._rows)
+
+    def remove(self, expense_id: int) -> Optional[Expense]:
+        """Remove and return an expense, or None if the id is unknown."""
+        row = self._rows.pop(expense_id, None)
+        if row is None:
+            return None
+        expense = self._materialize(row)
+        self._unindex_dates(row)
+        last = len(self._ids) - 1
+        for column in (self._ids, self._user_ids, self._amounts, self._timestamps, self._codes, self._descriptions):
+            if row != last:
+                column[row] = column[last]
+            column.pop()
+        if row != last:
+            self._rows[self._ids[row]] = row
+        return expense
+
+    def update(self, expense_id: int, **updates) -> Optional[Expense]:
+        """Apply field updates to a stored expense."""
+        updates.pop("id", None)
+        return self.mutate(expense_id, lambda e: e.update(**updates))
+
+    def mutate(self, expense_id: int, func) -> Optional[Expense]:
+        """Run `func(expense)` on a materialized expense and write it back."""
+        row = self._rows.get(expense_id)
+        if row is None:
+            return None
+        expense = self._materialize(row)
+        try:
+            func(expense)
+        finally:
+            self._write(row, expense)
+        return expense
+
+    def mutate_many(self, ids: Iterable[int], func) -> List[Tuple[Expense, Expense]]:
+        """`mutate` each known id; returns (before, after) pairs."""
+        changed = []
+        for expense_id in ids:
+            row = self._rows.get(expense_id)
+            if row is not None:
+                before = self._materialize(row)
+                changed.append((before, self.mutate(expense_id, func)))
+        return changed
+
+    def remove_many(self, ids: Iterable[int]) -> List[Expense]:
+        """Remove the known ids and return the removed expenses."""
+        removed = (self.remove(expense_id) for expense_id in ids)
+        return [expense for expense in removed if expense is not None]
+
+    def get_many(self, ids: Iterable[int]) -> List[Expense]:
+        rows = self._rows
+        return [self._materialize(rows[i]) for i in ids if i in rows]
+
+    def ids_for_user(self, user_id: int) -> List[int]:
+        return self._ids_where(self._rows_for_user(user_id))
+
+    def ids_for_category(self, category: str) -> List[int]:
+        return self._ids_where(self._rows_for_codes(self._codes_for_key(category_key(category))))
+
+    def ids_for_day(self, day: date) -> List[int]:
+        start = to_micros(day_key(day))
+        return self._by_date.between(start, start + 86_400_000_000 - 1)
+
+    def count_for_user(self, user_id: int) -> int:
+        return self._dates_by_user.count(user_id)
+
+    def count_for_category(self, category: str) -> int:
+        return self._dates_by_category.count(category_key(category))
+
+    def count_between(self, start: Optional[datetime], end: Optional[datetime]) -> int:
+        return self._by_date.count(None if start is None else to_micros(start),
+                                   None if end is None else to_micros(end))
+
+    def by_user(self, user_id: int) -> List[Expense]:
+        return self._materialize_rows(self._rows_for_user(user_id))
+
+    def by_category(self, category: str) -> List[Expense]:
+        return self._materialize_rows(self._rows_for_codes(self._codes_for_key(category_key(category))))
+
+    def by_day(self, day: date) -> List[Expense]:
+        return self.get_many(self.ids_for_day(day))
+
+    def categories(self) -> List[str]:
+        present = set(self._category_counts())
+        return list(dict.fromkeys(self._category_keys[code] for code in present))
+
+    def between(self, start: datetime, end: datetime) -> List[Expense]:
+        """Expenses dated within [start, end], oldest first."""
+        return self.get_many(self._by_date.between(to_micros(start), to_micros(end)))
+
+    def recent(self, limit: int) -> List[Expense]:
+        """The `limit` most recent expenses, newest first."""
+        return self.get_many(self._by_date.latest(limit))
+
+    def page(self, limit: int, after: Optional[Tuple[datetime, int]] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None,
+             ids: Optional[Iterable[int]] = None, category: Optional[str] = None,
+             user_id: Optional[int] = None) -> List[Expense]:
+        """
+        Up to `limit` expenses in (date, id) order after the keyset `after`,
+        within [start, end] and, when given, restricted to `ids`, `category`
+        or `user_id`; the last two walk that key's date index.
+        """
+        after = None if after is None else (to_micros(after[0]), after[1])
+        start = None if start is None else to_micros(start)
+        end = None if end is None else to_micros(end)
+        if ids is None:
+            if category is not None:
+                index = self._dates_by_category.get(category_key(category))
+            elif user_id is not None:
+                index = self._dates_by_user.get(user_id)
+            else:
+                index = self._by_date
+            return [] if index is None else self.get_many(index.page(limit, after, start, end))
+        rows, timestamps = self._rows, self._timestamps
+        keys = ((timestamps[rows[i]], i) for i in ids if i in rows)
+        return self.get_many(keyset_page(keys, limit, after, start, end))
+
+    def date_bounds(self) -> Optional[Tuple[datetime, datetime]]:
+        bounds = self._by_date.bounds()
+        return None if bounds is None else (from_micros(bounds[0]), from_micros(bounds[1]))
+
+    def total_amount(self) -> float:
+        if np is not None and len(self._amounts):
+            return float(np.frombuffer(self._amounts, dtype=np.float64).sum())
+        return sum(self._amounts)
+
+    def amount_by_category(self) -> Dict[str, float]:
+        counts = self._category_counts()
+        if np is not None and len(self._amounts):
+            sums = np.bincount(
+                np.frombuffer(self._codes, dtype=np.int32),
+                weights=np.frombuffer(self._amounts, dtype=np.float64),
+                minlength=len(self._categories),
+            )
+            return {self._categories[code]: float(sums[code]) for code in counts}
+        totals = dict.fromkeys((self._categories[code] for code in counts), 0.0)
+        for code, amount in zip(self._codes, self._amounts):
+            totals[self._categories[code]] += amount
+        return totals
+
+    def columns(self) -> Columns:
+        """Copies of the numeric columns, for analytics that run outside the store's lock."""
+        return Columns(array("d", self._amounts), array("i", self._codes), array("q", self._timestamps),
+                       array("q", self._user_ids), list(self._categories))
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the columns, the date indexes and the id map."""
+        columns = [self._ids, self._user_ids, self._amounts, self._timestamps, self._codes]
+        for index in (self._by_date, *self._dates_by_user.values(), *self._dates_by_category.values()):
+            columns.extend((index._stamps, index._ids))
+        total = sum(column.buffer_info()[1] * column.itemsize for column in columns)
+        total += sys.getsizeof(self._descriptions) + sum(sys.getsizeof(d) for d in self._descriptions)
+        total += sys.getsizeof(self._rows)
+        return total
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _encode(self, category: str) -> int:
+        code = self._code_by_category.get(category)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(category)
+            self._category_keys.append(category_key(category))
+            self._code_by_category[category] = code
+        return code
+
+    def _codes_for_key(self, key: str) -> List[int]:
+        return [code for code, k in enumerate(self._category_keys) if k == key]
+
+    def _category_counts(self) -> Dict[int, int]:
+        if np is not None and len(self._codes):
+            counts = np.bincount(np.frombuffer(self._codes, dtype=np.int32), minlength=len(self._categories))
+            return {int(code): int(counts[code]) for code in np.flatnonzero(counts)}
+        counts: Dict[int, int] = {}
+        for code in self._codes:
+            counts[code] = counts.get(code, 0) + 1
+        return counts
+
+    def _write(self, row: int, expense: Expense) -> None:
+        stamp, code = to_micros(expense.date), self._encode(expense.category)
+        moved = (stamp != self._timestamps[row] or expense.user_id != self._user_ids[row]
+                 or self._category_keys[code] != self._category_keys[self._codes[row]])
+        if moved:
+            self._unindex_dates(row)
+        self._user_ids[row] = expense.user_id
+        self._amounts[row] = expense.amount
+        self._timestamps[row] = stamp
+        self._codes[row] = code
+        self._descriptions[row] = expense.description
+        if moved:
+            self._index_dates(row)
+
+    def _index_dates(self, row: int) -> None:
+        stamp, expense_id = self._timestamps[row], self._ids[row]
+        self._by_date.add(stamp, expense_id)
+        self._dates_by_user.add(self._user_ids[row], stamp, expense_id)
+        self._dates_by_category.add(self._category_keys[self._codes[row]], stamp, expense_id)
+
+    def _unindex_dates(self, row: int) -> None:
+        stamp, expense_id = self._timestamps[row], self._ids[row]
+        self._by_date.remove(stamp, expense_id)
+        self._dates_by_user.remove(self._user_ids[row], stamp, expense_id)
+        self._dates_by_category.remove(self._category_keys[self._codes[row]], stamp, expense_id)
+
+    def _materialize(self, row: int) -> Expense:
+        return Expense(
+            id=self._ids[row],
+            user_id=self._user_ids[row],
+            amount=self._amounts[row],
+            category=self._categories[self._codes[row]],
+            description=self._descriptions[row],
+            date=from_micros(self._timestamps[row]),
+        )
+
+    def _materialize_rows(self, rows: Iterable[int]) -> List[Expense]:
+        return [self._materialize(row) for row in rows]
+
+    def _ids_where(self, rows: Iterable[int]) -> List[int]:
+        return [self._ids[row] for row in rows]
+
+    def _rows_for_user(self, user_id: int) -> List[int]:
+        if np is not None and len(self._user_ids):
+            return np.flatnonzero(np.frombuffer(self._user_ids, dtype=np.int64) == user_id).tolist()
+        return [row for row, value in enumerate(self._user_ids) if value == user_id]
+
+    def _rows_for_codes(self, codes: List[int]) -> List[int]:
+        if not codes:
+            return []
+        if np is not None and len(self._codes):
+            return np.flatnonzero(np.isin(np.frombuffer(self._codes, dtype=np.int32), codes)).tolist()
+        wanted = set(codes)
+        return [row for row, code in enumerate(self._codes) if code in wanted]
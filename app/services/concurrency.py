@@ -0,0 +1,147 @@
+"""
+Concurrency primitives for the in-memory expense services.
+Provides a reentrant readers-writer lock and method decorators built on it.
+"""
+
+from contextlib import contextmanager
+from threading import Condition, Lock, get_ident, local
+import functools
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring readers-writer lock.
+
+    Any number of threads may hold the read side at once; the write side is
+    exclusive. Both sides are reentrant, and the writer may also take the read
+    side. Upgrading a held read lock to a write lock is not supported.
+    """
+
+    def __init__(self):
+        self._condition = Condition(Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = local()
+
+    def acquire_read(self) -> None:
+        state = self._local
+        depth = getattr(state, "depth", 0)
+        if depth == 0:
+            if self._writer == get_ident():
+                state.counted = False
+            else:
+                with self._condition:
+                    while self._writer is not None or self._waiting_writers:
+                        self._condition.wait()
+                    self._readers += 1
+                state.counted = True
+        state.depth = depth + 1
+
+    def release_read(self) -> None:
+        state = self._local
+        state.depth -= 1
+        if state.depth == 0 and state.counted:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        me = get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("Cannot upgrade a read lock to a write lock")
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    @property
+    def write_held(self) -> bool:
+        """Whether the calling thread holds the write side."""
+        return self._writer == get_ident()
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class NullLock(ReadWriteLock):
+    """Lock that never blocks, for services whose backend serializes writes itself."""
+
+    def acquire_read(self) -> None:
+        pass
+
+    def release_read(self) -> None:
+        pass
+
+    def acquire_write(self) -> None:
+        pass
+
+    def release_write(self) -> None:
+        pass
+
+
+def reads(method):
+    """Run a service method under the read side of `self._lock`."""
+    return _locked(method, "read")
+
+
+def writes(method):
+    """Run a service method under the write side of `self._lock`."""
+    return _locked(method, "write")
+
+
+def _locked(method, side: str):
+    # When the service has `metrics` (a ServiceMetrics), the call is also timed under the method's name.
+    # When it has a `journal`, a write returns once the journal has committed what it appended; the
+    # wait happens after the lock is released so that concurrent writers share one group fsync.
+    name = method.__name__
+    acquire, release = f"acquire_{side}", f"release_{side}"
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock, metrics = self._lock, self.metrics
+        started = metrics.start() if metrics is not None else None
+        failed = True
+        getattr(lock, acquire)()
+        try:
+            result = method(self, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            getattr(lock, release)()
+            journal = getattr(self, "journal", None)
+            if side == "write" and journal is not None and not lock.write_held:
+                journal.commit()
+            if metrics is not None:
+                metrics.stop(name, started, failed)
+    return wrapper
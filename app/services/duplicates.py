@@ -0,0 +1,105 @@
+"""
+Duplicate expense detection.
+Expenses are grouped by user, amount, category and normalized description;
+each group keeps its dates sorted, so checking a new expense against the
+others in a tolerance window is a dictionary lookup plus a bisect.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right, insort
+from app.models.expense import Expense
+from app.services.expense_store import category_key
+from app.utils.helpers import normalize_text
+
+# What to do when an incoming expense duplicates a stored one.
+DUPLICATE_POLICIES = ("allow", "flag", "reject")
+
+
+class DuplicateExpenseError(ValueError):
+    def __init__(self, expense: Expense, original_id: Optional[int]):
+        self.expense = expense
+        self.original_id = original_id
+        target = f"expense {original_id}" if original_id is not None else "another expense in the batch"
+        super().__init__(f"Duplicate of {target}")
+
+    def __reduce__(self):
+        # Rebuilt from the constructor arguments, so it survives the trip back from a shard worker.
+        return type(self), (self.expense, self.original_id)
+
+
+def duplicate_key(expense: Expense) -> Tuple[Hashable, ...]:
+    """Fields two expenses must share to be duplicates; the date is compared separately."""
+    return (expense.user_id, round(expense.amount, 2), category_key(expense.category),
+            normalize_text(expense.description))
+
+
+class DuplicateIndex:
+    """
+    Groups of (date, id) keys per `duplicate_key`. Two expenses in a group
+    are duplicates when their dates are at most `window` seconds apart.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = timedelta(seconds=window)
+        self._groups: Dict[Tuple, List[Tuple[datetime, int]]] = {}
+        # Keys of groups with more than one member; only these can hold duplicates.
+        self._shared: Set[Tuple] = set()
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self._groups.values())
+
+    @classmethod
+    def from_expenses(cls, expenses: Iterable[Expense], window: float = 0.0) -> "DuplicateIndex":
+        index = cls(window)
+        for expense in expenses:
+            index.add(expense)
+        return index
+
+    def add(self, expense: Expense, ident: Optional[int] = None) -> None:
+        """Index `expense` under `ident` (its id by default; unsaved expenses need one)."""
+        key = duplicate_key(expense)
+        group = self._groups.setdefault(key, [])
+        insort(group, (expense.date, expense.id if ident is None else ident))
+        if len(group) > 1:
+            self._shared.add(key)
+
+    def remove(self, expense: Expense) -> None:
+        key = duplicate_key(expense)
+        group = self._groups.get(key)
+        if not group:
+            return
+        position = bisect_left(group, (expense.date, expense.id))
+        if position < len(group) and group[position] == (expense.date, expense.id):
+            del group[position]
+        if len(group) < 2:
+            self._shared.discard(key)
+        if not group:
+            del self._groups[key]
+
+    def match(self, expense: Expense, ident: Optional[int] = None) -> Optional[int]:
+        """Id of the earliest other expense that `expense` duplicates, or None."""
+        group = self._groups.get(duplicate_key(expense))
+        if not group:
+            return None
+        ident = expense.id if ident is None else ident
+        lo = bisect_left(group, (expense.date - self.window,))
+        hi = bisect_right(group, (expense.date + self.window, float("inf")))
+        for _, expense_id in group[lo:hi]:
+            if expense_id != ident:
+                return expense_id
+        return None
+
+    def duplicates(self) -> List[int]:
+        """Ids of expenses that follow another member of their group within the window."""
+        found = []
+        for key in self._shared:
+            group = self._groups[key]
+            for (previous, _), (current, expense_id) in zip(group, group[1:]):
+                if current - previous <= self.window:
+                    found.append(expense_id)
+        return found
+
+    def clear(self) -> None:
+        self._groups.clear()
+        self._shared.clear()
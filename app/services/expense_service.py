@@ -3,99 +3,619 @@ Expense service layer.
 Provides business logic for managing expenses.
 """
 
-from typing import List, Optional, Dict
-from datetime import datetime
-from collections import defaultdict
-import csv
-import json
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Dict, Sequence, Set, Tuple
+from dataclasses import asdict
+from datetime import date, datetime, time
 from app.models.expense import Expense
+from app.services import exporters, importers
+from app.services.importers import ImportReport, RowError
+from app.services.bulk import BatchResult
+from app.services.expense_store import ExpenseStore, category_key
+from app.services.persistence import WriteAheadLog, encode_snapshot, gc_paused, load_expenses
+from app.services.search_index import InvertedIndex
+from app.services.aggregates import ExpenseAggregates
+from app.services.rollups import ExpenseRollups, Rollup
+from app.services.duplicates import DUPLICATE_POLICIES, DuplicateExpenseError, DuplicateIndex
+from app.services.concurrency import ReadWriteLock, reads, writes
+from app.services.serialization import ExpenseSerializer
+from app.services.pagination import MAX_PAGE_SIZE, Page, clamp_page_size, decode_cursor, encode_cursor
+from app.services.query import ExpenseQuery, QueryEngine
+from app.services.cache import ALL, cached, expense_tags, month_tag, months_between, user_tag
+from app.utils.helpers import get_last_day_of_month, get_week_range
+
+if TYPE_CHECKING:
+    from app.services.columnar_store import Columns
 
 class ExpenseService:
-    def __init__(self):
-        self.expenses: List[Expense] = []
+    # Reads share the lock and run concurrently; writes take it exclusively.
+    # Incoming expenses that repeat a stored one within `duplicate_window` seconds
+    # are inserted ("allow"), inserted and listed in `flagged_duplicates` ("flag")
+    # or refused with DuplicateExpenseError ("reject").
+    # With a `journal`, every write is also appended to that WriteAheadLog (see `open`).
+    def __init__(self, store: Optional[ExpenseStore] = None, cache=None,
+                 duplicate_policy: str = "allow", duplicate_window: float = 0.0,
+                 journal: Optional[WriteAheadLog] = None):
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {duplicate_policy}")
+        self._lock = ReadWriteLock()
+        self.metrics = None  # a ServiceMetrics, set by `instrument_service`
+        self.store = store if store is not None else ExpenseStore()
+        self.text_index = InvertedIndex()
+        self.aggregates = ExpenseAggregates()
+        self.rollups = ExpenseRollups()
+        self.duplicates = DuplicateIndex(duplicate_window)
+        self.duplicate_policy = duplicate_policy
+        self.flagged_duplicates: Set[int] = set()
+        self.serializer = ExpenseSerializer()
+        self.query_engine = QueryEngine(self.store, self.text_index)
+        self.cache = None
+        self.journal = None
+        self._on_added_many(list(self.store))
+        self.cache = cache
+        self.journal = journal
+
+    @classmethod
+    def open(cls, directory: str, store: Optional[ExpenseStore] = None, fsync: str = "group",
+             sync_interval: float = 0.05, checkpoint_bytes: Optional[int] = None, **options) -> "ExpenseService":
+        """
+        A service persisted in `directory`: state is loaded from the latest
+        snapshot plus the log written after it, and later writes are logged.
+        Flagged duplicates are not persisted.
+        """
+        with gc_paused():
+            segment, expenses = load_expenses(directory)
+            store = store if store is not None else ExpenseStore()
+            store.add_many(expenses)
+            journal = WriteAheadLog(directory, fsync, sync_interval, checkpoint_bytes, segment)
+            service = cls(store=store, journal=journal, **options)
+        journal.on_full = service.checkpoint
+        return service
+
+    def checkpoint(self) -> str:
+        """
+        Snapshot the current state and delete the log it makes redundant;
+        returns the snapshot path. Writes wait while the state is captured,
+        reads do not.
+        """
+        if self.journal is None:
+            raise ValueError("Service has no journal")
+        with self._lock.read_locked():
+            segment = self.journal.rotate()
+            chunks = encode_snapshot(self.store, segment)
+        return self.journal.save_snapshot(chunks, segment)
+
+    def close(self) -> None:
+        """Flush and close the journal, if any."""
+        if self.journal is not None:
+            self.journal.close()
 
+    @property
+    @reads
+    def expenses(self) -> List[Expense]:
+        return list(self.store)
+
+    @writes
     def add_expense(self, expense: Expense) -> None:
         if not expense.is_valid():
             raise ValueError("Invalid expense data")
-        self.expenses.append(expense)
+        duplicates = self._check_duplicates([expense])
+        self.store.add(expense)
+        self._on_added(expense)
+        if duplicates:
+            self.flagged_duplicates.add(expense.id)
+
+    @writes
+    def add_expenses(self, expenses: List[Expense]) -> List[Expense]:
+        """Insert a batch of expenses in one operation; nothing is inserted if any is invalid."""
+        if not all(expense.is_valid() for expense in expenses):
+            raise ValueError("Invalid expense data")
+        duplicates = self._check_duplicates(expenses)
+        self.store.add_many(expenses)
+        self._on_added_many(expenses)
+        self.flagged_duplicates.update(expenses[position].id for position in duplicates)
+        return expenses
 
+    @reads
     def get_all_expenses(self) -> List[Expense]:
         return self.expenses
 
+    @reads
     def get_expense_by_id(self, expense_id: int) -> Optional[Expense]:
-        return next((e for e in self.expenses if e.id == expense_id), None)
+        return self.store.get(expense_id)
 
+    @writes
     def delete_expense(self, expense_id: int) -> bool:
-        expense = self.get_expense_by_id(expense_id)
-        if expense:
-            self.expenses.remove(expense)
-            return True
-        return False
+        expense = self.store.remove(expense_id)
+        if expense is None:
+            return False
+        self._on_removed(expense)
+        return True
 
+    @writes
     def update_expense(self, expense_id: int, **updates) -> bool:
-        expense = self.get_expense_by_id(expense_id)
-        if expense:
-            expense.update(**updates)
-            return True
-        return False
+        updates.pop("id", None)
+        return self._mutate(expense_id, lambda e: e.update(**updates)) is not None
+
+    @writes
+    def create_many(self, expenses: List[Expense]) -> BatchResult:
+        """Insert every acceptable expense in one store operation; failures are reported per item."""
+        result = BatchResult()
+        valid, positions, errors = [], [], []
+        for position, expense in enumerate(expenses):
+            if expense.is_valid():
+                valid.append(expense)
+                positions.append(position)
+            else:
+                errors.append(RowError(position, "Invalid expense data"))
+        for expense, position in self._insert_batch(valid, positions, errors):
+            result.add(position, "created", expense.id)
+        for error in errors:
+            result.add(error.row, "error", error=error.message)
+        return result
+
+    @writes
+    def update_many(self, changes: List[dict]) -> BatchResult:
+        """
+        Apply field updates given as {"id": ..., field: value, ...} items.
+        Every item is validated first, then all are written in one store operation.
+        """
+        result = BatchResult()
+        current = {e.id: e for e in self.store.get_many({change.get("id") for change in changes})}
+        updates: Dict[int, dict] = {}
+        for position, change in enumerate(changes):
+            fields = {key: value for key, value in change.items() if key != "id"}
+            expense_id = change.get("id")
+            expense = current.get(expense_id)
+            if expense is None:
+                result.add(position, "not_found", expense_id)
+                continue
+            # Items repeating an id are merged, later fields winning.
+            merged = {**updates.get(expense_id, {}), **fields}
+            candidate = expense.clone(expense_id)
+            candidate.update(**merged)
+            if not candidate.is_valid():
+                result.add(position, "error", expense_id, "Invalid expense data")
+                continue
+            updates[expense_id] = merged
+            result.add(position, "updated", expense_id)
+        self._mutate_many(updates, lambda e: e.update(**updates[e.id]))
+        return result
+
+    @writes
+    def update_where(self, query: ExpenseQuery, **fields) -> BatchResult:
+        """Apply the same field updates to every expense matching `query`."""
+        fields.pop("id", None)
+        return self.update_many([dict(fields, id=expense_id) for expense_id in self._matching_ids(query)])
+
+    @writes
+    def delete_many(self, ids: Iterable[int]) -> BatchResult:
+        """Delete the given ids in one store operation; unknown ids are reported as not found."""
+        ids = list(ids)
+        removed = self.store.remove_many(dict.fromkeys(ids))
+        self._on_removed_many(removed)
+        deleted = {expense.id for expense in removed}
+        result = BatchResult()
+        for position, expense_id in enumerate(ids):
+            result.add(position, "deleted" if expense_id in deleted else "not_found", expense_id)
+        return result
+
+    @writes
+    def delete_where(self, query: ExpenseQuery) -> BatchResult:
+        return self.delete_many(self._matching_ids(query))
+
+    @reads
+    def expense_json(self, expense_id: int) -> Optional[bytes]:
+        expense = self.store.get(expense_id)
+        return None if expense is None else self.serializer.dumps_one(expense)
+
+    @reads
+    def expenses_json(self, query: Callable[..., List[Expense]], *args, **kwargs) -> bytes:
+        """Run a list query and encode its result as a JSON array within one read section."""
+        return self.serializer.dumps_many(query(*args, **kwargs))
+
+    def get_page(self, limit: Optional[int] = None, cursor: Optional[str] = None, **filters) -> Page:
+        """
+        One keyset page of expenses in (date, id) order, optionally filtered by
+        the ExpenseFilter fields (category, amount range, dates, user, keyword).
+        """
+        return self.query_expenses(ExpenseQuery.build(**filters), limit, cursor)
 
+    @reads
+    def query_expenses(self, query: ExpenseQuery, limit: Optional[int] = None,
+                       cursor: Optional[str] = None) -> Page:
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor) if cursor else None
+        items = self._fetch_page(query, limit + 1, after)
+        if len(items) > limit:
+            return Page(items[:limit], encode_cursor(items[limit - 1]))
+        return Page(items)
+
+    @reads
+    def page_json(self, fields: Optional[Sequence[str]] = None, **query) -> Tuple[bytes, Optional[str]]:
+        """A page from `get_page(**query)` encoded as a JSON array, plus the next cursor."""
+        page = self.get_page(**query)
+        return self.serializer.dumps_many(page.items, fields), page.next_cursor
+
+    @reads
+    def get_expenses_by_user(self, user_id: int) -> List[Expense]:
+        return self.store.by_user(user_id)
+
+    @reads
     def filter_expenses_by_category(self, category: str) -> List[Expense]:
-        return Expense.filter_by_category(self.expenses, category)
+        return self.store.by_category(category)
 
+    @reads
     def filter_expenses_by_date_range(self, start: datetime, end: datetime) -> List[Expense]:
-        return Expense.filter_by_date_range(self.expenses, start, end)
+        return self.store.between(start, end)
+
+    @reads
+    def get_expenses_by_date_range(self, start_date: date, end_date: date) -> List[Expense]:
+        return self.store.between(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
 
+    @reads
+    @cached(lambda start_date, end_date: (
+        [month_tag(*month) for month in months_between(start_date, end_date)]
+        if start_date and end_date else [ALL]))
+    def get_daily_average(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
+        bounds = self.store.date_bounds()
+        if bounds is None:
+            return {"average": 0.0, "start_date": start_date, "end_date": end_date}
+        start_date = start_date or bounds[0].date()
+        end_date = end_date or bounds[1].date()
+        days = (end_date - start_date).days + 1
+        total = self._summarize(start_date, end_date).total
+        return {
+            "average": total / days if days > 0 else 0.0,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+
+    @reads
     def total_amount(self) -> float:
-        return sum(e.amount for e in self.expenses)
+        return self.aggregates.total
 
+    @reads
     def average_amount(self) -> float:
-        return self.total_amount() / len(self.expenses) if self.expenses else 0.0
+        return self.aggregates.total / self.aggregates.count if self.aggregates.count else 0.0
 
+    @reads
     def total_amount_by_category(self) -> Dict[str, float]:
-        category_totals: Dict[str, float] = defaultdict(float)
-        for expense in self.expenses:
-            category_totals[expense.category] += expense.amount
-        return dict(category_totals)
+        return dict(self.aggregates.category_totals)
+
+    @reads
+    @cached(lambda: [ALL])
+    def get_total_expense(self) -> dict:
+        return {"total_expense": self.aggregates.total}
+
+    @reads
+    @cached(lambda user_id: [user_tag(user_id)])
+    def get_expense_summary_by_category(self, user_id: Optional[int] = None) -> Dict[str, float]:
+        if user_id is None:
+            return self.total_amount_by_category()
+        summary: Dict[str, float] = {}
+        for expense in self.store.by_user(user_id):
+            summary[expense.category] = summary.get(expense.category, 0.0) + expense.amount
+        return summary
+
+    @reads
+    @cached(lambda year, month, user_id: [month_tag(year, month, user_id)])
+    def get_monthly_summary(self, year: int, month: int, user_id: Optional[int] = None) -> dict:
+        """Total, count, min, max and per-category totals for one calendar month."""
+        first_day = date(year, month, 1)
+        rollup = self._summarize(first_day, get_last_day_of_month(first_day), user_id)
+        return {"year": year, "month": month, **rollup.as_dict()}
 
+    @reads
+    @cached(lambda day, user_id: [month_tag(*month, user_id) for month in months_between(*get_week_range(day))])
+    def get_weekly_summary(self, day: date, user_id: Optional[int] = None) -> dict:
+        """Same figures as the monthly summary for the Monday-to-Sunday week containing `day`."""
+        start_date, end_date = get_week_range(day)
+        rollup = self._summarize(start_date, end_date, user_id)
+        return {"start_date": start_date, "end_date": end_date, **rollup.as_dict()}
+
+    @reads
+    @cached(lambda limit: [ALL])
+    def get_top_expense_categories(self, limit: int = 5) -> List[dict]:
+        return [
+            {"category": category, "total_amount": total}
+            for category, total in self.aggregates.top_categories(limit)
+        ]
+
+    @reads
+    @cached(lambda user_id: [user_tag(user_id)])
+    def get_peak_expense_day(self, user_id: Optional[int] = None) -> dict:
+        peak = self.aggregates.peak_day() if user_id is None else self.rollups.peak_day(user_id)
+        if peak is None:
+            return {"date": None, "total_amount": 0.0}
+        return {"date": peak[0], "total_amount": peak[1]}
+
+    @reads
+    def get_daily_totals(self, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                         user_id: Optional[int] = None) -> Dict[date, float]:
+        """Total per day that has expenses, oldest first."""
+        return self.rollups.daily_totals(start_date, end_date, user_id)
+
+    @reads
+    def columns(self) -> "Columns":
+        """Consistent copy of the numeric columns, for `ParallelAnalytics` reports."""
+        # Imported here: the columnar module loads numpy, which plain services never need.
+        from app.services.columnar_store import Columns
+        return Columns.from_store(self.store)
+
+    @reads
+    def verify_aggregates(self) -> List[str]:
+        """Compare maintained aggregates to a full recompute; returns the mismatches."""
+        expenses = list(self.store)
+        return (self.aggregates.differences(ExpenseAggregates.from_expenses(expenses)) +
+                self.rollups.differences(ExpenseRollups.from_expenses(expenses)))
+
+    @reads
     def find_duplicates(self) -> List[Expense]:
-        seen = set()
-        duplicates = []
-        for expense in self.expenses:
-            key = (expense.user_id, expense.amount, expense.category, expense.description, expense.date)
-            if key in seen:
-                duplicates.append(expense)
-            else:
-                seen.add(key)
-        return duplicates
+        """Expenses repeating an earlier one within the duplicate window, in (date, id) order."""
+        return sorted(self.store.get_many(self.duplicates.duplicates()), key=lambda e: (e.date, e.id))
 
+    @reads
     def get_expenses_containing_keyword(self, keyword: str) -> List[Expense]:
-        return [e for e in self.expenses if e.contains_keyword(keyword)]
+        return [e for e in self.store if e.contains_keyword(keyword)]
+
+    @reads
+    def search_expenses(self, keyword: str, limit: Optional[int] = None, prefix: bool = True) -> List[Expense]:
+        """All-terms match of `keyword` against description and category via the inverted index."""
+        return self.store.get_many(self.text_index.search(keyword, limit=limit, prefix=prefix))
 
+    @reads
     def get_recent_expenses(self, limit: int = 5) -> List[Expense]:
-        return sorted(self.expenses, key=lambda e: e.date, reverse=True)[:limit]
+        return self.store.recent(limit)
+
+    @writes
+    def categorize_all(self, category_mapping: Dict[str, str]) -> int:
+        """Rename categories (matched by normalized name); returns the number of expenses changed."""
+        # Every bucket is read before anything is renamed, so chained or swapped
+        # mappings apply to the original categories and each expense changes once.
+        renames = {
+            expense_id: category
+            for key, category in {category_key(k): v for k, v in category_mapping.items()}.items()
+            for expense_id in self.store.ids_for_category(key)
+        }
+        return self._mutate_many(renames, lambda e: e.update(category=renames[e.id]))
+
+    @writes
+    def apply_discount_to_category(self, category: str, percent: float) -> int:
+        if not 0 < percent < 100:
+            return 0
+        return self._mutate_many(self.store.ids_for_category(category), lambda e: e.apply_discount(percent))
 
-    def categorize_all(self, category_mapping: Dict[str, str]) -> None:
-        for expense in self.expenses:
-            expense.categorize(category_mapping)
+    def iter_matching(self, predicate: Optional[Callable[[Expense], bool]] = None) -> Iterator[Expense]:
+        """Lazily yield stored expenses accepted by `predicate` (all when None)."""
+        # The lock is taken per row, so a slow consumer never stalls writers.
+        with self._lock.read_locked():
+            ids = self.store.ids()
+        for expense_id in ids:
+            with self._lock.read_locked():
+                expense = self.store.get(expense_id)
+            if expense is not None and (predicate is None or predicate(expense)):
+                yield expense
 
-    def apply_discount_to_category(self, category: str, percent: float) -> None:
-        for expense in self.expenses:
-            if expense.matches_category(category):
-                expense.apply_discount(percent)
+    def iter_query(self, query: ExpenseQuery, chunk_size: int = MAX_PAGE_SIZE) -> Iterator[Expense]:
+        """Lazily yield expenses matching `query` in (date, id) order, a keyset page at a time."""
+        after = None
+        while True:
+            with self._lock.read_locked():
+                batch = self._fetch_page(query, chunk_size, after)
+            yield from batch
+            if len(batch) < chunk_size:
+                return
+            after = (batch[-1].date, batch[-1].id)
 
-    def export_to_csv(self, file_path: str) -> None:
+    def _export_rows(self, predicate: Optional[Callable[[Expense], bool]],
+                     query: Optional[ExpenseQuery]) -> Iterator[Expense]:
+        if query is None:
+            return self.iter_matching(predicate)
+        rows = self.iter_query(query)
+        return rows if predicate is None else filter(predicate, rows)
+
+    def stream_csv(self, predicate: Optional[Callable[[Expense], bool]] = None,
+                   chunk_size: int = exporters.DEFAULT_CHUNK_SIZE,
+                   query: Optional[ExpenseQuery] = None) -> Iterator[str]:
+        return exporters.iter_csv(self._export_rows(predicate, query), chunk_size)
+
+    def stream_json(self, predicate: Optional[Callable[[Expense], bool]] = None,
+                    chunk_size: int = exporters.DEFAULT_CHUNK_SIZE,
+                    query: Optional[ExpenseQuery] = None) -> Iterator[str]:
+        return exporters.iter_json(self._export_rows(predicate, query), chunk_size)
+
+    def export_to_csv(self, file_path: str, predicate: Optional[Callable[[Expense], bool]] = None,
+                      query: Optional[ExpenseQuery] = None) -> None:
         with open(file_path, mode='w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.expenses[0].to_dict().keys())
-            writer.writeheader()
-            for expense in self.expenses:
-                writer.writerow(expense.to_dict())
+            csvfile.writelines(self.stream_csv(predicate, query=query))
 
-    def export_to_json(self, file_path: str) -> None:
+    def export_to_json(self, file_path: str, predicate: Optional[Callable[[Expense], bool]] = None,
+                       query: Optional[ExpenseQuery] = None) -> None:
         with open(file_path, mode='w', encoding='utf-8') as jsonfile:
-            json.dump([e.to_dict() for e in self.expenses], jsonfile, indent=4)
+            jsonfile.writelines(self.stream_json(predicate, query=query))
+
+    def import_records(self, records: Iterable[dict],
+                       batch_size: int = importers.DEFAULT_BATCH_SIZE) -> ImportReport:
+        """Validate and insert raw records batch by batch, collecting per-row errors."""
+        report = ImportReport()
+        first_row = 1
+        for batch in importers.batched(records, batch_size):
+            expenses, rows, errors = importers.parse_batch(batch, first_row)
+            report.imported += len(self._insert_batch(expenses, rows, errors))
+            report.errors.extend(sorted(errors, key=lambda error: error.row))
+            first_row += len(batch)
+        return report
+
+    def import_file(self, file_path: str, fmt: Optional[str] = None,
+                    batch_size: int = importers.DEFAULT_BATCH_SIZE) -> ImportReport:
+        """Stream-import a JSON array, NDJSON or CSV file (format inferred from the extension)."""
+        fmt = fmt or importers.detect_format(file_path)
+        with open(file_path, mode='r', newline='', encoding='utf-8') as fp:
+            return self.import_records(importers.iter_records(fp, fmt), batch_size)
+
+    def import_from_json(self, file_path: str) -> ImportReport:
+        return self.import_file(file_path, fmt="json")
+
+    @writes
+    def _insert_batch(self, expenses: List[Expense], rows: List[int],
+                      errors: List[RowError]) -> List[Tuple[Expense, int]]:
+        # Id conflicts are checked under the same write lock as the insert.
+        accepted = []
+        seen = set()
+        existing = self._existing_ids(e.id for e in expenses if e.id is not None)
+        for expense, row in zip(expenses, rows):
+            if expense.id is not None:
+                if expense.id in existing or expense.id in seen:
+                    errors.append(RowError(row, f"Expense with id {expense.id} already exists"))
+                    continue
+                seen.add(expense.id)
+            accepted.append((expense, row))
+        if self.duplicate_policy == "reject":
+            # Duplicates become row errors instead of failing the whole batch.
+            duplicates = self._duplicates_in([expense for expense, _ in accepted])
+            for position, error in duplicates.items():
+                errors.append(RowError(accepted[position][1], str(error)))
+            accepted = [item for position, item in enumerate(accepted) if position not in duplicates]
+        self.add_expenses([expense for expense, _ in accepted])
+        return accepted
+
+    def _check_duplicates(self, expenses: List[Expense]) -> Dict[int, DuplicateExpenseError]:
+        """Apply the duplicate policy to an incoming batch before anything is stored."""
+        if self.duplicate_policy == "allow":
+            return {}
+        duplicates = self._duplicates_in(expenses)
+        if duplicates and self.duplicate_policy == "reject":
+            raise next(iter(duplicates.values()))
+        return duplicates
+
+    def _duplicates_in(self, expenses: List[Expense]) -> Dict[int, DuplicateExpenseError]:
+        """Batch position -> error for each expense repeating a stored one or an earlier one in the batch."""
+        found = {}
+        stored = self._stored_duplicates(expenses)
+        batch = DuplicateIndex(self.duplicates.window.total_seconds())
+        for position, expense in enumerate(expenses):
+            # Negative placeholders never collide with stored ids.
+            placeholder = -1 - position
+            original = stored.get(position)
+            if original is not None:
+                found[position] = DuplicateExpenseError(expense, original)
+            elif batch.match(expense, placeholder) is not None:
+                found[position] = DuplicateExpenseError(expense, None)
+            batch.add(expense, placeholder)
+        return found
+
+    def _existing_ids(self, ids: Iterable[int]) -> Set[int]:
+        return {expense_id for expense_id in ids if expense_id in self.store}
+
+    def _stored_duplicates(self, expenses: List[Expense]) -> Dict[int, int]:
+        """Batch position -> id of the stored expense it duplicates."""
+        found = {}
+        for position, expense in enumerate(expenses):
+            original = self.duplicates.match(expense)
+            if original is not None:
+                found[position] = original
+        return found
+
+    def _fetch_page(self, query: ExpenseQuery, limit: int, after) -> List[Expense]:
+        return self.query_engine.page(query, limit, after)
+
+    def _summarize(self, start_date: date, end_date: date, user_id: Optional[int] = None) -> Rollup:
+        return self.rollups.summary(start_date, end_date, user_id)
+
+    def _mutate_many(self, ids: Iterable[int], func) -> int:
+        changed = self.store.mutate_many(ids, func)
+        self._on_updated_many(changed)
+        return len(changed)
+
+    def _matching_ids(self, query: ExpenseQuery) -> List[int]:
+        ids, after = [], None
+        while True:
+            batch = self._fetch_page(query, MAX_PAGE_SIZE, after)
+            ids.extend(expense.id for expense in batch)
+            if len(batch) < MAX_PAGE_SIZE:
+                return ids
+            after = (batch[-1].date, batch[-1].id)
+
+    def _mutate(self, expense_id: int, func) -> Optional[Expense]:
+        current = self.store.get(expense_id)
+        if current is None:
+            return None
+        before = current.clone(current.id)
+        after = self.store.mutate(expense_id, func)
+        self._on_updated(before, after)
+        return after
+
+    def _invalidate(self, expenses: Iterable[Expense]) -> None:
+        if self.cache is None:
+            return
+        tags = set()
+        for expense in expenses:
+            tags |= expense_tags(expense)
+        self.cache.invalidate(tags)
+
+    def _journal(self, undo: Callable[[], object], puts: Iterable[Expense] = (), deletes: Iterable[int] = ()) -> None:
+        # Runs right after the store change it logs. A record the journal refuses must not stay in the
+        # store, or replay, the indexes and the aggregates would all disagree with it.
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(puts=puts, deletes=deletes, wait=False)
+        except BaseException:
+            undo()
+            raise
+
+    def _on_added(self, expense: Expense) -> None:
+        self._journal(lambda: self.store.remove(expense.id), puts=[expense])
+        self.text_index.add(expense.id, self._search_text(expense))
+        self.aggregates.add(expense)
+        self.rollups.add(expense)
+        self.duplicates.add(expense)
+        self._invalidate([expense])
+
+    def _on_added_many(self, expenses: List[Expense]) -> None:
+        self._journal(lambda: self.store.remove_many([expense.id for expense in expenses]), puts=expenses)
+        for expense in expenses:
+            self.text_index.add(expense.id, self._search_text(expense))
+        self.aggregates.add_many(expenses)
+        self.rollups.add_many(expenses)
+        for expense in expenses:
+            self.duplicates.add(expense)
+        self._invalidate(expenses)
+
+    def _on_removed(self, expense: Expense) -> None:
+        self._on_removed_many([expense])
+
+    def _on_removed_many(self, expenses: List[Expense]) -> None:
+        self._journal(lambda: self.store.add_many(expenses), deletes=[expense.id for expense in expenses])
+        for expense in expenses:
+            self.text_index.remove(expense.id)
+            self.aggregates.remove(expense)
+            self.rollups.remove(expense)
+            self.duplicates.remove(expense)
+            self.flagged_duplicates.discard(expense.id)
+            self.serializer.forget(expense.id)
+        self._invalidate(expenses)
+
+    def _on_updated(self, before: Expense, after: Expense) -> None:
+        self._on_updated_many([(before, after)])
+
+    def _on_updated_many(self, changed: List[Tuple[Expense, Expense]]) -> None:
+        self._journal(lambda: self._restore(changed), puts=[after for _, after in changed])
+        for before, after in changed:
+            self.text_index.add(after.id, self._search_text(after))
+            self.serializer.forget(after.id)
+            self.aggregates.remove(before)
+            self.aggregates.add(after)
+            self.rollups.remove(before)
+            self.rollups.add(after)
+            self.duplicates.remove(before)
+            self.duplicates.add(after)
+        self._invalidate(expense for pair in changed for expense in pair)
+
+    def _restore(self, changed: List[Tuple[Expense, Expense]]) -> None:
+        before = {old.id: asdict(old) for old, _ in changed}
+        self.store.mutate_many(list(before), lambda expense: expense.update(**before[expense.id]))
 
-    def import_from_json(self, file_path: str) -> None:
-        with open(file_path, mode='r', encoding='utf-8') as jsonfile:
-            data = json.load(jsonfile)
-            for item in data:
-                self.add_expense(Expense.from_dict(item))
+    @staticmethod
+    def _search_text(expense: Expense) -> str:
+        return f"{expense.description} {expense.category}"
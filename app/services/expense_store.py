@@ -0,0 +1,430 @@
+"""
+In-memory expense store.
+Keeps expenses in a primary id map with secondary indexes on user, category and day.
+"""
+
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, MutableSequence, Optional, Tuple
+from datetime import date, datetime
+from bisect import bisect_left, bisect_right
+from threading import Lock
+import functools
+import heapq
+from app.models.expense import Expense
+from app.utils.helpers import normalize_text
+
+
+@functools.lru_cache(maxsize=4096)
+def category_key(category: str) -> str:
+    """Normalized form of a category used as index key (memoized: there are few distinct categories)."""
+    return normalize_text(category)
+
+
+def day_key(value) -> date:
+    """Calendar day of an expense date (datetime or date)."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+class SortedDateIndex:
+    """
+    Expense ids kept ordered by (date, id) in two parallel sequences.
+
+    Range queries bisect the date column, so they cost O(log n + k); the
+    most recent N ids are the tail of the sequence. Any sequence type that
+    supports `insert`, `pop` and slicing works, e.g. lists or typed arrays.
+    Out-of-order bulk inserts are buffered and merged with a single sort on
+    the next read, so a large import costs one sort instead of one merge
+    per batch. That merge runs under a private lock, so concurrent readers
+    can share the index.
+    """
+
+    def __init__(self, stamps: Optional[MutableSequence] = None, ids: Optional[MutableSequence] = None):
+        self._stamps = stamps if stamps is not None else []
+        self._ids = ids if ids is not None else []
+        self._pending: List[Tuple] = []
+        self._flush_lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._pending)
+
+    def add(self, stamp, expense_id: int) -> None:
+        if self._pending:
+            self._pending.append((stamp, expense_id))
+            return
+        if not self._stamps or (stamp, expense_id) > (self._stamps[-1], self._ids[-1]):
+            self._stamps.append(stamp)
+            self._ids.append(expense_id)
+            return
+        position = self._position(stamp, expense_id)
+        self._stamps.insert(position, stamp)
+        self._ids.insert(position, expense_id)
+
+    def add_many(self, pairs: Iterable[Tuple]) -> None:
+        """Add (stamp, id) pairs; batches that do not extend the tail are buffered."""
+        pairs = sorted(pairs)
+        if not pairs:
+            return
+        if not self._pending and (not self._stamps or pairs[0] > (self._stamps[-1], self._ids[-1])):
+            self._stamps.extend(stamp for stamp, _ in pairs)
+            self._ids.extend(expense_id for _, expense_id in pairs)
+        else:
+            self._pending.extend(pairs)
+
+    def remove(self, stamp, expense_id: int) -> None:
+        self._flush()
+        position = self._position(stamp, expense_id) - 1
+        if position >= 0 and self._stamps[position] == stamp and self._ids[position] == expense_id:
+            self._stamps.pop(position)
+            self._ids.pop(position)
+
+    def between(self, start, end) -> List[int]:
+        """Ids with start <= date <= end, oldest first."""
+        self._flush()
+        lo = bisect_left(self._stamps, start)
+        hi = bisect_right(self._stamps, end, lo)
+        return list(self._ids[lo:hi])
+
+    def latest(self, limit: int) -> List[int]:
+        """The `limit` most recent ids, newest first."""
+        self._flush()
+        if limit <= 0:
+            return []
+        return list(reversed(self._ids[-limit:]))
+
+    def page(self, limit: int, after: Optional[Tuple] = None, start=None, end=None) -> List[int]:
+        """
+        Up to `limit` ids in (date, id) order that sort after the `after`
+        (stamp, id) key and fall within [start, end]; O(log n + limit).
+        """
+        self._flush()
+        position = 0 if after is None else self._position(*after)
+        if start is not None:
+            position = max(position, bisect_left(self._stamps, start))
+        stop = min(position + max(limit, 0), len(self._ids))
+        if end is not None:
+            stop = min(stop, bisect_right(self._stamps, end, position))
+        return list(self._ids[position:stop])
+
+    def count(self, start=None, end=None) -> int:
+        """Number of ids with start <= date <= end (either bound may be open)."""
+        self._flush()
+        lo = 0 if start is None else bisect_left(self._stamps, start)
+        hi = len(self._stamps) if end is None else bisect_right(self._stamps, end, lo)
+        return max(hi - lo, 0)
+
+    def bounds(self) -> Optional[Tuple]:
+        """Earliest and latest date, or None when empty."""
+        self._flush()
+        if not self._stamps:
+            return None
+        return self._stamps[0], self._stamps[-1]
+
+    def clear(self) -> None:
+        del self._stamps[:]
+        del self._ids[:]
+        self._pending = []
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self._flush_lock:
+            if not self._pending:
+                return
+            merged = list(zip(self._stamps, self._ids))
+            merged.extend(self._pending)
+            merged.sort()
+            del self._stamps[:]
+            del self._ids[:]
+            self._stamps.extend(stamp for stamp, _ in merged)
+            self._ids.extend(expense_id for _, expense_id in merged)
+            # Cleared last: readers that see no pending pairs read a merged index.
+            self._pending = []
+
+    def _position(self, stamp, expense_id: int) -> int:
+        """Index just past the (stamp, id) key; ids with equal stamps are kept sorted."""
+        lo = bisect_left(self._stamps, stamp)
+        hi = bisect_right(self._stamps, stamp, lo)
+        return bisect_right(self._ids, expense_id, lo, hi)
+
+
+class KeyedDateIndex:
+    """
+    One `SortedDateIndex` per key (a user id or a category key), created on
+    first use and dropped once empty. Lets a filtered page walk only the
+    expenses of one user or category from the cursor instead of all of them.
+    """
+
+    def __init__(self, factory: Callable[[], SortedDateIndex] = SortedDateIndex):
+        self._factory = factory
+        self._indexes: Dict[Hashable, SortedDateIndex] = {}
+
+    def get(self, key) -> Optional[SortedDateIndex]:
+        return self._indexes.get(key)
+
+    def count(self, key) -> int:
+        index = self._indexes.get(key)
+        return 0 if index is None else len(index)
+
+    def add(self, key, stamp, expense_id: int) -> None:
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = self._factory()
+        index.add(stamp, expense_id)
+
+    def add_many(self, triples: Iterable[Tuple]) -> None:
+        """Add (key, stamp, id) triples, one `add_many` per key."""
+        groups: Dict[Hashable, List[Tuple]] = {}
+        for key, stamp, expense_id in triples:
+            groups.setdefault(key, []).append((stamp, expense_id))
+        for key, pairs in groups.items():
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = self._factory()
+            index.add_many(pairs)
+
+    def remove(self, key, stamp, expense_id: int) -> None:
+        index = self._indexes.get(key)
+        if index is not None:
+            index.remove(stamp, expense_id)
+            if not len(index):
+                del self._indexes[key]
+
+    def values(self) -> Iterable[SortedDateIndex]:
+        return self._indexes.values()
+
+
+def keyset_page(keys: Iterable[Tuple], limit: int, after: Optional[Tuple] = None,
+                start=None, end=None) -> List[int]:
+    """
+    Ids of the `limit` smallest (stamp, id) keys after `after` and within
+    [start, end], for candidate sets that have no date ordering of their own.
+    """
+    if after is not None:
+        keys = (key for key in keys if key > after)
+    if start is not None:
+        keys = (key for key in keys if key[0] >= start)
+    if end is not None:
+        keys = (key for key in keys if key[0] <= end)
+    return [expense_id for _, expense_id in heapq.nsmallest(max(limit, 0), keys)]
+
+
+class ExpenseStore:
+    """
+    Primary id -> expense map plus secondary indexes, including a
+    date-ordered index for range and "most recent" queries, and one per
+    user and per category for filtered pages.
+
+    Secondary indexes map a key to an insertion-ordered dict of ids, so that
+    lookups, inserts and deletes are all O(1) and results keep insertion order.
+    Expenses held by the store must be mutated through `update` or `mutate` so the
+    indexes stay consistent.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, Expense] = {}
+        self._by_user: Dict[int, Dict[int, None]] = {}
+        self._by_category: Dict[str, Dict[int, None]] = {}
+        self._by_day: Dict[date, Dict[int, None]] = {}
+        self._by_date = SortedDateIndex()
+        self._dates_by_user = KeyedDateIndex()
+        self._dates_by_category = KeyedDateIndex()
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Expense]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, expense_id: int) -> bool:
+        return expense_id in self._by_id
+
+    def add(self, expense: Expense) -> Expense:
+        """Insert an expense, assigning the next free id when it has none."""
+        if expense.id is None:
+            expense.id = self._next_id
+        elif expense.id in self._by_id:
+            raise ValueError(f"Expense with id {expense.id} already exists")
+        self._next_id = max(self._next_id, expense.id + 1)
+        self._by_id[expense.id] = expense
+        self._index(expense)
+        return expense
+
+    def add_many(self, expenses: List[Expense]) -> List[Expense]:
+        """Insert a batch of expenses, updating the date indexes once for the batch."""
+        by_id = self._by_id
+        given = [e.id for e in expenses if e.id is not None]
+        if len(set(given)) != len(given) or any(i in by_id for i in given):
+            raise ValueError("Batch contains duplicate or existing expense ids")
+        for expense in expenses:
+            if expense.id is None:
+                expense.id = self._next_id
+            self._next_id = max(self._next_id, expense.id + 1)
+            by_id[expense.id] = expense
+            self._index_keys(expense)
+        self._by_date.add_many((e.date, e.id) for e in expenses)
+        self._dates_by_user.add_many((e.user_id, e.date, e.id) for e in expenses)
+        self._dates_by_category.add_many((category_key(e.category), e.date, e.id) for e in expenses)
+        return expenses
+
+    def get(self, expense_id: int) -> Optional[Expense]:
+        return self._by_id.get(expense_id)
+
+    def ids(self) -> List[int]:
+        """Snapshot of all ids, safe to iterate while the store changes."""
+        return list(self._by_id)
+
+    def remove(self, expense_id: int) -> Optional[Expense]:
+        """Remove and return an expense, or None if the id is unknown."""
+        expense = self._by_id.pop(expense_id, None)
+        if expense is not None:
+            self._unindex(expense)
+        return expense
+
+    def update(self, expense_id: int, **updates) -> Optional[Expense]:
+        """Apply field updates to a stored expense and refresh its index entries."""
+        expense = self._by_id.get(expense_id)
+        if expense is None:
+            return None
+        updates.pop("id", None)
+        self._unindex(expense)
+        try:
+            expense.update(**updates)
+        finally:
+            self._index(expense)
+        return expense
+
+    def mutate(self, expense_id: int, func) -> Optional[Expense]:
+        """Run `func(expense)` on a stored expense while keeping indexes consistent."""
+        expense = self._by_id.get(expense_id)
+        if expense is None:
+            return None
+        self._unindex(expense)
+        try:
+            func(expense)
+        finally:
+            self._index(expense)
+        return expense
+
+    def mutate_many(self, ids: Iterable[int], func) -> List[Tuple[Expense, Expense]]:
+        """`mutate` each known id; returns (before, after) pairs."""
+        changed = []
+        for expense_id in ids:
+            expense = self._by_id.get(expense_id)
+            if expense is not None:
+                before = expense.clone(expense_id)
+                changed.append((before, self.mutate(expense_id, func)))
+        return changed
+
+    def remove_many(self, ids: Iterable[int]) -> List[Expense]:
+        """Remove the known ids and return the removed expenses."""
+        removed = (self.remove(expense_id) for expense_id in ids)
+        return [expense for expense in removed if expense is not None]
+
+    def get_many(self, ids: Iterable[int]) -> List[Expense]:
+        by_id = self._by_id
+        return [by_id[i] for i in ids if i in by_id]
+
+    def ids_for_user(self, user_id: int) -> List[int]:
+        return list(self._by_user.get(user_id, ()))
+
+    def ids_for_category(self, category: str) -> List[int]:
+        return list(self._by_category.get(category_key(category), ()))
+
+    def ids_for_day(self, day: date) -> List[int]:
+        return list(self._by_day.get(day_key(day), ()))
+
+    def count_for_user(self, user_id: int) -> int:
+        return len(self._by_user.get(user_id, ()))
+
+    def count_for_category(self, category: str) -> int:
+        return len(self._by_category.get(category_key(category), ()))
+
+    def count_between(self, start: Optional[datetime], end: Optional[datetime]) -> int:
+        return self._by_date.count(start, end)
+
+    def by_user(self, user_id: int) -> List[Expense]:
+        return self.get_many(self._by_user.get(user_id, ()))
+
+    def by_category(self, category: str) -> List[Expense]:
+        return self.get_many(self._by_category.get(category_key(category), ()))
+
+    def by_day(self, day: date) -> List[Expense]:
+        return self.get_many(self._by_day.get(day_key(day), ()))
+
+    def categories(self) -> List[str]:
+        return list(self._by_category)
+
+    def between(self, start: datetime, end: datetime) -> List[Expense]:
+        """Expenses dated within [start, end], oldest first."""
+        return self.get_many(self._by_date.between(start, end))
+
+    def recent(self, limit: int) -> List[Expense]:
+        """The `limit` most recent expenses, newest first."""
+        return self.get_many(self._by_date.latest(limit))
+
+    def page(self, limit: int, after: Optional[Tuple[datetime, int]] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None,
+             ids: Optional[Iterable[int]] = None, category: Optional[str] = None,
+             user_id: Optional[int] = None) -> List[Expense]:
+        """
+        Up to `limit` expenses in (date, id) order after the keyset `after`,
+        within [start, end] and, when given, restricted to `ids`. A `category`
+        or `user_id` walks that key's date index, so the cost is bounded by
+        the page rather than by the number of matching expenses.
+        """
+        if ids is None:
+            index = self._date_index(category, user_id)
+            return [] if index is None else self.get_many(index.page(limit, after, start, end))
+        by_id = self._by_id
+        keys = ((by_id[i].date, i) for i in ids if i in by_id)
+        return self.get_many(keyset_page(keys, limit, after, start, end))
+
+    def date_bounds(self) -> Optional[Tuple[datetime, datetime]]:
+        return self._by_date.bounds()
+
+    def total_amount(self) -> float:
+        return sum(e.amount for e in self._by_id.values())
+
+    def amount_by_category(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for expense in self._by_id.values():
+            totals[expense.category] = totals.get(expense.category, 0.0) + expense.amount
+        return totals
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _date_index(self, category: Optional[str], user_id: Optional[int]) -> Optional[SortedDateIndex]:
+        if category is not None:
+            return self._dates_by_category.get(category_key(category))
+        if user_id is not None:
+            return self._dates_by_user.get(user_id)
+        return self._by_date
+
+    def _index(self, expense: Expense) -> None:
+        self._index_keys(expense)
+        self._by_date.add(expense.date, expense.id)
+        self._dates_by_user.add(expense.user_id, expense.date, expense.id)
+        self._dates_by_category.add(category_key(expense.category), expense.date, expense.id)
+
+    def _index_keys(self, expense: Expense) -> None:
+        expense_id = expense.id
+        self._by_user.setdefault(expense.user_id, {})[expense_id] = None
+        self._by_category.setdefault(category_key(expense.category), {})[expense_id] = None
+        self._by_day.setdefault(day_key(expense.date), {})[expense_id] = None
+
+    def _unindex(self, expense: Expense) -> None:
+        expense_id = expense.id
+        self._by_date.remove(expense.date, expense_id)
+        self._dates_by_user.remove(expense.user_id, expense.date, expense_id)
+        self._dates_by_category.remove(category_key(expense.category), expense.date, expense_id)
+        for index, key in (
+            (self._by_user, expense.user_id),
+            (self._by_category, category_key(expense.category)),
+            (self._by_day, day_key(expense.date)),
+        ):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(expense_id, None)
+                if not bucket:
+                    del index[key]
@@ -0,0 +1,61 @@
+"""
+Streaming expense exporters.
+Render expenses as CSV or JSON in bounded-size text chunks.
+"""
+
+from itertools import islice
+from typing import Iterable, Iterator, List
+import csv
+import io
+import json
+from app.models.expense import Expense
+from app.utils.helpers import format_dates, format_rows
+
+EXPORT_FIELDS = ["id", "user_id", "amount", "category", "description", "date"]
+DEFAULT_CHUNK_SIZE = 1000
+# One JSON object per row; category and description are filled in already JSON-encoded.
+JSON_ROW = '{{"id":{},"user_id":{},"amount":{},"category":{},"description":{},"date":"{}"}}'
+
+
+def iter_csv(expenses: Iterable[Expense], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield CSV text (header first) in chunks of at most `chunk_size` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in _chunks(expenses, chunk_size):
+        dates = format_dates([e.date for e in chunk])
+        writer.writerows([(e.id, e.user_id, e.amount, e.category, e.description, d) for e, d in zip(chunk, dates)])
+        yield _drain(buffer)
+    tail = _drain(buffer)
+    if tail:
+        yield tail
+
+
+def iter_json(expenses: Iterable[Expense], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield a compact JSON array of expense dicts in chunks of at most `chunk_size` rows."""
+    dumps = json.dumps
+    opening = "["
+    for chunk in _chunks(expenses, chunk_size):
+        rows = format_rows(
+            JSON_ROW, [e.id for e in chunk], [e.user_id for e in chunk], [e.amount for e in chunk],
+            [dumps(e.category) for e in chunk], [dumps(e.description) for e in chunk],
+            format_dates([e.date for e in chunk]),
+        )
+        yield opening + ",".join(rows)
+        opening = ","
+    yield "[]" if opening == "[" else "]"
+
+
+def _chunks(expenses: Iterable[Expense], size: int) -> Iterator[List[Expense]]:
+    rows = iter(expenses)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def _drain(buffer: io.StringIO) -> str:
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
@@ -0,0 +1,188 @@
+"""
+Streaming expense importers.
+Read records from JSON arrays, NDJSON or CSV without loading the whole file,
+and validate them in batches.
+"""
+
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+from itertools import islice
+import csv
+import json
+from app.models.expense import Expense
+from app.utils.helpers import parse_dates
+
+DEFAULT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 1 << 16
+# A JSON decode error this close to the end of the buffer may just be a cut-off literal or number.
+TRUNCATION_MARGIN = 32
+FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+
+@dataclass
+class RowError:
+    row: int
+    message: str
+
+
+@dataclass
+class MalformedRecord:
+    """Stands in for a record the reader could not decode, so it is reported as a row error."""
+    message: str
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+def detect_format(file_path: str) -> str:
+    """Import format from the file extension (json, ndjson or csv)."""
+    for extension, fmt in FORMATS.items():
+        if file_path.lower().endswith(extension):
+            return fmt
+    raise ValueError(f"Cannot detect import format of {file_path}")
+
+
+def iter_records(fp: IO[str], fmt: str) -> Iterator[dict]:
+    if fmt == "json":
+        return iter_json_array(fp)
+    if fmt == "ndjson":
+        return iter_ndjson(fp)
+    if fmt == "csv":
+        return csv.DictReader(fp)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def iter_json_array(fp: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yield the elements of a top-level JSON array, reading the file in chunks.
+    A malformed element is yielded as a MalformedRecord and ends the array,
+    since the position of the next element cannot be known.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, element = "", 0, 0
+    failed_at = None  # offset within the current element of the last decode error
+
+    def fill() -> bool:
+        nonlocal buffer, pos
+        more = fp.read(chunk_size)
+        buffer, pos = buffer[pos:] + more, 0
+        return bool(more)
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos < len(buffer):
+            break
+        if not fill():
+            return
+    if buffer[pos] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buffer):
+            if not fill():
+                raise ValueError("Unexpected end of JSON array")
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # An element cut off by the end of the buffer fails further along once more is read,
+            # or at the same place inside a long string or a short literal near the end. An error
+            # that stays put is malformed input, reported without reading the rest of the file.
+            offset = e.pos - pos
+            truncated = (offset != failed_at or e.msg.startswith("Unterminated string")
+                         or len(buffer) - e.pos < TRUNCATION_MARGIN)
+            if truncated and fill():
+                failed_at = offset
+                continue
+            yield MalformedRecord(f"element {element + 1}: {e.msg}; the rest of the array was not read")
+            return
+        failed_at = None
+        element += 1
+        yield item
+        pos = end
+
+
+def iter_ndjson(fp: IO[str]) -> Iterator[dict]:
+    for number, line in enumerate(fp, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = MalformedRecord(f"line {number}: {e.msg}")
+        yield record
+
+
+def batched(records: Iterable[dict], batch_size: int) -> Iterator[List[dict]]:
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_batch(records: List[dict], first_row: int = 1) -> Tuple[List[Expense], List[int], List[RowError]]:
+    """
+    Convert raw records to expenses.
+    Returns the valid expenses, their row numbers and the per-row errors.
+    """
+    expenses: List[Expense] = []
+    rows: List[int] = []
+    errors: List[RowError] = []
+    # The date column is parsed in one call; rows it cannot parse are re-read by parse_record for the message.
+    dates = parse_dates([record.get("date") if isinstance(record, dict) else None for record in records],
+                        errors="coerce")
+    for row, (record, date) in enumerate(zip(records, dates), start=first_row):
+        if isinstance(record, MalformedRecord):
+            errors.append(RowError(row, record.message))
+            continue
+        try:
+            expense = parse_record(record, date)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            errors.append(RowError(row, message))
+            continue
+        if not expense.is_valid():
+            errors.append(RowError(row, "Invalid expense data"))
+            continue
+        expenses.append(expense)
+        rows.append(row)
+    return expenses, rows, errors
+
+
+def _required(record: dict, name: str):
+    value = record[name]
+    if value is None:  # a null, or a column missing from a short CSV row
+        raise KeyError(name)
+    return value
+
+
+def parse_record(record: dict, date: Optional[datetime] = None) -> Expense:
+    """`date` is the record's already parsed date, if the caller has it."""
+    raw_id = record.get("id")
+    if date is None:
+        raw_date = _required(record, "date")
+        date = raw_date if isinstance(raw_date, datetime) else datetime.fromisoformat(raw_date)
+    return Expense(
+        id=int(raw_id) if raw_id not in (None, "") else None,
+        user_id=int(_required(record, "user_id")),
+        amount=float(_required(record, "amount")),
+        category=str(_required(record, "category")),
+        description=str(_required(record, "description")),
+        date=date,
+    )
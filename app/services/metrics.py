@@ -0,0 +1,217 @@
+"""
+In-process metrics with Prometheus text exposition.
+Counters, gauges and fixed-bucket histograms keep one small state list per
+label combination behind a lock, so recording costs a dictionary lookup and
+a few additions. Callback metrics are evaluated only when scraped.
+"""
+
+from bisect import bisect_left
+from threading import Lock, local
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import time
+
+# Seconds; suits in-memory operations (sub-millisecond) up to slow exports.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = Lock()
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        """(sample name, labels, value) triples for exposition."""
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+    def _labels(self, key: Tuple[str, ...], *extra: Tuple[str, str]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, key)) + extra
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Callback(Metric):
+    """A gauge or counter whose value is read from `func()` at scrape time."""
+
+    def __init__(self, name: str, documentation: str, func: Callable[[], float], kind: str = "gauge"):
+        super().__init__(name, documentation)
+        self.func = func
+        self.kind = kind
+
+    def samples(self):
+        return [(self.name, (), float(self.func()))]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Per label set: a count for each bucket (non-cumulative) and +Inf, then the sum.
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, *labels: str) -> int:
+        state = self._values.get(labels)
+        return sum(state[:-1]) if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        samples = []
+        for key, state in items:
+            cumulative = 0
+            for bound, observed in zip(self.buckets + (math.inf,), state):
+                cumulative += observed
+                samples.append((f"{self.name}_bucket", self._labels(key, ("le", _number(bound))), cumulative))
+            samples.append((f"{self.name}_sum", self._labels(key), state[-1]))
+            samples.append((f"{self.name}_count", self._labels(key), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics; asking for an existing name returns the metric already registered."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def callback(self, name: str, documentation: str, func: Callable[[], float], kind: str = "gauge") -> Callback:
+        """Register `func` as the source of a gauge or counter, replacing any previous callback of that name."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is not None and not isinstance(metric, Callback):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            metric = self._metrics[name] = Callback(name, documentation, func, kind)
+            return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quote=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{label}="{_escape(text)}"' for label, text in labels)
+                    name = f"{name}{{{rendered}}}"
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, cls, name, documentation, labelnames, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, *args)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric
+
+
+class ServiceMetrics:
+    """
+    Operation timings for an ExpenseService, recorded by its @reads/@writes
+    methods. Only the outermost call on a thread is timed, so a method that
+    calls another is counted once; the time includes waiting for the lock.
+    """
+
+    def __init__(self, registry: "MetricsRegistry", prefix: str = "expense_service"):
+        self.operations = registry.histogram(f"{prefix}_operation_seconds",
+                                             "ExpenseService operation latency", ("operation",))
+        self.errors = registry.counter(f"{prefix}_operation_errors_total",
+                                       "ExpenseService operations that raised", ("operation",))
+        self._local = local()
+
+    def start(self) -> Optional[float]:
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        return time.perf_counter() if depth == 0 else None
+
+    def stop(self, operation: str, started: Optional[float], failed: bool = False) -> None:
+        self._local.depth -= 1
+        if started is not None:
+            self.operations.observe(time.perf_counter() - started, operation)
+            if failed:
+                self.errors.inc(operation)
+
+
+def instrument_service(service, registry: "MetricsRegistry", prefix: str = "expense_service") -> None:
+    """Time `service`'s operations and export its store size and cache statistics."""
+    service.metrics = ServiceMetrics(registry, prefix)
+    registry.callback(f"{prefix}_store_size", "Expenses held by the store", lambda: len(service.store))
+    cache = service.cache
+    if cache is not None:
+        registry.callback(f"{prefix}_cache_hits_total", "Response cache hits",
+                          lambda: cache.stats.hits, kind="counter")
+        registry.callback(f"{prefix}_cache_misses_total", "Response cache misses",
+                          lambda: cache.stats.misses, kind="counter")
+        registry.callback(f"{prefix}_cache_hit_ratio", "Response cache hits per lookup",
+                          lambda: cache.stats.as_dict()["hit_rate"])
+
+
+def _escape(text: str, quote: bool = True) -> str:
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quote else text
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+# Process-wide registry served at /metrics.
+REGISTRY = MetricsRegistry()
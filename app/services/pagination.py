@@ -0,0 +1,53 @@
+"""
+Keyset pagination and field projection for expense listings.
+Pages are ordered by (date, id); the cursor is an opaque token holding the
+key of the last row served, so each page costs the same however deep it is.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from datetime import datetime
+import base64
+from app.models.expense import Expense
+from app.services.exporters import EXPORT_FIELDS
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+@dataclass
+class Page:
+    items: List[Expense] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(expense: Expense) -> str:
+    raw = f"{expense.date.isoformat()}|{expense.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """The (date, id) key in a cursor; raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        stamp, expense_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(stamp), int(expense_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Comma-separated projection, e.g. "id,amount,date"; None means every field."""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names or None
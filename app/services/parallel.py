@@ -0,0 +1,201 @@
+"""
+Parallel analytics over large ledgers.
+Columns are copied once into shared memory; worker processes aggregate row
+ranges of them in place and send back small partial results (per-category
+and per-day sums), which are merged here. Expenses themselves are never
+pickled, and small inputs are aggregated in-process.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import date, timedelta
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+import os
+from app.services.columnar_store import Columns
+from app.utils.helpers import EPOCH
+
+try:  # NumPy is optional; without it the same operations run as plain loops.
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+DAY_MICROS = 86_400_000_000
+# Below this many rows the process pool costs more than it saves.
+PARALLEL_THRESHOLD = 200_000
+# Column order shared by the in-process path and the shared-memory workers.
+COLUMN_NAMES = ("amounts", "codes", "timestamps", "user_ids")
+
+
+@dataclass
+class Partial:
+    """Aggregates over some rows: sum and count per category code, sum per day number."""
+
+    sums: Dict[int, float] = field(default_factory=dict)
+    counts: Dict[int, int] = field(default_factory=dict)
+    days: Dict[int, float] = field(default_factory=dict)
+
+    def merge(self, other: "Partial") -> "Partial":
+        for mine, theirs in ((self.sums, other.sums), (self.counts, other.counts), (self.days, other.days)):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+        return self
+
+
+def aggregate_rows(amounts: Sequence[float], codes: Sequence[int], timestamps: Sequence[int],
+                   user_ids: Sequence[int], start: int, stop: int, user_id: Optional[int] = None,
+                   first_day: Optional[int] = None, last_day: Optional[int] = None) -> Partial:
+    """
+    Aggregate rows [start, stop) of the columns, keeping only `user_id` when
+    given and days numbered within [first_day, last_day] (days since the epoch).
+    """
+    if np is not None:
+        return _aggregate_numpy(amounts, codes, timestamps, user_ids, start, stop, user_id, first_day, last_day)
+    partial = Partial()
+    sums, counts, days = partial.sums, partial.counts, partial.days
+    for row in range(start, stop):
+        if user_id is not None and user_ids[row] != user_id:
+            continue
+        day = timestamps[row] // DAY_MICROS
+        if (first_day is not None and day < first_day) or (last_day is not None and day > last_day):
+            continue
+        amount, code = amounts[row], codes[row]
+        sums[code] = sums.get(code, 0.0) + amount
+        counts[code] = counts.get(code, 0) + 1
+        days[day] = days.get(day, 0.0) + amount
+    return partial
+
+
+def _aggregate_numpy(amounts, codes, timestamps, user_ids, start, stop, user_id, first_day, last_day) -> Partial:
+    amounts = np.frombuffer(amounts, dtype=np.float64)[start:stop]
+    codes = np.frombuffer(codes, dtype=np.int32)[start:stop]
+    days = np.frombuffer(timestamps, dtype=np.int64)[start:stop] // DAY_MICROS
+    keep = np.ones(len(amounts), dtype=bool)
+    if user_id is not None:
+        keep &= np.frombuffer(user_ids, dtype=np.int64)[start:stop] == user_id
+    if first_day is not None:
+        keep &= days >= first_day
+    if last_day is not None:
+        keep &= days <= last_day
+    if not keep.all():
+        amounts, codes, days = amounts[keep], codes[keep], days[keep]
+    if not len(amounts):
+        return Partial()
+    sums = np.bincount(codes, weights=amounts)
+    counts = np.bincount(codes)
+    present = np.flatnonzero(counts)
+    unique_days, positions = np.unique(days, return_inverse=True)
+    day_sums = np.bincount(positions, weights=amounts)
+    return Partial(
+        {int(code): float(sums[code]) for code in present},
+        {int(code): int(counts[code]) for code in present},
+        dict(zip(unique_days.tolist(), day_sums.tolist())),
+    )
+
+
+def _aggregate_shared(blocks: List[Tuple[str, str]], start: int, stop: int, user_id: Optional[int],
+                      first_day: Optional[int], last_day: Optional[int]) -> Partial:
+    """Worker task: attach to the shared column blocks and aggregate rows [start, stop)."""
+    attached = [SharedMemory(name=name) for name, _ in blocks]
+    views = [shm.buf.cast(typecode) for shm, (_, typecode) in zip(attached, blocks)]
+    try:
+        return aggregate_rows(*views, start, stop, user_id, first_day, last_day)
+    finally:
+        for view in views:
+            view.release()
+        for shm in attached:
+            shm.close()
+
+
+class ParallelAnalytics:
+    """
+    Company-wide reports computed in a process pool.
+
+    `workers` defaults to the CPU count. Inputs shorter than `threshold`
+    rows, or a single worker, are aggregated in-process with the same code.
+    The pool is started on first use and kept until `close()`.
+    """
+
+    def __init__(self, workers: Optional[int] = None, threshold: int = PARALLEL_THRESHOLD):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.threshold = threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParallelAnalytics":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def aggregate(self, columns: Columns, user_id: Optional[int] = None,
+                  start_date: Optional[date] = None, end_date: Optional[date] = None) -> Partial:
+        """Merged per-category and per-day aggregates, optionally for one user and a date range."""
+        first_day = None if start_date is None else (start_date - EPOCH.date()).days
+        last_day = None if end_date is None else (end_date - EPOCH.date()).days
+        rows = len(columns)
+        # Empty columns stay in-process too: shared memory blocks cannot be zero-sized.
+        if self.workers == 1 or rows < self.threshold or not rows:
+            arrays = [getattr(columns, name) for name in COLUMN_NAMES]
+            return aggregate_rows(*arrays, 0, rows, user_id, first_day, last_day)
+        return self._aggregate_parallel(columns, user_id, first_day, last_day)
+
+    def amount_by_category(self, columns: Columns, **filters) -> Dict[str, float]:
+        partial = self.aggregate(columns, **filters)
+        totals: Dict[str, float] = {}
+        for code, total in partial.sums.items():
+            category = columns.categories[code]
+            totals[category] = totals.get(category, 0.0) + total
+        return totals
+
+    def top_categories(self, columns: Columns, limit: int = 5, **filters) -> List[dict]:
+        ranked = sorted(self.amount_by_category(columns, **filters).items(), key=lambda item: (-item[1], item[0]))
+        return [{"category": category, "total_amount": total} for category, total in ranked[:max(limit, 0)]]
+
+    def daily_totals(self, columns: Columns, **filters) -> Dict[date, float]:
+        """Total per day that has expenses, oldest first."""
+        days = self.aggregate(columns, **filters).days
+        return {EPOCH.date() + timedelta(days=day): days[day] for day in sorted(days)}
+
+    def peak_day(self, columns: Columns, **filters) -> dict:
+        days = self.aggregate(columns, **filters).days
+        if not days:
+            return {"date": None, "total_amount": 0.0}
+        day = min(days, key=lambda d: (-days[d], d))
+        return {"date": EPOCH.date() + timedelta(days=day), "total_amount": days[day]}
+
+    def _aggregate_parallel(self, columns: Columns, user_id, first_day, last_day) -> Partial:
+        rows = len(columns)
+        blocks: List[SharedMemory] = []
+        try:
+            for name in COLUMN_NAMES:
+                column = getattr(columns, name)
+                shm = SharedMemory(create=True, size=len(column) * column.itemsize)
+                blocks.append(shm)
+                shm.buf[:len(column) * column.itemsize] = memoryview(column).cast("B")
+            # The OS may round a block up; workers slice by row, so the extra bytes are never read.
+            spec = [(shm.name, getattr(columns, name).typecode) for shm, name in zip(blocks, COLUMN_NAMES)]
+            step = -(-rows // self.workers)
+            futures = [
+                self._executor().submit(_aggregate_shared, spec, start, min(start + step, rows),
+                                        user_id, first_day, last_day)
+                for start in range(0, rows, step)
+            ]
+            merged = Partial()
+            for future in futures:
+                merged.merge(future.result())
+            return merged
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+        return self._pool
@@ -0,0 +1,375 @@
+"""
+Durable storage for the in-memory ExpenseService.
+Every write is appended to a log of compact binary records. A checkpoint
+writes a columnar snapshot and deletes the log segments it covers, so a
+restart maps the latest snapshot and replays only the log written since.
+"""
+
+from array import array
+from contextlib import contextmanager
+from threading import Condition, Event, Lock, Thread
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import gc
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from app.models.expense import Expense
+from app.utils.helpers import from_micros, to_micros
+
+# When appended records are forced to disk: on every write ("always"); by
+# group commit, where writers wait and one fsync covers every record written
+# while the previous one ran ("group"); by a background thread every
+# `sync_interval` seconds without waiting for it ("interval"); or only when the
+# OS decides ("never"). Records always reach the OS at once. "always" and
+# "group" acknowledge a write only once it is on disk; "interval" and "never"
+# are lossy: a power loss can drop writes that were already acknowledged.
+FSYNC_POLICIES = ("always", "group", "interval", "never")
+
+PUT, DELETE = 1, 2
+RECORD_HEADER = struct.Struct("<IIB")  # crc32 of kind and body, body length, kind
+EXPENSE_BODY = struct.Struct("<qqdqII")  # id, user_id, amount, timestamp, category and description byte lengths
+DELETE_BODY = struct.Struct("<q")  # id
+
+SNAPSHOT_MAGIC = b"EXPSNAP1"
+SNAPSHOT_HEADER = struct.Struct("<8sQQQ")  # magic, last covered segment, rows, categories
+SEGMENT_NAME = re.compile(r"wal-(\d+)\.log$")
+SNAPSHOT_NAME = re.compile(r"snapshot-(\d+)\.bin$")
+
+
+def encode_put(expense: Expense) -> bytes:
+    category, description = expense.category.encode(), expense.description.encode()
+    body = EXPENSE_BODY.pack(expense.id, expense.user_id, expense.amount, to_micros(expense.date),
+                             len(category), len(description)) + category + description
+    return _record(PUT, body)
+
+
+def encode_delete(expense_id: int) -> bytes:
+    return _record(DELETE, DELETE_BODY.pack(expense_id))
+
+
+def _record(kind: int, body: bytes) -> bytes:
+    crc = zlib.crc32(body, zlib.crc32(bytes((kind,))))
+    return RECORD_HEADER.pack(crc, len(body), kind) + body
+
+
+def read_records(path: str) -> Iterator[Tuple[int, object]]:
+    """
+    (PUT, Expense) and (DELETE, id) records of one log segment, in order.
+    Reading stops at the first incomplete or corrupt record: a write torn by
+    a crash never completed, so nothing after it was acknowledged.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offset, end = 0, len(data)
+    while offset + RECORD_HEADER.size <= end:
+        crc, length, kind = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        body = data[start:start + length]
+        if len(body) < length or zlib.crc32(body, zlib.crc32(bytes((kind,)))) != crc:
+            return
+        offset = start + length
+        if kind == DELETE:
+            yield DELETE, DELETE_BODY.unpack(body)[0]
+            continue
+        expense_id, user_id, amount, stamp, category_length, description_length = EXPENSE_BODY.unpack_from(body)
+        text = EXPENSE_BODY.size + category_length
+        yield PUT, Expense(
+            id=expense_id,
+            user_id=user_id,
+            amount=amount,
+            category=body[EXPENSE_BODY.size:text].decode(),
+            description=body[text:text + description_length].decode(),
+            date=from_micros(stamp),
+        )
+
+
+def encode_snapshot(expenses: Iterable[Expense], segment: int) -> List[bytes]:
+    """
+    A snapshot as a list of byte chunks: a header, then little-endian id,
+    user id, amount, timestamp and category-code columns, then character
+    offsets into one UTF-8 text block holding the category names followed
+    by every description.
+    """
+    ids, user_ids, amounts, stamps, codes = array("q"), array("q"), array("d"), array("q"), array("i")
+    categories: Dict[str, int] = {}
+    descriptions: List[str] = []
+    for expense in expenses:
+        ids.append(expense.id)
+        user_ids.append(expense.user_id)
+        amounts.append(expense.amount)
+        stamps.append(to_micros(expense.date))
+        codes.append(categories.setdefault(expense.category, len(categories)))
+        descriptions.append(expense.description)
+    if len(codes) % 2:
+        codes.append(0)  # pad so the following columns stay 8-byte aligned
+    texts = list(categories) + descriptions
+    offsets = array("q", [0])
+    for text in texts:
+        offsets.append(offsets[-1] + len(text))
+    columns = [ids, user_ids, amounts, stamps, codes, offsets]
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, segment, len(ids), len(categories))
+    return [header] + [column.tobytes() for column in columns] + ["".join(texts).encode()]
+
+
+def read_snapshot(path: str) -> Tuple[int, List[Expense]]:
+    """The last log segment a snapshot covers and its expenses; the columns are read through a memory map."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        magic, segment, rows, category_count = SNAPSHOT_HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not an expense snapshot: {path}")
+        view = memoryview(mapped)
+        columns, position = [], SNAPSHOT_HEADER.size
+        for typecode, length in (("q", rows), ("q", rows), ("d", rows), ("q", rows),
+                                 ("i", rows + rows % 2), ("q", category_count + rows + 1)):
+            size = length * array(typecode).itemsize
+            columns.append(_column(view[position:position + size], typecode))
+            position += size
+        text = bytes(view[position:]).decode()
+        ids, user_ids, amounts, stamps, codes, offsets = columns
+        try:
+            categories = [text[offsets[i]:offsets[i + 1]] for i in range(category_count)]
+            expenses = [
+                Expense(
+                    id=ids[row],
+                    user_id=user_ids[row],
+                    amount=amounts[row],
+                    category=categories[codes[row]],
+                    description=text[offsets[category_count + row]:offsets[category_count + row + 1]],
+                    date=from_micros(stamps[row]),
+                )
+                for row in range(rows)
+            ]
+        finally:
+            for column in columns:
+                if isinstance(column, memoryview):
+                    column.release()
+            view.release()
+    return segment, expenses
+
+
+def _column(view: memoryview, typecode: str):
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    column = array(typecode, view.tobytes())
+    column.byteswap()
+    return column
+
+
+def load_expenses(directory: str) -> Tuple[int, List[Expense]]:
+    """
+    The expenses recorded in `directory`: the latest snapshot plus the log
+    segments after it. Also returns the last segment number found.
+    """
+    if not os.path.isdir(directory):
+        return 0, []
+    snapshots = _numbered(directory, SNAPSHOT_NAME)
+    covered, expenses = read_snapshot(snapshots[-1][1]) if snapshots else (0, [])
+    rows = {expense.id: expense for expense in expenses}
+    last = covered
+    for segment, path in _numbered(directory, SEGMENT_NAME):
+        last = max(last, segment)
+        if segment <= covered:
+            continue
+        for kind, value in read_records(path):
+            if kind == PUT:
+                rows[value.id] = value
+            else:
+                rows.pop(value, None)
+    return last, list(rows.values())
+
+
+@contextmanager
+def gc_paused():
+    """Suspend cyclic garbage collection while loading millions of objects that are all kept."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _numbered(directory: str, pattern) -> List[Tuple[int, str]]:
+    found = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _fsync_directory(directory: str) -> None:
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Append-only log of expense writes, split into numbered segments.
+
+    Each `append` is a single write of all its records, so a batch is
+    replayed either whole or (if torn by a crash) not at all. Opening a log
+    always starts a new segment after the existing ones. When
+    `checkpoint_bytes` is set, the background thread calls `on_full` once
+    the current segment grows past it; the service passes its `checkpoint`.
+    """
+
+    def __init__(self, directory: str, fsync: str = "group", sync_interval: float = 0.05,
+                 checkpoint_bytes: Optional[int] = None, segment: Optional[int] = None):
+        """`segment` is the last segment already on disk; it is looked up when not given."""
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+        self.sync_interval = sync_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.on_full: Optional[Callable[[], object]] = None
+        self._mutex = Lock()
+        self._synced_all = Condition(self._mutex)
+        self._written = 0  # appends so far
+        self._synced = 0  # appends known to be on disk
+        self._syncing = False  # an fsync is running outside the mutex
+        if segment is None:
+            found = _numbered(directory, SNAPSHOT_NAME) + _numbered(directory, SEGMENT_NAME)
+            segment = max((number for number, _ in found), default=0)
+        self._file = self._open_segment(segment + 1)
+        self._stopped = Event()
+        self._thread = None
+        if fsync == "interval" or checkpoint_bytes:
+            self._thread = Thread(target=self._background, name="expense-wal", daemon=True)
+            self._thread.start()
+
+    @property
+    def segment_bytes(self) -> int:
+        return self._file.tell()
+
+    def append(self, puts: Iterable[Expense] = (), deletes: Iterable[int] = (), wait: bool = True) -> None:
+        """
+        Under "group", return once a shared fsync covers the records; with
+        `wait=False` the caller must `commit` before acknowledging them.
+        """
+        data = b"".join([encode_put(expense) for expense in puts] + [encode_delete(i) for i in deletes])
+        if not data:
+            return
+        with self._mutex:
+            self._file.write(data)
+            self._written += 1
+            if self.fsync == "always":
+                os.fsync(self._file.fileno())
+                self._synced = self._written
+            elif self.fsync == "group" and wait:
+                self._wait_synced(self._written)
+
+    def commit(self) -> None:
+        """Under "group", block until everything appended so far is on disk."""
+        if self.fsync == "group":
+            with self._mutex:
+                self._wait_synced(self._written)
+
+    def sync(self) -> None:
+        """Force everything appended so far to disk, whatever the fsync policy."""
+        with self._mutex:
+            self._idle()
+            os.fsync(self._file.fileno())
+            self._mark_synced()
+
+    def rotate(self) -> int:
+        """Seal the current segment and start the next; returns the sealed segment's number."""
+        with self._mutex:
+            self._sync()
+            self._file.close()
+            self._file = self._open_segment(self.segment + 1)
+            return self.segment - 1
+
+    def save_snapshot(self, chunks: List[bytes], segment: int) -> str:
+        """Atomically store a snapshot covering segments up to `segment`, then delete what it replaces."""
+        path = os.path.join(self.directory, f"snapshot-{segment:08d}.bin")
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.writelines(chunks)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        _fsync_directory(self.directory)
+        for number, old in _numbered(self.directory, SNAPSHOT_NAME):
+            if number < segment:
+                os.remove(old)
+        for number, old in _numbered(self.directory, SEGMENT_NAME):
+            if number <= segment:
+                os.remove(old)
+        return path
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._mutex:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def _open_segment(self, segment: int):
+        self.segment = segment
+        path = os.path.join(self.directory, f"wal-{segment:08d}.log")
+        handle = open(path, "ab", buffering=0)
+        _fsync_directory(self.directory)
+        return handle
+
+    def _sync(self) -> None:
+        self._idle()
+        if self._synced < self._written and self.fsync != "never":
+            os.fsync(self._file.fileno())
+            self._mark_synced()
+
+    def _mark_synced(self) -> None:
+        self._synced = self._written
+        self._synced_all.notify_all()
+
+    def _idle(self) -> None:
+        # The file must not be synced again, rotated or closed under a running group fsync.
+        while self._syncing:
+            self._synced_all.wait()
+
+    def _wait_synced(self, target: int) -> None:
+        # The first waiting writer syncs for everyone; records written meanwhile go in the next fsync.
+        while self._synced < target:
+            if self._syncing:
+                self._synced_all.wait()
+                continue
+            covered, fileno = self._written, self._file.fileno()
+            self._syncing = True
+            self._mutex.release()
+            try:
+                os.fsync(fileno)
+            finally:
+                self._mutex.acquire()
+                self._syncing = False
+                self._synced_all.notify_all()
+            self._synced = max(self._synced, covered)
+
+    def _background(self) -> None:
+        while not self._stopped.wait(self.sync_interval):
+            with self._mutex:
+                if self._file.closed:
+                    return
+                self._sync()
+                full = self.checkpoint_bytes and self._file.tell() >= self.checkpoint_bytes
+            if full and self.on_full is not None:
+                # A failed checkpoint must not end the thread: syncing and later checkpoints depend on it.
+                try:
+                    self.on_full()
+                except Exception as e:
+                    logging.error(f"WAL checkpoint failed: {e}")
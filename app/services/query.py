@@ -0,0 +1,121 @@
+"""
+Query engine for filtered expense listings.
+Plans an ExpenseQuery against the in-memory store: the most selective index
+is walked in (date, id) order from the cursor and the remaining predicates
+filter it until the page is full.
+Results come back in (date, id) order so they can be paged with a keyset cursor.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Collection, List, Optional, Tuple
+from datetime import date, datetime, time
+from app.models.expense import Expense
+from app.services.expense_store import category_key
+
+# Rows examined per step when walking an index with a residual filter.
+SCAN_CHUNK = 512
+
+
+@dataclass
+class ExpenseQuery:
+    category: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    user_id: Optional[int] = None
+    keyword: Optional[str] = None
+
+    @classmethod
+    def build(cls, start_date: Optional[date] = None, end_date: Optional[date] = None, **fields) -> "ExpenseQuery":
+        """Build from ExpenseFilter-style arguments; start_date and end_date cover whole days."""
+        return cls(
+            start=datetime.combine(start_date, time.min) if start_date else None,
+            end=datetime.combine(end_date, time.max) if end_date else None,
+            **fields,
+        )
+
+    def predicate(self, skip: Collection[str] = ()) -> Optional[Callable[[Expense], bool]]:
+        """
+        One function checking every condition except those named in `skip`
+        ("category", "user", "amount", "date"); None when nothing is left.
+        The keyword needs the text index and is never part of it.
+        """
+        checks = []
+        if self.category is not None and "category" not in skip:
+            key = category_key(self.category)
+            checks.append(lambda e: category_key(e.category) == key)
+        if self.user_id is not None and "user" not in skip:
+            user_id = self.user_id
+            checks.append(lambda e: e.user_id == user_id)
+        if "amount" not in skip:
+            if self.min_amount is not None:
+                low = self.min_amount
+                checks.append(lambda e: e.amount >= low)
+            if self.max_amount is not None:
+                high = self.max_amount
+                checks.append(lambda e: e.amount <= high)
+        if "date" not in skip:
+            if self.start is not None:
+                start = self.start
+                checks.append(lambda e: e.date >= start)
+            if self.end is not None:
+                end = self.end
+                checks.append(lambda e: e.date <= end)
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        return lambda e: all(check(e) for check in checks)
+
+
+class QueryEngine:
+    """Runs ExpenseQuery pages against an in-memory store and its text index."""
+
+    def __init__(self, store, text_index):
+        self.store = store
+        self.text_index = text_index
+
+    def plan(self, query: ExpenseQuery) -> Tuple[str, Optional[List[int]]]:
+        """
+        The driving access path and, for "keyword", its candidate ids. The
+        "category", "user", "date" and "scan" paths walk a (date, id) index
+        from the cursor instead, so they never collect their candidates.
+        """
+        if query.keyword is not None:
+            return "keyword", self.text_index.search(query.keyword, prefix=True)
+        options = []
+        if query.category is not None:
+            options.append((self.store.count_for_category(query.category), "category"))
+        if query.user_id is not None:
+            options.append((self.store.count_for_user(query.user_id), "user"))
+        if query.start is not None or query.end is not None:
+            options.append((self.store.count_between(query.start, query.end), "date"))
+        if not options:
+            return "scan", None
+        return min(options)[1], None
+
+    def page(self, query: ExpenseQuery, limit: int,
+             after: Optional[Tuple[datetime, int]] = None) -> List[Expense]:
+        """Up to `limit` matching expenses in (date, id) order after the keyset `after`."""
+        path, ids = self.plan(query)
+        # The date range is always applied by the store while paging.
+        residual = query.predicate(skip=(path, "date"))
+        scope = {}
+        if path == "keyword":
+            scope["ids"] = ids
+        elif path == "category":
+            scope["category"] = query.category
+        elif path == "user":
+            scope["user_id"] = query.user_id
+        if residual is None:
+            return self.store.page(limit, after, query.start, query.end, **scope)
+        results: List[Expense] = []
+        chunk = max(limit, SCAN_CHUNK)
+        while len(results) < limit:
+            batch = self.store.page(chunk, after, query.start, query.end, **scope)
+            results.extend(e for e in batch if residual(e))
+            if len(batch) < chunk:
+                break
+            after = (batch[-1].date, batch[-1].id)
+        return results[:limit]
@@ -0,0 +1,185 @@
+"""
+Time-bucket rollups for reporting.
+Per-user daily buckets (plus one set across all users) are updated as deltas
+on every write; weekly and monthly figures are merged from the daily buckets,
+so a report costs O(days in range) however many expenses those days hold.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date
+from bisect import bisect_left, bisect_right, insort
+import math
+from app.models.expense import Expense
+from app.services.expense_store import day_key
+from app.utils.helpers import get_last_day_of_month, get_week_range
+
+
+@dataclass
+class Rollup:
+    """Sum, count, min, max and per-category sums over a span of days."""
+    total: float = 0.0
+    count: int = 0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    by_category: Dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "by_category": dict(self.by_category),
+        }
+
+
+class DayBucket:
+    """
+    One user's (or everyone's) expenses on one day. Amounts are kept sorted
+    so min and max stay exact when expenses are removed.
+    """
+
+    __slots__ = ("total", "amounts", "category_totals", "category_counts")
+
+    def __init__(self):
+        self.total = 0.0
+        self.amounts: List[float] = []
+        self.category_totals: Dict[str, float] = {}
+        self.category_counts: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def add(self, amount: float, category: str) -> None:
+        self.total += amount
+        insort(self.amounts, amount)
+        self.category_totals[category] = self.category_totals.get(category, 0.0) + amount
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+
+    def remove(self, amount: float, category: str) -> None:
+        del self.amounts[bisect_left(self.amounts, amount)]
+        self.total = self.total - amount if self.amounts else 0.0
+        count = self.category_counts[category] - 1
+        if count:
+            self.category_counts[category] = count
+            self.category_totals[category] -= amount
+        else:
+            del self.category_counts[category]
+            del self.category_totals[category]
+
+
+class ExpenseRollups:
+    """
+    Daily buckets keyed by user id, with `None` holding the buckets across all
+    users. Each key also keeps its days sorted so date ranges are a bisect.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Optional[int], Dict[date, DayBucket]] = {}
+        self._days: Dict[Optional[int], List[date]] = {}
+
+    @classmethod
+    def from_expenses(cls, expenses: Iterable[Expense]) -> "ExpenseRollups":
+        rollups = cls()
+        rollups.add_many(expenses)
+        return rollups
+
+    def add(self, expense: Expense) -> None:
+        day = day_key(expense.date)
+        for key in (None, expense.user_id):
+            self._bucket(key, day).add(expense.amount, expense.category)
+
+    def add_many(self, expenses: Iterable[Expense]) -> None:
+        for expense in expenses:
+            self.add(expense)
+
+    def remove(self, expense: Expense) -> None:
+        day = day_key(expense.date)
+        for key in (None, expense.user_id):
+            buckets = self._buckets[key]
+            bucket = buckets[day]
+            bucket.remove(expense.amount, expense.category)
+            if not bucket:
+                del buckets[day]
+                days = self._days[key]
+                del days[bisect_left(days, day)]
+                if not days:
+                    del self._buckets[key]
+                    del self._days[key]
+
+    def summary(self, start: Optional[date] = None, end: Optional[date] = None,
+                user_id: Optional[int] = None) -> Rollup:
+        """Merge the daily buckets with start <= day <= end (either bound may be open)."""
+        rollup = Rollup()
+        lows, highs = [], []
+        for _, bucket in self._range(user_id, start, end):
+            rollup.total += bucket.total
+            rollup.count += len(bucket)
+            lows.append(bucket.amounts[0])
+            highs.append(bucket.amounts[-1])
+            for category, amount in bucket.category_totals.items():
+                rollup.by_category[category] = rollup.by_category.get(category, 0.0) + amount
+        if rollup.count:
+            rollup.min, rollup.max = min(lows), max(highs)
+        return rollup
+
+    def weekly(self, day: date, user_id: Optional[int] = None) -> Rollup:
+        """The Monday-to-Sunday week containing `day`."""
+        return self.summary(*get_week_range(day), user_id=user_id)
+
+    def monthly(self, year: int, month: int, user_id: Optional[int] = None) -> Rollup:
+        first_day = date(year, month, 1)
+        return self.summary(first_day, get_last_day_of_month(first_day), user_id)
+
+    def daily_totals(self, start: Optional[date] = None, end: Optional[date] = None,
+                     user_id: Optional[int] = None) -> Dict[date, float]:
+        return {day: bucket.total for day, bucket in self._range(user_id, start, end)}
+
+    def peak_day(self, user_id: Optional[int] = None, start: Optional[date] = None,
+                 end: Optional[date] = None) -> Optional[Tuple[date, float]]:
+        """The day with the highest total (earliest on ties), or None when there are no expenses."""
+        best = None
+        for day, bucket in self._range(user_id, start, end):
+            if best is None or bucket.total > best[1]:
+                best = (day, bucket.total)
+        return best
+
+    def bounds(self, user_id: Optional[int] = None) -> Optional[Tuple[date, date]]:
+        days = self._days.get(user_id)
+        return (days[0], days[-1]) if days else None
+
+    def differences(self, other: "ExpenseRollups") -> List[str]:
+        """Human-readable mismatches between two rollup sets (empty when consistent)."""
+        problems = []
+        if self._days != other._days:
+            return ["rollup days differ"]
+        for key, buckets in self._buckets.items():
+            for day, bucket in buckets.items():
+                theirs = other._buckets[key][day]
+                if bucket.amounts != theirs.amounts or bucket.category_counts != theirs.category_counts:
+                    problems.append(f"rollup {key} {day}: amounts differ")
+                elif not math.isclose(bucket.total, theirs.total, abs_tol=1e-6):
+                    problems.append(f"rollup {key} {day}: {bucket.total} != {theirs.total}")
+        return problems
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _bucket(self, key: Optional[int], day: date) -> DayBucket:
+        buckets = self._buckets.setdefault(key, {})
+        bucket = buckets.get(day)
+        if bucket is None:
+            bucket = buckets[day] = DayBucket()
+            insort(self._days.setdefault(key, []), day)
+        return bucket
+
+    def _range(self, key: Optional[int], start: Optional[date], end: Optional[date]):
+        days = self._days.get(key)
+        if not days:
+            return
+        buckets = self._buckets[key]
+        lo = 0 if start is None else bisect_left(days, start)
+        hi = len(days) if end is None else bisect_right(days, end)
+        for day in days[lo:hi]:
+            yield day, buckets[day]
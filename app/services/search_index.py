@@ -0,0 +1,116 @@
+"""
+Inverted full-text index over expenses.
+Maps normalized tokens to expense ids for keyword search.
+"""
+
+from typing import Dict, FrozenSet, List, Optional, Set
+from bisect import bisect_left, insort
+from threading import Lock
+import heapq
+from app.utils.helpers import tokenize_text
+
+
+class InvertedIndex:
+    """
+    Token -> ids postings plus a sorted vocabulary for prefix lookups.
+
+    A forward map of id -> tokens lets entries be removed or replaced
+    without the original text. New tokens are collected in a pending set and
+    merged into the sorted vocabulary on the next prefix lookup, under a
+    private lock so concurrent readers can search at the same time.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._tokens: Dict[int, FrozenSet[str]] = {}
+        self._vocabulary: List[str] = []
+        self._pending: Set[str] = set()
+        self._merge_lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def add(self, doc_id: int, text: str) -> None:
+        """Index `text` under `doc_id`, replacing any previous entry."""
+        tokens = frozenset(tokenize_text(text))
+        previous = self._tokens.get(doc_id)
+        if previous == tokens:
+            return
+        if previous is not None:
+            self._drop(doc_id, previous - tokens)
+        self._tokens[doc_id] = tokens
+        for token in tokens if previous is None else tokens - previous:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                self._pending.add(token)
+            posting.add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        tokens = self._tokens.pop(doc_id, None)
+        if tokens is not None:
+            self._drop(doc_id, tokens)
+
+    def search(self, query: str, limit: Optional[int] = None, prefix: bool = False) -> List[int]:
+        """
+        Ids whose text contains every term of `query` (AND semantics), in id order.
+        With `prefix`, each term also matches tokens that start with it.
+        """
+        terms = set(tokenize_text(query))
+        if not terms:
+            return []
+        candidates = []
+        for term in terms:
+            postings = self._prefix_postings(term) if prefix else [self._postings.get(term, set())]
+            if not any(postings):
+                return []
+            candidates.append(postings)
+        # Start from the most selective term and filter by the others.
+        candidates.sort(key=lambda postings: sum(len(p) for p in postings))
+        result = set().union(*candidates[0])
+        for postings in candidates[1:]:
+            result = {doc_id for doc_id in result if any(doc_id in p for p in postings)}
+            if not result:
+                return []
+        if limit is not None:
+            return heapq.nsmallest(limit, result)
+        return sorted(result)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _prefix_postings(self, term: str) -> List[Set[int]]:
+        """Postings of every vocabulary token starting with `term`."""
+        self._merge_pending()
+        vocabulary = self._vocabulary
+        position = bisect_left(vocabulary, term)
+        postings = []
+        while position < len(vocabulary) and vocabulary[position].startswith(term):
+            postings.append(self._postings[vocabulary[position]])
+            position += 1
+        return postings
+
+    def _drop(self, doc_id: int, tokens) -> None:
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(doc_id)
+            if not posting:
+                del self._postings[token]
+                if token in self._pending:
+                    self._pending.discard(token)
+                else:
+                    del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _merge_pending(self) -> None:
+        if not self._pending:
+            return
+        with self._merge_lock:
+            if len(self._pending) < 64:
+                for token in self._pending:
+                    insort(self._vocabulary, token)
+            else:
+                self._vocabulary.extend(self._pending)
+                self._vocabulary.sort()
+            self._pending.clear()
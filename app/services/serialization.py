@@ -0,0 +1,98 @@
+"""
+Fast JSON encoding of expenses for API responses.
+Expenses are trusted internal objects, so they are encoded straight to bytes
+without a round trip through response models, and each encoding is memoized
+per id until the expense changes.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, List, Optional, Sequence
+import json
+from app.models.expense import Expense
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+# Memoized encodings kept per serializer; an entry is ~150-250 bytes for typical expenses.
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def dumps(value) -> bytes:
+    """Encode any JSON-compatible value (dates become ISO strings)."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), default=_default).encode()
+
+
+def dumps_expense(expense: Expense) -> bytes:
+    """Same document as `Expense.to_dict`, encoded to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(expense)
+    return json.dumps(expense.to_dict(), separators=(",", ":")).encode()
+
+
+class ExpenseSerializer:
+    """
+    Encodes expenses to JSON bytes, optionally memoizing each encoding by id.
+
+    At most `max_entries` encodings are kept, least recently served evicted first.
+    The owner must call `forget` whenever an expense changes; the service does
+    this from its write hooks.
+    """
+
+    def __init__(self, cache: bool = True, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._encoded: "Optional[OrderedDict[int, bytes]]" = OrderedDict() if cache else None
+        self._lock = Lock()  # concurrent readers serve and evict entries
+
+    def __len__(self) -> int:
+        return len(self._encoded) if self._encoded is not None else 0
+
+    def dumps_one(self, expense: Expense) -> bytes:
+        return self._encode_all([expense])[0]
+
+    def dumps_many(self, expenses: Iterable[Expense], fields: Optional[Sequence[str]] = None) -> bytes:
+        """A JSON array of the given expenses, optionally projected onto `fields`."""
+        if fields is not None:
+            return dumps([{name: getattr(expense, name) for name in fields} for expense in expenses])
+        return b"[" + b",".join(self._encode_all(list(expenses))) + b"]"
+
+    def _encode_all(self, expenses: List[Expense]) -> List[bytes]:
+        encoded = self._encoded
+        if encoded is None:
+            return [dumps_expense(expense) for expense in expenses]
+        # One lock round for the lookups and one for the misses, which are encoded outside it.
+        with self._lock:
+            found = [encoded.get(expense.id) for expense in expenses]
+            for expense, data in zip(expenses, found):
+                if data is not None:
+                    encoded.move_to_end(expense.id)
+        missing = [position for position, data in enumerate(found) if data is None]
+        if missing:
+            for position in missing:
+                found[position] = dumps_expense(expenses[position])
+            with self._lock:
+                for position in missing:
+                    encoded[expenses[position].id] = found[position]
+                while len(encoded) > self.max_entries:
+                    encoded.popitem(last=False)
+        return found
+
+    def forget(self, expense_id: int) -> None:
+        if self._encoded is not None:
+            with self._lock:
+                self._encoded.pop(expense_id, None)
+
+    def clear(self) -> None:
+        if self._encoded is not None:
+            with self._lock:
+                self._encoded.clear()
+
+
+def _default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,396 @@
+"""
+User-partitioned expense service.
+Expenses are spread over N ExpenseService shards by user id, each with its own
+store, indexes and lock. Per-user calls go to one shard; global reads fan out
+to every shard and merge. Shards can run in worker processes so that fan-out
+work uses several cores.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+from datetime import date
+from threading import Lock
+import heapq
+import itertools
+import multiprocessing
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.pagination import Page, clamp_page_size, encode_cursor
+
+
+def shard_for(user_id: int, shards: int) -> int:
+    """Shard index owning `user_id`."""
+    return hash(user_id) % shards
+
+
+def _serve(conn, store_factory, options) -> None:
+    """Worker process loop: run ExpenseService calls received over `conn` until None arrives."""
+    service = ExpenseService(store=store_factory(), **options)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        name, args, kwargs = request
+        try:
+            conn.send((True, getattr(service, name)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+class _LocalShard:
+    """An in-process shard; `send` runs the call right away and `recv` returns its outcome."""
+
+    def __init__(self, store_factory, options):
+        self.service = ExpenseService(store=store_factory(), **options)
+        self.lock = Lock()
+        self._outcome = None
+
+    def send(self, name: str, args: tuple, kwargs: dict) -> None:
+        try:
+            self._outcome = (True, getattr(self.service, name)(*args, **kwargs))
+        except Exception as e:
+            self._outcome = (False, e)
+
+    def recv(self):
+        ok, value = self._outcome
+        self._outcome = None
+        if not ok:
+            raise value
+        return value
+
+    def close(self) -> None:
+        pass
+
+
+class _ProcessShard:
+    """A shard served by a worker process; calls and results are pickled over a pipe."""
+
+    def __init__(self, store_factory, options, context):
+        self.lock = Lock()
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=_serve, args=(child, store_factory, options), daemon=True)
+        self._process.start()
+        child.close()
+
+    def send(self, name: str, args: tuple, kwargs: dict) -> None:
+        self._conn.send((name, args, kwargs))
+
+    def recv(self):
+        ok, value = self._conn.recv()
+        if not ok:
+            raise value
+        return value
+
+    def close(self) -> None:
+        if self._process.is_alive():
+            self._conn.send(None)
+            self._process.join()
+        self._conn.close()
+
+
+class ShardedExpenseService:
+    """
+    ExpenseService API over `shards` partitions keyed by user id.
+
+    Ids are allocated here so they stay unique across shards, and an id
+    directory routes by-id calls to the owning shard. A batch is atomic per
+    shard, not across shards; moving an expense to another user's shard is a
+    delete followed by an insert.
+
+    With `processes=True` every shard lives in its own worker process, so a
+    fan-out (totals, summaries, pages) runs on all shards in parallel.
+    """
+
+    def __init__(self, shards: int = 4, store_factory: Callable[[], object] = ExpenseStore,
+                 processes: bool = False, **options):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        if processes:
+            context = multiprocessing.get_context("spawn")
+            self._shards = [_ProcessShard(store_factory, options, context) for _ in range(shards)]
+        else:
+            self._shards = [_LocalShard(store_factory, options) for _ in range(shards)]
+        self._owners: Dict[int, int] = {}
+        self._ids = itertools.count(1)
+        self._directory_lock = Lock()
+
+    def __enter__(self) -> "ShardedExpenseService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop worker processes (a no-op for in-process shards)."""
+        for shard in self._shards:
+            shard.close()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def shard_for(self, user_id: int) -> int:
+        return shard_for(user_id, len(self._shards))
+
+    # Writes
+
+    def add_expense(self, expense: Expense) -> None:
+        if not expense.is_valid():
+            raise ValueError("Invalid expense data")
+        self._assign_ids([expense])
+        index = self.shard_for(expense.user_id)
+        self._call(index, "add_expense", expense)
+        self._own([expense.id], index)
+
+    def add_expenses(self, expenses: List[Expense]) -> List[Expense]:
+        """Insert a batch, one add_expenses call per shard involved."""
+        if not all(expense.is_valid() for expense in expenses):
+            raise ValueError("Invalid expense data")
+        self._assign_ids(expenses)
+        groups: Dict[int, List[Expense]] = {}
+        for expense in expenses:
+            groups.setdefault(self.shard_for(expense.user_id), []).append(expense)
+        self._fan_out("add_expenses", targets=groups, args_for=lambda index: (groups[index],))
+        for index, group in groups.items():
+            self._own([expense.id for expense in group], index)
+        return expenses
+
+    def delete_expense(self, expense_id: int) -> bool:
+        index = self._owner(expense_id)
+        if index is None or not self._call(index, "delete_expense", expense_id):
+            return False
+        with self._directory_lock:
+            self._owners.pop(expense_id, None)
+        return True
+
+    def update_expense(self, expense_id: int, **updates) -> bool:
+        updates.pop("id", None)
+        index = self._owner(expense_id)
+        if index is None:
+            return False
+        target = self.shard_for(updates["user_id"]) if "user_id" in updates else index
+        if target == index:
+            return self._call(index, "update_expense", expense_id, **updates)
+        current = self._call(index, "get_expense_by_id", expense_id)
+        if current is None:
+            return False
+        # Change a copy: the source shard still needs the old fields to unindex the original.
+        expense = current.clone(expense_id)
+        expense.update(**updates)
+        if not expense.is_valid():
+            raise ValueError("Invalid expense data")
+        # Added to the target first: a rejected add (e.g. a duplicate) leaves the source untouched.
+        self._call(target, "add_expense", expense)
+        try:
+            self._call(index, "delete_expense", expense_id)
+        except BaseException:
+            self._call(target, "delete_expense", expense_id)
+            raise
+        self._own([expense_id], target)
+        return True
+
+    def categorize_all(self, category_mapping: Dict[str, str]) -> int:
+        return sum(self._fan_out("categorize_all", category_mapping))
+
+    def apply_discount_to_category(self, category: str, percent: float) -> int:
+        return sum(self._fan_out("apply_discount_to_category", category, percent))
+
+    # Reads routed to one shard
+
+    def get_expense_by_id(self, expense_id: int) -> Optional[Expense]:
+        index = self._owner(expense_id)
+        return None if index is None else self._call(index, "get_expense_by_id", expense_id)
+
+    def get_expenses_by_user(self, user_id: int) -> List[Expense]:
+        return self._call(self.shard_for(user_id), "get_expenses_by_user", user_id)
+
+    # Reads that fan out and merge
+
+    def get_all_expenses(self) -> List[Expense]:
+        return sorted(itertools.chain.from_iterable(self._fan_out("get_all_expenses")), key=lambda e: e.id)
+
+    def filter_expenses_by_category(self, category: str) -> List[Expense]:
+        parts = self._fan_out("filter_expenses_by_category", category)
+        return sorted(itertools.chain.from_iterable(parts), key=lambda e: e.id)
+
+    def get_expenses_by_date_range(self, start_date: date, end_date: date) -> List[Expense]:
+        parts = self._fan_out("get_expenses_by_date_range", start_date, end_date)
+        return list(heapq.merge(*parts, key=lambda e: (e.date, e.id)))
+
+    def search_expenses(self, keyword: str, limit: Optional[int] = None, prefix: bool = True) -> List[Expense]:
+        parts = self._fan_out("search_expenses", keyword, limit, prefix)
+        return sorted(itertools.chain.from_iterable(parts), key=lambda e: e.id)[:limit]
+
+    def get_recent_expenses(self, limit: int = 5) -> List[Expense]:
+        parts = self._fan_out("get_recent_expenses", limit)
+        newest_first = heapq.merge(*parts, key=lambda e: (e.date, e.id), reverse=True)
+        return list(itertools.islice(newest_first, max(limit, 0)))
+
+    def get_page(self, limit: Optional[int] = None, cursor: Optional[str] = None, **filters) -> Page:
+        """Keyset page merged from one page per shard; cursors are the same as a single service's."""
+        if filters.get("user_id") is not None:
+            return self._call(self.shard_for(filters["user_id"]), "get_page", limit, cursor, **filters)
+        limit = clamp_page_size(limit)
+        pages = self._fan_out("get_page", limit, cursor, **filters)
+        merged = list(heapq.merge(*(page.items for page in pages), key=lambda e: (e.date, e.id)))
+        more = len(merged) > limit or any(page.next_cursor for page in pages)
+        items = merged[:limit]
+        return Page(items, encode_cursor(items[-1]) if more and items else None)
+
+    def find_duplicates(self) -> List[Expense]:
+        # Duplicates share a user, so each shard finds its own.
+        parts = self._fan_out("find_duplicates")
+        return list(heapq.merge(*parts, key=lambda e: (e.date, e.id)))
+
+    def verify_aggregates(self) -> List[str]:
+        problems = []
+        for index, found in enumerate(self._fan_out("verify_aggregates")):
+            problems.extend(f"shard {index}: {problem}" for problem in found)
+        return problems
+
+    # Aggregates
+
+    def total_amount(self) -> float:
+        return sum(self._fan_out("total_amount"))
+
+    def expense_count(self) -> int:
+        return len(self._owners)
+
+    def average_amount(self) -> float:
+        count = self.expense_count()
+        return self.total_amount() / count if count else 0.0
+
+    def total_amount_by_category(self) -> Dict[str, float]:
+        return _merge_sums(self._fan_out("total_amount_by_category"))
+
+    def get_total_expense(self) -> dict:
+        return {"total_expense": self.total_amount()}
+
+    def get_expense_summary_by_category(self, user_id: Optional[int] = None) -> Dict[str, float]:
+        if user_id is not None:
+            return self._call(self.shard_for(user_id), "get_expense_summary_by_category", user_id)
+        return self.total_amount_by_category()
+
+    def get_top_expense_categories(self, limit: int = 5) -> List[dict]:
+        ranked = sorted(self.total_amount_by_category().items(), key=lambda item: (-item[1], item[0]))
+        return [{"category": category, "total_amount": total} for category, total in ranked[:max(limit, 0)]]
+
+    def get_monthly_summary(self, year: int, month: int, user_id: Optional[int] = None) -> dict:
+        if user_id is not None:
+            return self._call(self.shard_for(user_id), "get_monthly_summary", year, month, user_id)
+        return _merge_summaries(self._fan_out("get_monthly_summary", year, month))
+
+    def get_weekly_summary(self, day: date, user_id: Optional[int] = None) -> dict:
+        if user_id is not None:
+            return self._call(self.shard_for(user_id), "get_weekly_summary", day, user_id)
+        return _merge_summaries(self._fan_out("get_weekly_summary", day))
+
+    def get_daily_totals(self, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                         user_id: Optional[int] = None) -> Dict[date, float]:
+        if user_id is not None:
+            return self._call(self.shard_for(user_id), "get_daily_totals", start_date, end_date, user_id)
+        return dict(sorted(_merge_sums(self._fan_out("get_daily_totals", start_date, end_date)).items()))
+
+    def get_peak_expense_day(self, user_id: Optional[int] = None) -> dict:
+        if user_id is not None:
+            return self._call(self.shard_for(user_id), "get_peak_expense_day", user_id)
+        totals = _merge_sums(self._fan_out("get_daily_totals"))
+        if not totals:
+            return {"date": None, "total_amount": 0.0}
+        day, total = min(totals.items(), key=lambda item: (-item[1], item[0]))
+        return {"date": day, "total_amount": total}
+
+    def get_daily_average(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> dict:
+        if start_date is None or end_date is None:
+            # Open bounds come from the earliest and latest expense across all shards.
+            known = [r for r in self._fan_out("get_daily_average", start_date, end_date) if r["start_date"]]
+            if not known:
+                return {"average": 0.0, "start_date": start_date, "end_date": end_date}
+            start_date = start_date or min(r["start_date"] for r in known)
+            end_date = end_date or max(r["end_date"] for r in known)
+        days = (end_date - start_date).days + 1
+        total = sum(self.get_daily_totals(start_date, end_date).values())
+        return {"average": total / days if days > 0 else 0.0, "start_date": start_date, "end_date": end_date}
+
+    # Routing
+
+    def _call(self, index: int, name: str, *args, **kwargs):
+        shard = self._shards[index]
+        with shard.lock:
+            shard.send(name, args, kwargs)
+            return shard.recv()
+
+    def _fan_out(self, name: str, *args, targets: Optional[Iterable[int]] = None,
+                 args_for: Optional[Callable[[int], tuple]] = None, **kwargs) -> list:
+        """
+        Run a call on every shard (or on `targets`) and return the results in shard order.
+        Every request is sent before any result is read, so worker processes run concurrently.
+        """
+        indexes = sorted(targets) if targets is not None else range(len(self._shards))
+        shards = [self._shards[index] for index in indexes]
+        # Locks are always taken in shard order, so concurrent fan-outs cannot deadlock.
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            for index, shard in zip(indexes, shards):
+                shard.send(name, args_for(index) if args_for else args, kwargs)
+            results, error = [], None
+            for shard in shards:
+                try:
+                    results.append(shard.recv())
+                except Exception as e:
+                    # Keep draining so no reply is left in a pipe for the next call.
+                    error = error or e
+            if error is not None:
+                raise error
+            return results
+        finally:
+            for shard in shards:
+                shard.lock.release()
+
+    def _assign_ids(self, expenses: List[Expense]) -> None:
+        with self._directory_lock:
+            given = [e.id for e in expenses if e.id is not None]
+            if len(set(given)) != len(given) or any(i in self._owners for i in given):
+                raise ValueError("Batch contains duplicate or existing expense ids")
+            for expense in expenses:
+                if expense.id is None:
+                    expense.id = next(self._ids)
+                    while expense.id in self._owners:
+                        expense.id = next(self._ids)
+            if given:
+                # Keep automatic ids clear of explicit ones.
+                self._ids = itertools.count(max(next(self._ids), max(given) + 1))
+
+    def _own(self, ids: List[int], index: int) -> None:
+        with self._directory_lock:
+            for expense_id in ids:
+                self._owners[expense_id] = index
+
+    def _owner(self, expense_id: int) -> Optional[int]:
+        with self._directory_lock:
+            return self._owners.get(expense_id)
+
+
+def _merge_sums(parts: Iterable[Dict]) -> Dict:
+    merged: Dict = {}
+    for part in parts:
+        for key, value in part.items():
+            merged[key] = merged.get(key, 0.0) + value
+    return merged
+
+
+def _merge_summaries(parts: List[dict]) -> dict:
+    """Combine per-shard monthly or weekly summaries into one."""
+    merged = dict(parts[0])
+    lows = [part["min"] for part in parts if part["min"] is not None]
+    highs = [part["max"] for part in parts if part["max"] is not None]
+    merged.update(
+        total=sum(part["total"] for part in parts),
+        count=sum(part["count"] for part in parts),
+        min=min(lows) if lows else None,
+        max=max(highs) if highs else None,
+        by_category=_merge_sums(part["by_category"] for part in parts),
+    )
+    return merged
@@ -0,0 +1,178 @@
+"""
+Database-backed expense service.
+Runs the ExpenseService API against SqlExpenseStore, pushing aggregates,
+search and set-based updates down to SQL instead of keeping in-memory state.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import date, datetime, time
+from sqlalchemy import case, update
+from sqlalchemy.engine import Engine
+from app.models.expense import Expense
+from app.models.expense_record import ExpenseRecord
+from app.database.repository import SqlExpenseStore, query_conditions
+from app.services.cache import ALL, cached, user_tag
+from app.services.concurrency import NullLock
+from app.services.rollups import Rollup
+from app.services.duplicates import DUPLICATE_POLICIES, DuplicateIndex
+from app.services.serialization import ExpenseSerializer
+from app.services.expense_service import ExpenseService
+from app.utils.helpers import normalize_text, tokenize_text
+
+class SqlExpenseService(ExpenseService):
+    def __init__(self, store: SqlExpenseStore, cache=None,
+                 duplicate_policy: str = "allow", duplicate_window: float = 0.0):
+        # No in-memory indexes or aggregates: the database is the source of truth,
+        # so other processes writing to it never leave this service stale.
+        # Transactions isolate concurrent requests, so no in-process lock is held.
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {duplicate_policy}")
+        self._lock = NullLock()
+        self.metrics = None
+        self.store = store
+        self.text_index = None
+        self.aggregates = None
+        self.rollups = None
+        # Never filled: it only carries the window; lookups query the database.
+        self.duplicates = DuplicateIndex(duplicate_window)
+        self.duplicate_policy = duplicate_policy
+        self.flagged_duplicates = set()
+        self.serializer = ExpenseSerializer(cache=False)
+        self.cache = cache
+        self.journal = None
+
+    @classmethod
+    def from_engine(cls, engine: Engine, cache=None, **options) -> "SqlExpenseService":
+        return cls(SqlExpenseStore(engine), cache=cache, **options)
+
+    def total_amount(self) -> float:
+        return self.store.total_amount()
+
+    def average_amount(self) -> float:
+        count = len(self.store)
+        return self.store.total_amount() / count if count else 0.0
+
+    def total_amount_by_category(self) -> Dict[str, float]:
+        return self.store.amount_by_category()
+
+    @cached(lambda: [ALL])
+    def get_total_expense(self) -> dict:
+        return {"total_expense": self.store.total_amount()}
+
+    @cached(lambda limit: [ALL])
+    def get_top_expense_categories(self, limit: int = 5) -> List[dict]:
+        return [
+            {"category": category, "total_amount": total}
+            for category, total in self.store.top_categories(limit)
+        ]
+
+    @cached(lambda user_id: [user_tag(user_id)])
+    def get_peak_expense_day(self, user_id: Optional[int] = None) -> dict:
+        peak = self.store.peak_day(user_id)
+        if peak is None:
+            return {"date": None, "total_amount": 0.0}
+        return {"date": peak[0], "total_amount": peak[1]}
+
+    def get_daily_totals(self, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                         user_id: Optional[int] = None) -> Dict[date, float]:
+        return self.store.daily_totals(
+            datetime.combine(start_date, time.min) if start_date else None,
+            datetime.combine(end_date, time.max) if end_date else None,
+            user_id,
+        )
+
+    def verify_aggregates(self) -> List[str]:
+        return []
+
+    def find_duplicates(self) -> List[Expense]:
+        # A one-off report: index a single pass over the table.
+        index = DuplicateIndex.from_expenses(self.store, self.duplicates.window.total_seconds())
+        return sorted(self.store.get_many(index.duplicates()), key=lambda e: (e.date, e.id))
+
+    def search_expenses(self, keyword: str, limit: Optional[int] = None, prefix: bool = True) -> List[Expense]:
+        """All-terms substring match of `keyword` against description and category."""
+        terms = tokenize_text(keyword)
+        return self.store.search(terms, limit=limit) if terms else []
+
+    def categorize_all(self, category_mapping: Dict[str, str]) -> int:
+        renames = {normalize_text(k): v for k, v in category_mapping.items()}
+        if not renames:
+            return 0
+        # One statement, so every row is matched against its original category.
+        with self.store.session_factory() as session, session.begin():
+            changed = session.execute(
+                update(ExpenseRecord)
+                .where(ExpenseRecord.category_key.in_(renames))
+                .values(
+                    category=case(renames, value=ExpenseRecord.category_key),
+                    category_key=case({k: normalize_text(v) for k, v in renames.items()},
+                                      value=ExpenseRecord.category_key),
+                )
+            ).rowcount
+        self._clear_cache()
+        return changed
+
+    def apply_discount_to_category(self, category: str, percent: float) -> int:
+        if not 0 < percent < 100:
+            return 0
+        with self.store.session_factory() as session, session.begin():
+            changed = session.execute(
+                update(ExpenseRecord)
+                .where(ExpenseRecord.category_key == normalize_text(category))
+                .values(amount=ExpenseRecord.amount - ExpenseRecord.amount * (percent / 100))
+            ).rowcount
+        self._clear_cache()
+        return changed
+
+    def _fetch_page(self, query, limit, after) -> List[Expense]:
+        # The whole filter becomes one WHERE clause; the database picks the index.
+        conditions = query_conditions(query)
+        if conditions is None:
+            return []
+        return self.store.page(limit, after, conditions=conditions)
+
+    def _summarize(self, start_date: date, end_date: date, user_id: Optional[int] = None) -> Rollup:
+        rollup = Rollup()
+        rows = self.store.summary(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max), user_id)
+        for category, total, count, low, high in rows:
+            rollup.total += total
+            rollup.count += count
+            rollup.min = low if rollup.min is None else min(rollup.min, low)
+            rollup.max = high if rollup.max is None else max(rollup.max, high)
+            rollup.by_category[category] = total
+        return rollup
+
+    def _existing_ids(self, ids: Iterable[int]) -> Set[int]:
+        return self.store.existing_ids(ids)
+
+    def _stored_duplicates(self, expenses: List[Expense]) -> Dict[int, int]:
+        # One query per chunk of the batch instead of one per expense; the candidates are matched in memory.
+        if not expenses:
+            return {}
+        window = self.duplicates.window
+        candidates = DuplicateIndex.from_expenses(self.store.similar(expenses, window), window.total_seconds())
+        found = {}
+        for position, expense in enumerate(expenses):
+            original = candidates.match(expense)
+            if original is not None:
+                found[position] = original
+        return found
+
+    def _clear_cache(self) -> None:
+        # Set-based updates do not report which months they touched.
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _on_added(self, expense: Expense) -> None:
+        self._invalidate([expense])
+
+    def _on_added_many(self, expenses: List[Expense]) -> None:
+        self._invalidate(expenses)
+
+    def _on_removed_many(self, expenses: List[Expense]) -> None:
+        for expense in expenses:
+            self.flagged_duplicates.discard(expense.id)
+        self._invalidate(expenses)
+
+    def _on_updated_many(self, changed: List[Tuple[Expense, Expense]]) -> None:
+        self._invalidate(expense for pair in changed for expense in pair)
@@ -4,6 +4,8 @@ Includes common functions like date parsing, currency formatting, input validati
 """
 
 from datetime import datetime, timedelta, date
+from itertools import chain
+from typing import Iterable, List, Optional, Sequence
 import locale
 import logging
 import re
@@ -11,20 +13,130 @@ import uuid
 import random
 import calendar
 
-# تنظیم فرمت محلی برای نمایش اعداد و تاریخ‌ها (در صورت نیاز)
-locale.setlocale(locale.LC_ALL, '')
+_locale_configured = False
+
+def configure_locale(name: str = '') -> None:
+    """تنظیم فرمت محلی برای نمایش اعداد و تاریخ‌ها (فقط یک‌بار، هنگام راه‌اندازی برنامه)."""
+    global _locale_configured
+    if _locale_configured:
+        return
+    try:
+        locale.setlocale(locale.LC_ALL, name)
+    except locale.Error as e:
+        logging.warning(f"Locale not available, keeping the default: {e}")
+    _locale_configured = True
+
+# قالب‌هایی که datetime.fromisoformat دقیقاً مانند strptime می‌خواند، همراه با طول و جداکننده‌هایی
+# که مقدار باید داشته باشد تا از این مسیر سریع برود: (length, ((position, separator), ...))
+_ISO_FORMATS = {
+    "%Y-%m-%d": (10, ((4, "-"), (7, "-"))),
+    "%Y-%m-%dT%H:%M:%S": (19, ((4, "-"), (7, "-"), (10, "T"), (13, ":"), (16, ":"))),
+    "%Y-%m-%d %H:%M:%S": (19, ((4, "-"), (7, "-"), (10, " "), (13, ":"), (16, ":"))),
+}
+# دستورهایی که به ساعت بستگی دارند؛ قالب‌های بدون آن‌ها را می‌توان برای هر روز یک‌بار ساخت
+_TIME_DIRECTIVES = re.compile(r"%[-#]?[HIMSfpzZcXTRrs]")
+# تعداد ردیف‌هایی که با یک فراخوانی str.format ساخته می‌شوند و جداکننده بین آن‌ها
+_FORMAT_CHUNK = 4096
+_ROW_SEPARATOR = "\0"
+
+def _parse_one(value: str, fmt: Optional[str]) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if fmt is None:
+        return datetime.fromisoformat(value)
+    shape = _ISO_FORMATS.get(fmt)
+    if shape is not None and len(value) == shape[0] and all(value[i] == sep for i, sep in shape[1]):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass  # strptime gives the usual error message
+    return datetime.strptime(value, fmt)
+
+def parse_dates(values: Iterable[str], fmt: Optional[str] = None, errors: str = "raise") -> List[Optional[datetime]]:
+    """
+    تبدیل دسته‌ای رشته‌های تاریخ به datetime.
+    fmt=None یعنی ISO-8601؛ قالب‌های ISO از مسیر سریع fromisoformat و بقیه با strptime خوانده می‌شوند
+    و هر رشته تکراری فقط یک‌بار تبدیل می‌شود. مقادیر datetime بدون تغییر برمی‌گردند.
+    با errors="coerce" به‌جای خطا برای مقدار نامعتبر None برمی‌گردد.
+    """
+    if errors not in ("raise", "coerce"):
+        raise ValueError(f"errors must be 'raise' or 'coerce', not {errors!r}")
+    if not isinstance(values, (list, tuple)):
+        values = list(values)
+    if fmt is None:
+        try:
+            return list(map(datetime.fromisoformat, values))
+        except (TypeError, ValueError):
+            pass  # datetimes or invalid values in the column: go value by value
+    seen = {}
+    parsed = []
+    for value in values:
+        result = seen.get(value) if type(value) is str else None
+        if result is None:
+            try:
+                result = _parse_one(value, fmt)
+            except (TypeError, ValueError):
+                if errors == "raise":
+                    raise
+            else:
+                if type(value) is str:
+                    seen[value] = result
+        parsed.append(result)
+    return parsed
 
 def parse_date(date_str: str, fmt: str = "%Y-%m-%d") -> datetime:
     """تبدیل رشته تاریخ به شیء datetime."""
     try:
-        return datetime.strptime(date_str, fmt)
+        return parse_dates((date_str,), fmt)[0]
     except ValueError as e:
         logging.error(f"Invalid date format: {e}")
         raise
 
+def format_dates(values: Iterable[date], fmt: Optional[str] = None) -> List[str]:
+    """
+    فرمت‌دهی دسته‌ای تاریخ‌ها با strftime؛ fmt=None یعنی isoformat.
+    هر مقدار تکراری (و برای قالب‌های بدون ساعت، هر روز) فقط یک‌بار فرمت می‌شود.
+    """
+    if fmt is None:
+        return [value.isoformat() for value in values]
+    by_day = _TIME_DIRECTIVES.search(fmt) is None
+    seen = {}
+    formatted = []
+    for value in values:
+        key = value.toordinal() if by_day else value
+        text = seen.get(key)
+        if text is None:
+            text = seen[key] = value.strftime(fmt)
+        formatted.append(text)
+    return formatted
+
+def format_rows(template: str, *columns: Sequence) -> List[str]:
+    """
+    پر کردن template (با فیلدهای خودکار "{}") برای هر ردیف از ستون‌ها.
+    هر دسته از ردیف‌ها با یک فراخوانی str.format ساخته می‌شود که از فرمت‌دهی ردیف‌به‌ردیف سریع‌تر است.
+    """
+    rows = list(zip(*columns))
+    formatted = []
+    for start in range(0, len(rows), _FORMAT_CHUNK):
+        chunk = rows[start:start + _FORMAT_CHUNK]
+        parts = ((template + _ROW_SEPARATOR) * len(chunk)).format(*chain.from_iterable(chunk)).split(_ROW_SEPARATOR)
+        if len(parts) != len(chunk) + 1:
+            # a value contained the separator; format this chunk row by row
+            parts = [template.format(*row) for row in chunk] + [""]
+        formatted.extend(parts[:-1])
+    return formatted
+
+def format_currencies(amounts: Sequence[float], symbol: str = "$", sep: str = ",", precision: int = 2) -> List[str]:
+    """فرمت‌دهی دسته‌ای مبالغ با جداکننده و نماد پولی."""
+    symbol = symbol.replace("{", "{{").replace("}", "}}")
+    formatted = format_rows(f"{symbol}{{:,.{precision}f}}", amounts)
+    if sep != ",":
+        formatted = [text.replace(",", sep) for text in formatted]
+    return formatted
+
 def format_currency(amount: float, symbol: str = "$", sep: str = ",") -> str:
     """فرمت‌دهی مبلغ با جداکننده و نماد پولی."""
-    return f"{symbol}{amount:,.2f}".replace(",", sep)
+    return format_currencies((amount,), symbol, sep)[0]
 
 def is_valid_email(email: str) -> bool:
     """بررسی اعتبار ایمیل با استفاده از قواعد ساده."""
@@ -57,9 +169,30 @@ def calculate_days_between(start: str, end: str, fmt: str = "%Y-%m-%d") -> int:
         log_exception("Failed to calculate days between", e)
         raise
 
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def to_micros(value: datetime) -> int:
+    """تعداد میکروثانیه‌ها از مبدأ یونیکس (بدون منطقه زمانی)."""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return (value - EPOCH) // _MICROSECOND
+
+def from_micros(value: int) -> datetime:
+    """تبدیل میکروثانیه‌های ذخیره‌شده به datetime."""
+    return EPOCH + timedelta(microseconds=value)
+
+_SPACE_PATTERN = re.compile(r"\s+")
+
 def normalize_text(text: str) -> str:
     """نرمال‌سازی رشته‌ها برای ذخیره‌سازی یا مقایسه (حذف فاصله‌ها، حروف کوچک)."""
-    return re.sub(r"\s+", " ", text.strip()).lower()
+    return _SPACE_PATTERN.sub(" ", text.strip()).lower()
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize_text(text: str) -> list:
+    """تبدیل متن نرمال‌شده به فهرست کلمات برای جستجو و نمایه‌سازی."""
+    return _TOKEN_PATTERN.findall(normalize_text(text))
 
 def get_first_day_of_month(target_date: date = date.today()) -> date:
     """دریافت اولین روز ماه از یک تاریخ مشخص."""
@@ -0,0 +1,95 @@
+"""
+Load benchmark comparing the sync and async request paths.
+Serves the sync and async expense routers from one in-process ASGI app over the
+same SQLite file and fires concurrent requests at each.
+
+Usage: python -m benchmarks.bench_async [requests] [concurrency]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import httpx
+from fastapi import FastAPI
+from api.routes import async_expense_routes, expense_routes
+from app.database.db import create_async_db_engine, create_db_engine, init_db
+from app.models.expense import Expense
+from app.services.async_expense_service import AsyncExpenseService
+from app.services.sql_expense_service import SqlExpenseService
+from benchmarks.bench_store import CATEGORIES
+
+ENDPOINTS = ["/stats/total/", "/stats/top-categories/", "/stats/peak-day/"]
+
+
+def seed(service: SqlExpenseService, rows: int) -> None:
+    rng = random.Random(rows)
+    start = datetime(2022, 1, 1)
+    service.add_expenses([
+        Expense(id=None, user_id=rng.randint(1, 100), amount=round(rng.uniform(1, 500), 2),
+                category=rng.choice(CATEGORIES), description=f"expense {i}",
+                date=start + timedelta(minutes=rng.randint(0, 60 * 24 * 365)))
+        for i in range(rows)
+    ])
+
+
+def build_app(db_path: str, rows: int) -> FastAPI:
+    url = f"sqlite:///{db_path}"
+    engine = create_db_engine(url)
+    init_db(engine)
+    seed(SqlExpenseService.from_engine(engine), rows)
+    sync_service = SqlExpenseService.from_engine(engine)
+    async_service = AsyncExpenseService.from_engine(create_async_db_engine(url))
+    app = FastAPI()
+    app.include_router(expense_routes.router, prefix="/sync")
+    app.include_router(async_expense_routes.router, prefix="/async")
+    app.dependency_overrides[expense_routes.get_service] = lambda: sync_service
+    app.dependency_overrides[async_expense_routes.get_service] = lambda: async_service
+    return app
+
+
+async def hammer(client: httpx.AsyncClient, prefix: str, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(prefix + ENDPOINTS[i % len(ENDPOINTS)])
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "mode": prefix.strip("/"),
+        "requests_per_second": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1e3,
+    }
+
+
+async def run(requests: int, concurrency: int, rows: int = 20_000) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, "bench.db"), rows)
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            return [await hammer(client, prefix, requests, concurrency) for prefix in ("/sync", "/async")]
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    requests = int(args[0]) if args else 600
+    concurrency = int(args[1]) if len(args) > 1 else 100
+    for result in asyncio.run(run(requests, concurrency)):
+        print(f"{result['mode']:<6} {result['requests_per_second']:>8.1f} req/s | "
+              f"p50 {result['p50_ms']:.1f} ms | p95 {result['p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark comparing the indexed and columnar ExpenseService backends.
+Reports bytes per expense and aggregation timings.
+
+Usage: python -m benchmarks.bench_columnar [size]
+"""
+
+import random
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.columnar_store import ColumnarExpenseStore
+from benchmarks.bench_store import CATEGORIES
+
+
+def fill(service: ExpenseService, size: int) -> None:
+    rng = random.Random(size)
+    start = datetime(2020, 1, 1)
+    for i in range(1, size + 1):
+        service.add_expense(Expense(
+            id=i,
+            user_id=rng.randint(1, 1000),
+            amount=round(rng.uniform(1, 500), 2),
+            category=rng.choice(CATEGORIES),
+            description=f"expense {i}",
+            date=start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4)),
+        ))
+
+
+def bench(store_factory, size: int) -> dict:
+    tracemalloc.start()
+    service = ExpenseService(store=store_factory())
+    fill(service, size)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    window = (datetime(2021, 1, 1), datetime(2021, 3, 31))
+    return {
+        "backend": store_factory.__name__,
+        "bytes_per_expense": used / size,
+        "total_ms": timeit.timeit(service.total_amount, number=10) / 10 * 1e3,
+        "by_category_ms": timeit.timeit(service.total_amount_by_category, number=10) / 10 * 1e3,
+        "date_filter_ms": timeit.timeit(lambda: service.filter_expenses_by_date_range(*window), number=3) / 3 * 1e3,
+    }
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    size = int(args[0]) if args else 200_000
+    for factory in (ExpenseStore, ColumnarExpenseStore):
+        r = bench(factory, size)
+        print(f"{r['backend']:<22} {r['bytes_per_expense']:>7.0f} B/expense | total {r['total_ms']:.2f} ms | "
+              f"by_category {r['by_category_ms']:.2f} ms | date filter {r['date_filter_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
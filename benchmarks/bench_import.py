@@ -0,0 +1,49 @@
+"""
+Benchmark for the streaming import pipeline.
+Writes a synthetic NDJSON file and measures rows per second through import_file.
+
+Usage: python -m benchmarks.bench_import [rows]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from app.services.expense_service import ExpenseService
+from benchmarks.bench_store import CATEGORIES
+
+
+def write_ndjson(path: str, rows: int) -> None:
+    rng = random.Random(rows)
+    start = datetime(2020, 1, 1)
+    with open(path, "w", encoding="utf-8") as fp:
+        for i in range(rows):
+            fp.write(json.dumps({
+                "user_id": rng.randint(1, 1000),
+                "amount": round(rng.uniform(1, 500), 2),
+                "category": rng.choice(CATEGORIES),
+                "description": f"expense {i}",
+                "date": (start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4))).isoformat(),
+            }))
+            fp.write("\n")
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    rows = int(args[0]) if args else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.ndjson")
+        write_ndjson(path, rows)
+        service = ExpenseService()
+        started = time.perf_counter()
+        report = service.import_file(path)
+        elapsed = time.perf_counter() - started
+    print(f"imported {report.imported:,} rows ({report.failed} errors) in {elapsed:.2f}s "
+          f"-> {report.imported / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Memory benchmark for the Expense record.
+Reports bytes per expense for the slotted, category-interned Expense against
+the previous plain dataclass layout, for rows built the way importers build
+them (every field a freshly parsed string or number).
+
+Usage: python -m benchmarks.bench_model [size]
+"""
+
+import random
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+from app.models.expense import Expense
+from benchmarks.bench_store import CATEGORIES
+
+
+@dataclass
+class DictExpense:
+    """The previous Expense layout: a regular dataclass with a per-instance __dict__."""
+    id: Optional[int]
+    user_id: int
+    amount: float
+    category: str
+    description: str
+    date: datetime = field(default_factory=datetime.now)
+
+
+def rows(size: int):
+    rng = random.Random(size)
+    start = datetime(2020, 1, 1)
+    for i in range(1, size + 1):
+        yield dict(
+            id=i,
+            user_id=rng.randint(1, 1000),
+            amount=round(rng.uniform(1, 500), 2),
+            # A parsed copy, not the shared literal, as a CSV or JSON reader would produce.
+            category="".join(rng.choice(CATEGORIES)),
+            description=f"expense {i}",
+            date=start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4)),
+        )
+
+
+def bytes_per_expense(cls, size: int) -> float:
+    tracemalloc.start()
+    # Everything a record keeps alive is counted: its fields as well as the instance.
+    expenses = [cls(**row) for row in rows(size)]
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Per-record cost only: the list of references is the same for both layouts.
+    return (used - sys.getsizeof(expenses)) / size
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    size = int(args[0]) if args else 200_000
+    before = bytes_per_expense(DictExpense, size)
+    after = bytes_per_expense(Expense, size)
+    print(f"{size:,} expenses | dataclass {before:.0f} B/expense | slotted + interned {after:.0f} B/expense"
+          f" | saved {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark for company-wide reports: in-process loops vs the process pool.
+Reports milliseconds per category/day aggregation over a columnar snapshot.
+
+Usage: python -m benchmarks.bench_parallel [size] [workers]
+"""
+
+import random
+import sys
+import time
+from array import array
+from app.services.columnar_store import Columns
+from app.services.parallel import ParallelAnalytics
+from benchmarks.bench_store import CATEGORIES
+
+MINUTE_MICROS = 60_000_000
+
+
+def make_columns(size: int) -> Columns:
+    rng = random.Random(size)
+    start = 1_577_836_800_000_000  # 2020-01-01
+    return Columns(
+        amounts=array("d", (round(rng.uniform(1, 500), 2) for _ in range(size))),
+        codes=array("i", (rng.randrange(len(CATEGORIES)) for _ in range(size))),
+        timestamps=array("q", (start + rng.randint(0, 60 * 24 * 365 * 4) * MINUTE_MICROS for _ in range(size))),
+        user_ids=array("q", (rng.randint(1, 1000) for _ in range(size))),
+        categories=list(CATEGORIES),
+    )
+
+
+def timed(analytics: ParallelAnalytics, columns: Columns, repeat: int = 3) -> float:
+    analytics.aggregate(columns)  # warm up the pool
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        analytics.aggregate(columns)
+    return (time.perf_counter() - begin) / repeat * 1e3
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    size = int(args[0]) if args else 2_000_000
+    workers = int(args[1]) if len(args) > 1 else None
+    columns = make_columns(size)
+    with ParallelAnalytics(workers=1) as sequential, ParallelAnalytics(workers=workers, threshold=0) as pooled:
+        print(f"{size} rows | in-process {timed(sequential, columns):.1f} ms | "
+              f"{pooled.workers} workers {timed(pooled, columns):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
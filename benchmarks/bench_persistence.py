@@ -0,0 +1,63 @@
+"""
+Benchmark for ExpenseService restarts.
+Times reloading the same ledger from a JSON export, from the write-ahead log
+alone and from a snapshot.
+
+Usage: python -m benchmarks.bench_persistence [size]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from benchmarks.bench_store import CATEGORIES
+
+
+def make_expenses(size: int):
+    rng = random.Random(size)
+    start = datetime(2020, 1, 1)
+    return [
+        Expense(
+            id=i,
+            user_id=rng.randint(1, 1000),
+            amount=round(rng.uniform(1, 500), 2),
+            category=rng.choice(CATEGORIES),
+            description=f"expense {i}",
+            date=start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4)),
+        )
+        for i in range(1, size + 1)
+    ]
+
+
+def timed(func) -> float:
+    begin = time.perf_counter()
+    func()
+    return time.perf_counter() - begin
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    size = int(args[0]) if args else 500_000
+    with tempfile.TemporaryDirectory() as directory:
+        wal = os.path.join(directory, "wal")
+        service = ExpenseService.open(wal)
+        written = timed(lambda: service.add_expenses(make_expenses(size)))
+        export = os.path.join(directory, "expenses.json")
+        service.export_to_json(export)
+        service.close()
+        from_json = timed(lambda: ExpenseService().import_from_json(export))
+        from_log = timed(lambda: ExpenseService.open(wal).close())
+        service = ExpenseService.open(wal)
+        checkpoint = timed(service.checkpoint)
+        service.close()
+        from_snapshot = timed(lambda: ExpenseService.open(wal).close())
+    print(f"{size} rows | logged write {written:.2f} s | checkpoint {checkpoint:.2f} s | restart from "
+          f"JSON {from_json:.2f} s, log {from_log:.2f} s, snapshot {from_snapshot:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
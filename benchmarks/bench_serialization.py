@@ -0,0 +1,57 @@
+"""
+Benchmark for list-response serialization.
+Compares the response_model path (to_dict, Pydantic validation, jsonable_encoder,
+json.dumps) with the pre-encoded fast path, cold and with memoized rows.
+
+Usage: python -m benchmarks.bench_serialization [size ...]
+"""
+
+import sys
+import timeit
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import parse_obj_as
+from api.responses import FastJSONResponse
+from api.schemas.expense_schema import ExpenseOut
+from benchmarks.bench_store import build_service
+
+
+def validated_body(expenses) -> bytes:
+    models = parse_obj_as(List[ExpenseOut], [expense.to_dict() for expense in expenses])
+    return JSONResponse(jsonable_encoder(models)).body
+
+
+def bench(size: int, repeat: int = 3) -> dict:
+    service = build_service(size)
+    expenses = service.get_all_expenses()
+
+    def cold() -> bytes:
+        service.serializer.clear()
+        return FastJSONResponse(service.expenses_json(service.get_all_expenses)).body
+
+    def warm() -> bytes:
+        return FastJSONResponse(service.expenses_json(service.get_all_expenses)).body
+
+    def best(func) -> float:
+        return min(timeit.repeat(func, number=1, repeat=repeat)) * 1e3
+
+    return {
+        "size": size,
+        "validated_ms": best(lambda: validated_body(expenses)),
+        "fast_cold_ms": best(cold),
+        "fast_warm_ms": best(warm),
+    }
+
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [1_000, 10_000, 100_000]
+    for size in sizes:
+        result = bench(size)
+        print(f"{result['size']:>10,} rows | response_model {result['validated_ms']:.1f} ms"
+              f" | fast (cold) {result['fast_cold_ms']:.1f} ms | fast (memoized) {result['fast_warm_ms']:.1f} ms"
+              f" | speedup {result['validated_ms'] / result['fast_warm_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
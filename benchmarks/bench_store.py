@@ -0,0 +1,74 @@
+"""
+Benchmark for index lookups on ExpenseService.
+Shows that id, date range, "most recent", keyword, keyset page, filtered query and monthly rollup lookups stay flat as the store grows.
+
+Usage: python -m benchmarks.bench_store [size ...]
+"""
+
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from app.services.pagination import encode_cursor
+
+CATEGORIES = ["Food", "Travel", "Office", "Health", "Rent", "Utilities", "Misc"]
+
+
+def build_service(size: int) -> ExpenseService:
+    rng = random.Random(size)
+    start = datetime(2020, 1, 1)
+    service = ExpenseService()
+    for i in range(1, size + 1):
+        service.add_expense(Expense(
+            id=i,
+            user_id=rng.randint(1, 1000),
+            amount=round(rng.uniform(1, 500), 2),
+            category=rng.choice(CATEGORIES),
+            description=f"expense {i}",
+            date=start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4)),
+        ))
+    return service
+
+
+def bench(size: int, lookups: int = 10000) -> dict:
+    service = build_service(size)
+    rng = random.Random(0)
+    ids = [rng.randint(1, size) for _ in range(lookups)]
+    get_seconds = timeit.timeit(lambda: [service.get_expense_by_id(i) for i in ids], number=1)
+    user_seconds = timeit.timeit(lambda: service.get_expenses_by_user(rng.randint(1, 1000)), number=100)
+    window = (datetime(2021, 3, 1), datetime(2021, 3, 1, 6))
+    range_seconds = timeit.timeit(lambda: service.filter_expenses_by_date_range(*window), number=100)
+    recent_seconds = timeit.timeit(lambda: service.get_recent_expenses(5), number=1000)
+    search_seconds = timeit.timeit(lambda: service.search_expenses("expense 4242 trav", limit=20), number=1000)
+    deep_cursor = encode_cursor(service.get_expense_by_id(size // 2 or 1))
+    page_seconds = timeit.timeit(lambda: service.get_page(limit=100, cursor=deep_cursor), number=1000)
+    query_seconds = timeit.timeit(lambda: service.get_page(limit=100, category="Food", user_id=42, min_amount=100),
+                                  number=100)
+    monthly_seconds = timeit.timeit(lambda: service.get_monthly_summary(2022, 6), number=1000)
+    return {
+        "size": size,
+        "get_by_id_us": get_seconds / lookups * 1e6,
+        "by_user_us": user_seconds / 100 * 1e6,
+        "date_range_us": range_seconds / 100 * 1e6,
+        "recent_us": recent_seconds / 1000 * 1e6,
+        "search_us": search_seconds / 1000 * 1e6,
+        "page_us": page_seconds / 1000 * 1e6,
+        "query_us": query_seconds / 100 * 1e6,
+        "monthly_us": monthly_seconds / 1000 * 1e6,
+    }
+
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [1_000, 10_000, 100_000]
+    for size in sizes:
+        result = bench(size)
+        print(f"{result['size']:>10,} rows | get_by_id {result['get_by_id_us']:.3f} us | by_user {result['by_user_us']:.1f} us"
+              f" | 6h date range {result['date_range_us']:.1f} us | recent(5) {result['recent_us']:.2f} us"
+              f" | search {result['search_us']:.1f} us | page(100) {result['page_us']:.1f} us"
+              f" | query {result['query_us']:.1f} us | monthly summary {result['monthly_us']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Deterministic synthetic ledgers for benchmarks.
+The same (rows, seed) always yields the same expenses: categories with
+realistic shares and log-normal amounts, busier weekends and Decembers,
+daytime-weighted hours, and users whose activity follows a Zipf-like curve.
+
+Usage: python -m benchmarks.ledger [rows] [path.ndjson]
+"""
+
+import json
+import math
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+from app.models.expense import Expense
+
+# (category, share of expenses, median amount, log-normal sigma, merchants)
+CATEGORY_PROFILES = [
+    ("Food", 0.30, 18.0, 0.6, ["Corner Deli", "Green Grocer", "Noodle Bar", "Pizza Place", "Coffee House", "Bakery"]),
+    ("Transport", 0.16, 12.0, 0.7, ["Metro Card", "City Taxi", "Fuel Station", "Parking", "Bike Share"]),
+    ("Shopping", 0.13, 45.0, 0.9, ["Book Store", "Hardware Shop", "Online Market", "Clothing Outlet"]),
+    ("Entertainment", 0.09, 30.0, 0.8, ["Cinema", "Concert Hall", "Streaming Service", "Museum"]),
+    ("Utilities", 0.07, 85.0, 0.35, ["Power Company", "Water Board", "Internet Provider", "Mobile Plan"]),
+    ("Health", 0.06, 60.0, 0.9, ["Pharmacy", "Dental Clinic", "Gym Membership", "Optician"]),
+    ("Office", 0.06, 40.0, 0.8, ["Stationery", "Printer Ink", "Coworking Space", "Software License"]),
+    ("Travel", 0.05, 220.0, 0.8, ["Airline", "Hotel", "Train Ticket", "Car Rental"]),
+    ("Rent", 0.03, 1200.0, 0.25, ["Landlord", "Property Manager"]),
+    ("Misc", 0.05, 20.0, 1.0, ["Gift", "Donation", "Bank Fee", "Post Office"]),
+]
+NOTES = ["", "", "", "team", "client", "weekly", "refund check", "shared"]
+# Relative activity by weekday (Monday first) and by hour of day.
+WEEKDAY_WEIGHTS = [1.0, 0.95, 1.0, 1.05, 1.25, 1.4, 1.1]
+HOUR_WEIGHTS = [0.1, 0.05, 0.05, 0.05, 0.1, 0.2, 0.5, 1.0, 1.4, 1.2, 1.1, 1.3,
+                1.8, 1.5, 1.1, 1.0, 1.1, 1.4, 1.7, 1.6, 1.2, 0.8, 0.5, 0.2]
+END = datetime(2024, 12, 31)
+
+
+def default_users(rows: int) -> int:
+    return max(10, rows // 100)
+
+
+def generate_expenses(rows: int, users: Optional[int] = None, years: int = 3, seed: int = 0) -> List[Expense]:
+    """`rows` expenses with ids 1..rows, dated over the `years` before 2024-12-31."""
+    rng = random.Random(seed)
+    users = users or default_users(rows)
+    start = END - timedelta(days=365 * years)
+    days = [start + timedelta(days=offset) for offset in range((END - start).days + 1)]
+    day_weights = [WEEKDAY_WEIGHTS[day.weekday()] * (1.3 if day.month == 12 else 1.0) for day in days]
+    user_weights = [1.0 / rank ** 0.8 for rank in range(1, users + 1)]
+    profiles = rng.choices(CATEGORY_PROFILES, weights=[profile[1] for profile in CATEGORY_PROFILES], k=rows)
+    picked_days = rng.choices(days, weights=day_weights, k=rows)
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=rows)
+    user_ids = rng.choices(range(1, users + 1), weights=user_weights, k=rows)
+    # Spread the busiest ranks over the id space so user id is not a proxy for activity.
+    shuffled = list(range(1, users + 1))
+    rng.shuffle(shuffled)
+    expenses = []
+    for i in range(rows):
+        category, _, median, sigma, merchants = profiles[i]
+        note = rng.choice(NOTES)
+        merchant = rng.choice(merchants)
+        expenses.append(Expense(
+            id=i + 1,
+            user_id=shuffled[user_ids[i] - 1],
+            amount=max(0.01, round(rng.lognormvariate(math.log(median), sigma), 2)),
+            category=category,
+            description=f"{merchant} {note}".rstrip(),
+            date=picked_days[i] + timedelta(hours=hours[i], minutes=rng.randrange(60), seconds=rng.randrange(60)),
+        ))
+    return expenses
+
+
+def generate_records(rows: int, **options) -> Iterator[dict]:
+    """The same ledger as import-ready dicts without ids."""
+    for expense in generate_expenses(rows, **options):
+        record = expense.to_dict()
+        del record["id"]
+        yield record
+
+
+def write_ndjson(path: str, rows: int, **options) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for record in generate_records(rows, **options):
+            f.write(json.dumps(record) + "\n")
+
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    rows = int(args[0]) if args else 10
+    if len(args) > 1:
+        write_ndjson(args[1], rows)
+        return
+    for record in generate_records(rows):
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
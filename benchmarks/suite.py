@@ -0,0 +1,345 @@
+"""
+Benchmark suite for ExpenseService, its export/import paths and the HTTP API.
+Seeds an in-memory service with a deterministic synthetic ledger, times every
+public ExpenseService method and a set of endpoints served over ASGI, and
+writes the results as JSON so runs from different commits can be compared.
+
+Usage:
+    python -m benchmarks.suite [--rows N] [--repeat N] [--only TEXT] [--skip-http]
+                               [--output results.json] [--compare baseline.json] [--threshold 1.25]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, List, Optional, Tuple
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from app.services.query import ExpenseQuery
+from benchmarks.ledger import default_users, generate_expenses, generate_records, write_ndjson
+
+# Methods that are not timed on their own, and the case that exercises them.
+COVERED_BY = {"close": "open", "expenses": "get_all_expenses"}
+IMPORT_ROWS = 10_000
+HTTP_ENDPOINTS = [
+    "/expenses/{id}",
+    "/expenses/?limit=100",
+    "/expenses/filter/by-category/?category=food&limit=100",
+    "/expenses/query/?category=travel&min_amount=100&limit=100",
+    "/expenses/search/?keyword=coffee&limit=50",
+    "/expenses/summary/monthly/?year=2024&month=6",
+    "/expenses/summary/by-category/?user_id={user}",
+    "/expenses/stats/total/",
+    "/expenses/stats/top-categories/",
+    "/expenses/stats/peak-day/",
+]
+
+
+@dataclass
+class Case:
+    name: str
+    group: str
+    func: Callable[[int], object]  # called with the repetition number
+    number: int = 1  # calls per timed repetition
+    repeat: Optional[int] = None  # overrides the suite's repeat count
+
+
+def drain(iterator) -> int:
+    return sum(1 for _ in iterator)
+
+
+class Suite:
+    def __init__(self, rows: int, repeat: int = 5, seed: int = 0):
+        self.rows, self.repeat, self.seed = rows, repeat, seed
+        self.users = default_users(rows)
+        started = time.perf_counter()
+        self.service = ExpenseService()
+        self.service.add_expenses(generate_expenses(rows, seed=seed))
+        self.seed_seconds = time.perf_counter() - started
+        self.tmp = tempfile.mkdtemp(prefix="expense-bench-")
+        # Delete cases consume the upper half, newest first; `ids` samples the lower half.
+        self._victims = iter(range(rows, rows // 2, -1))
+        self._fresh = itertools.count(rows + 1)
+
+    def new_expenses(self, count: int) -> List[Expense]:
+        # Users the generated ledger does not have, so delete_where only removes rows added here.
+        return [Expense(id=None, user_id=self.users + (i % self.users) + 1, amount=12.5, category="Food",
+                        description=f"bench lunch {next(self._fresh)}", date=datetime(2024, 6, 1, 12))
+                for i in range(count)]
+
+    def victims(self, count: int) -> List[int]:
+        """Up to `count` ids no delete case has taken yet; fewer once the upper half is used up."""
+        return list(itertools.islice(self._victims, count))
+
+    def ids(self, i: int, count: int = 1) -> List[int]:
+        """
+        Up to `count` distinct ids spread over the lower half of the ledger (delete
+        cases eat the top); small ledgers get fewer, so batches never repeat an id.
+        """
+        half = max(1, self.rows // 2)
+        stride = 104729 if math.gcd(104729, half) == 1 else 1
+        return [(i * 7919 + k * stride) % half + 1 for k in range(min(count, half))]
+
+    def prepare(self) -> None:
+        """Write the files read by the import and durability cases."""
+        self.records = list(generate_records(IMPORT_ROWS, seed=self.seed + 1))
+        write_ndjson(os.path.join(self.tmp, "import.ndjson"), IMPORT_ROWS, seed=self.seed + 1)
+        with open(os.path.join(self.tmp, "import.json"), "w", encoding="utf-8") as f:
+            json.dump(self.records, f)
+        journaled = ExpenseService.open(os.path.join(self.tmp, "wal"), fsync="never")
+        journaled.add_expenses(generate_expenses(min(self.rows, 100_000), seed=self.seed))
+        journaled.checkpoint()
+        journaled.close()
+
+    def cases(self) -> List[Case]:
+        s, users = self.service, self.users
+        june, week = (date(2024, 6, 1), date(2024, 6, 30)), (date(2024, 6, 3), date(2024, 6, 9))
+        food = ExpenseQuery(category="food", min_amount=50.0)
+        june_query = ExpenseQuery.build(*june)
+        ndjson, exported, durable = (os.path.join(self.tmp, name) for name in ("import.ndjson", "import.json", "wal"))
+        return [
+            # Lookups and listings
+            Case("get_expense_by_id", "read", lambda i: [s.get_expense_by_id(x) for x in self.ids(i, 1000)]),
+            Case("expense_json", "read", lambda i: [s.expense_json(x) for x in self.ids(i, 1000)]),
+            Case("get_all_expenses", "read", lambda i: s.get_all_expenses(), repeat=3),
+            Case("get_expenses_by_user", "read", lambda i: s.get_expenses_by_user(i % users + 1), number=20),
+            Case("filter_expenses_by_category", "read", lambda i: s.filter_expenses_by_category("travel")),
+            Case("filter_expenses_by_date_range", "read", lambda i: s.filter_expenses_by_date_range(
+                datetime(2024, 6, 3), datetime(2024, 6, 9, 23, 59)), number=20),
+            Case("get_expenses_by_date_range", "read", lambda i: s.get_expenses_by_date_range(*week), number=20),
+            Case("get_recent_expenses", "read", lambda i: s.get_recent_expenses(20), number=100),
+            Case("get_expenses_containing_keyword", "read", lambda i: s.get_expenses_containing_keyword("coffee")),
+            Case("search_expenses", "read", lambda i: s.search_expenses("coff", limit=50), number=20),
+            Case("get_page", "read", lambda i: s.get_page(limit=100, category="food", min_amount=20.0), number=20),
+            Case("query_expenses", "read", lambda i: s.query_expenses(food, 100), number=20),
+            Case("page_json", "read", lambda i: s.page_json(limit=100, user_id=i % users + 1), number=20),
+            Case("expenses_json", "read", lambda i: s.expenses_json(s.get_recent_expenses, 100), number=20),
+            Case("iter_query", "read", lambda i: drain(s.iter_query(june_query))),
+            Case("iter_matching", "read", lambda i: drain(s.iter_matching(lambda e: e.amount > 1000)), repeat=3),
+            Case("find_duplicates", "read", lambda i: s.find_duplicates(), repeat=3),
+            Case("columns", "read", lambda i: s.columns(), repeat=3),
+            # Reports
+            Case("total_amount", "report", lambda i: s.total_amount(), number=1000),
+            Case("average_amount", "report", lambda i: s.average_amount(), number=1000),
+            Case("get_total_expense", "report", lambda i: s.get_total_expense(), number=1000),
+            Case("total_amount_by_category", "report", lambda i: s.total_amount_by_category(), number=100),
+            Case("get_top_expense_categories", "report", lambda i: s.get_top_expense_categories(5), number=100),
+            Case("get_expense_summary_by_category", "report",
+                 lambda i: s.get_expense_summary_by_category(i % users + 1), number=20),
+            Case("get_monthly_summary", "report", lambda i: s.get_monthly_summary(2024, i % 12 + 1), number=20),
+            Case("get_weekly_summary", "report", lambda i: s.get_weekly_summary(week[0]), number=20),
+            Case("get_daily_average", "report", lambda i: s.get_daily_average(*june), number=20),
+            Case("get_daily_totals", "report", lambda i: s.get_daily_totals(date(2024, 1, 1), date(2024, 3, 31))),
+            Case("get_peak_expense_day", "report", lambda i: s.get_peak_expense_day(), number=100),
+            Case("verify_aggregates", "report", lambda i: s.verify_aggregates(), repeat=1),
+            # Exports and imports
+            Case("stream_csv", "io", lambda i: drain(s.stream_csv(query=june_query))),
+            Case("stream_json", "io", lambda i: drain(s.stream_json(query=june_query))),
+            Case("export_to_csv", "io", lambda i: s.export_to_csv(os.path.join(self.tmp, "all.csv")), repeat=1),
+            Case("export_to_json", "io", lambda i: s.export_to_json(os.path.join(self.tmp, "all.json")), repeat=1),
+            Case("import_records", "io", lambda i: ExpenseService().import_records(self.records), repeat=3),
+            Case("import_file", "io", lambda i: ExpenseService().import_file(ndjson), repeat=3),
+            Case("import_from_json", "io", lambda i: ExpenseService().import_from_json(exported), repeat=3),
+            Case("open", "io", lambda i: ExpenseService.open(durable).close(), repeat=1),
+            Case("checkpoint", "io", lambda i: self._checkpoint(durable), repeat=1),
+            # Writes, least destructive first
+            Case("add_expense", "write", lambda i: [s.add_expense(e) for e in self.new_expenses(100)]),
+            Case("add_expenses", "write", lambda i: s.add_expenses(self.new_expenses(1000))),
+            Case("create_many", "write", lambda i: s.create_many(self.new_expenses(1000))),
+            Case("update_expense", "write",
+                 lambda i: [s.update_expense(x, description=f"edited {i}") for x in self.ids(i, 100)]),
+            Case("update_many", "write",
+                 lambda i: s.update_many([{"id": x, "amount": 20.0 + i} for x in self.ids(i, 1000)])),
+            Case("update_where", "write",
+                 lambda i: s.update_where(ExpenseQuery(user_id=i % users + 1), description=f"batch {i}")),
+            Case("categorize_all", "write",
+                 lambda i: s.categorize_all({"misc": "Other"} if i % 2 == 0 else {"other": "Misc"})),
+            Case("apply_discount_to_category", "write", lambda i: s.apply_discount_to_category("rent", 1)),
+            Case("delete_expense", "write", lambda i: [s.delete_expense(x) for x in self.victims(100)]),
+            Case("delete_many", "write", lambda i: s.delete_many(self.victims(1000))),
+            Case("delete_where", "write", lambda i: s.delete_where(ExpenseQuery(user_id=users + i % users + 1))),
+        ]
+
+    def missing_cases(self) -> List[str]:
+        """Public ExpenseService methods with no benchmark of their own or through COVERED_BY."""
+        timed = {case.name for case in self.cases()}
+        public = {name for name in dir(ExpenseService) if not name.startswith("_")}
+        return sorted(name for name in public if name not in timed and COVERED_BY.get(name) not in timed)
+
+    def _checkpoint(self, directory: str) -> None:
+        service = ExpenseService.open(directory, fsync="never")
+        try:
+            service.checkpoint()
+        finally:
+            service.close()
+
+    def run(self, only: Optional[str] = None, skip_http: bool = False,
+            requests: int = 500, concurrency: int = 20) -> List[dict]:
+        self.prepare()
+        results = []
+        for case in self.cases():
+            if only and only not in case.name:
+                continue
+            results.append(time_case(case, self.repeat))
+        if not skip_http:
+            for result in asyncio.run(self.http(requests, concurrency)):
+                if not only or only in result["name"]:
+                    results.append(result)
+        return results
+
+    async def http(self, requests: int, concurrency: int) -> List[dict]:
+        """Throughput and latency per endpoint against the sync routes, served in-process over ASGI."""
+        import httpx
+        from fastapi import FastAPI
+        from api.routes import expense_routes
+        app = FastAPI()
+        app.include_router(expense_routes.router, prefix="/expenses")
+        app.dependency_overrides[expense_routes.get_service] = lambda: self.service
+        results = []
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            for endpoint in HTTP_ENDPOINTS:
+                results.append(await hammer(client, endpoint, requests, concurrency, self))
+        return results
+
+
+def time_case(case: Case, repeat: int) -> dict:
+    runs = case.repeat or repeat
+    case.func(-1)  # warm up
+    seconds = []
+    for i in range(runs):
+        started = time.perf_counter()
+        for k in range(case.number):
+            case.func(i * case.number + k)
+        seconds.append((time.perf_counter() - started) / case.number)
+    return summarize(case.name, case.group, seconds)
+
+
+def percentile(ordered: List[float], pct: int) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, -(-len(ordered) * pct // 100) - 1)]
+
+
+def summarize(name: str, group: str, seconds: List[float], **extra) -> dict:
+    ordered = sorted(seconds)
+    median = statistics.median(ordered)
+    return {
+        "name": name,
+        "group": group,
+        "unit": "seconds",
+        "runs": len(ordered),
+        "min": ordered[0],
+        "median": median,
+        "mean": statistics.fmean(ordered),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "ops_per_second": 1 / median if median else None,
+        **extra,
+    }
+
+
+async def hammer(client, endpoint: str, requests: int, concurrency: int, suite: Suite) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        url = endpoint.format(id=suite.ids(i)[0], user=i % suite.users + 1)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(f"GET {endpoint}", "http", latencies, requests_per_second=requests / elapsed,
+                     concurrency=concurrency)
+
+
+def metadata(suite: Suite) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rows": suite.rows,
+        "users": suite.users,
+        "seed": suite.seed,
+        "repeat": suite.repeat,
+        "seed_seconds": suite.seed_seconds,
+    }
+
+
+def compare(current: List[dict], baseline: List[dict], threshold: float) -> Tuple[List[str], List[str]]:
+    """Report lines for every benchmark in both runs, and the names slower than `threshold` x baseline."""
+    previous = {result["name"]: result for result in baseline}
+    lines, regressions = [], []
+    for result in current:
+        before = previous.get(result["name"])
+        if before is None or not before["median"]:
+            continue
+        ratio = result["median"] / before["median"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(result["name"])
+        lines.append(f"{result['name']:<64} {before['median'] * 1e3:>10.3f} ms -> "
+                     f"{result['median'] * 1e3:>10.3f} ms  x{ratio:.2f}{flag}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ExpenseService benchmark suite")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--requests", type=int, default=500, help="requests per HTTP endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    suite = Suite(args.rows, args.repeat, args.seed)
+    try:
+        results = suite.run(args.only, args.skip_http, args.requests, args.concurrency)
+    finally:
+        shutil.rmtree(suite.tmp, ignore_errors=True)
+    report = {"meta": metadata(suite), "results": results}
+    for result in results:
+        print(f"{result['group']:<7} {result['name']:<64} median {result['median'] * 1e3:>10.3f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        lines, regressions = compare(results, baseline, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s) above x{args.threshold}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
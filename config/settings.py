@@ -1,7 +1,9 @@
 """
 Application configuration settings using Pydantic BaseSettings.
+The environment and `.env` are read on first use of `settings`/`get_settings()`, not on import.
 """
 
+from functools import lru_cache
 from pydantic import BaseSettings, Field
 from typing import Optional
 
@@ -18,7 +20,12 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = Field("password", env="DB_PASSWORD")
     DB_NAME: str = Field("expense_db", env="DB_NAME")
     DB_POOL_SIZE: int = Field(10, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(20, env="DB_MAX_OVERFLOW")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")  # seconds
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING")
     DB_TIMEOUT: int = Field(30, env="DB_TIMEOUT")
+    DB_ECHO: bool = Field(False, env="DB_ECHO")
+    DATABASE_URL: Optional[str] = Field(None, env="DATABASE_URL")  # overrides the DB_* settings, e.g. sqlite:///expenses.db
 
     # Email (Optional example for notifications)
     EMAIL_HOST: Optional[str] = Field(None, env="EMAIL_HOST")
@@ -39,6 +46,24 @@ class Settings(BaseSettings):
     REDIS_DB: Optional[int] = Field(0, env="REDIS_DB")
     REDIS_PASSWORD: Optional[str] = Field(None, env="REDIS_PASSWORD")
 
+    # Response cache for summary/stats queries: "memory", "redis" or "none"
+    CACHE_BACKEND: str = Field("memory", env="CACHE_BACKEND")
+    CACHE_TTL: int = Field(60, env="CACHE_TTL")  # seconds
+    CACHE_MAX_ENTRIES: int = Field(1024, env="CACHE_MAX_ENTRIES")
+
+    # Duplicate submissions: "allow", "flag" or "reject" expenses that repeat another
+    # (same user, amount, category and normalized description) within the window
+    DUPLICATE_POLICY: str = Field("allow", env="DUPLICATE_POLICY")
+    DUPLICATE_WINDOW: float = Field(0.0, env="DUPLICATE_WINDOW")  # seconds
+
+    # Persistence of the in-memory service: write-ahead log plus snapshots in WAL_DIR
+    # (unset keeps it memory-only). WAL_FSYNC is "always", "group", "interval" or "never";
+    # "interval" and "never" acknowledge writes before they are on disk.
+    WAL_DIR: Optional[str] = Field(None, env="WAL_DIR")
+    WAL_FSYNC: str = Field("group", env="WAL_FSYNC")
+    WAL_SYNC_INTERVAL: float = Field(0.05, env="WAL_SYNC_INTERVAL")  # seconds
+    WAL_CHECKPOINT_BYTES: int = Field(64 * 1024 * 1024, env="WAL_CHECKPOINT_BYTES")  # log size that triggers a snapshot
+
     # File storage paths
     EXPORT_DIR: str = Field("exports", env="EXPORT_DIR")
     LOG_DIR: str = Field("logs", env="LOG_DIR")
@@ -60,4 +85,11 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
 
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    return Settings()
+
+def __getattr__(name):
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -37,6 +37,10 @@ setup(
         "loguru==0.6.0",
         "httpx==0.23.0",
         "email-validator==1.3.1",
+        "SQLAlchemy[asyncio]>=2.0",
+        "aiomysql>=0.2",
+        "aiosqlite>=0.19",
+        "orjson>=3.8",
     ],
     entry_points={
         "console_scripts": [
@@ -0,0 +1,149 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+import api
+from app.database import db
+from api.routes import async_expense_routes, expense_routes
+from app.database.db import create_async_db_engine, create_db_engine, init_db
+from app.models.expense import Expense
+from app.services.async_expense_service import AsyncExpenseService
+from app.services.expense_service import ExpenseService
+from app.services.sql_expense_service import SqlExpenseService
+
+SEED = [
+    Expense(id=None, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1, 12)),
+    Expense(id=None, user_id=1, amount=50.0, category="Travel", description="Taxi ride", date=datetime(2024, 5, 2, 9)),
+    Expense(id=None, user_id=2, amount=30.0, category="food", description="Dinner", date=datetime(2024, 5, 2, 20)),
+]
+
+def seed():
+    return [e.clone() for e in SEED]
+
+@pytest.fixture
+def service():
+    service = ExpenseService()
+    service.add_expenses(seed())
+    return service
+
+@pytest.fixture
+def client(service):
+    api.app.dependency_overrides[expense_routes.get_service] = lambda: service
+    try:
+        with TestClient(api.app) as client:
+            yield client
+    finally:
+        api.app.dependency_overrides.clear()
+
+@pytest.fixture
+def async_client(tmp_path):
+    # Seeded through a sync engine; the async engine opens the same file inside the client's event loop.
+    url = f"sqlite:///{tmp_path / 'expenses.db'}"
+    engine = create_db_engine(url)
+    init_db(engine)
+    SqlExpenseService.from_engine(engine).add_expenses(seed())
+    engine.dispose()
+    services = []
+
+    def service():
+        if not services:
+            services.append(AsyncExpenseService.from_engine(create_async_db_engine(url)))
+        return services[0]
+
+    api.app.dependency_overrides[async_expense_routes.get_service] = service
+    try:
+        with TestClient(api.app) as client:
+            yield client
+    finally:
+        api.app.dependency_overrides.clear()
+
+def test_async_routes(async_client):
+    listing = async_client.get("/async/expenses/", params={"limit": 2})
+    assert [e["id"] for e in listing.json()] == [1, 2] and listing.headers["X-Next-Cursor"]
+    rest = async_client.get("/async/expenses/", params={"cursor": listing.headers["X-Next-Cursor"]})
+    assert [e["id"] for e in rest.json()] == [3]
+    assert async_client.get("/async/expenses/2").json()["description"] == "Taxi ride"
+    assert async_client.get("/async/expenses/9").status_code == 404
+    by_category = async_client.get("/async/expenses/filter/by-category/", params={"category": "FOOD", "fields": "id"})
+    assert by_category.json() == [{"id": 1}, {"id": 3}]
+    by_date = async_client.get("/async/expenses/filter/by-date/",
+                               params={"start_date": "2024-05-02", "end_date": "2024-05-02"})
+    assert [e["id"] for e in by_date.json()] == [2, 3]
+    assert [e["id"] for e in async_client.get("/async/expenses/search/", params={"keyword": "din"}).json()] == [3]
+    query = async_client.get("/async/expenses/query/", params={"category": "food", "min_amount": 25})
+    assert [e["id"] for e in query.json()] == [3]
+    assert async_client.get("/async/expenses/stats/total/").json() == {"total_expense": 100.0}
+    assert async_client.get("/async/expenses/stats/top-categories/", params={"limit": 1}).json() == [
+        {"category": "Travel", "total_amount": 50.0}]
+    assert async_client.get("/async/expenses/stats/peak-day/").json() == {"date": "2024-05-02", "total_amount": 80.0}
+    assert async_client.get("/async/expenses/summary/by-category/").json() == {"Food": 20.0, "Travel": 50.0, "food": 30.0}
+    assert async_client.get("/async/expenses/stats/daily-average/").json() == {
+        "average": 50.0, "start_date": "2024-05-01", "end_date": "2024-05-02"}
+    assert async_client.get("/async/expenses/stats/daily-average/",
+                            params={"start_date": "2024-05-02"}).json()["average"] == 80.0
+    assert async_client.delete("/async/expenses/1").status_code == 204
+    assert async_client.delete("/async/expenses/1").status_code == 404
+
+def test_async_routes_create_tables_and_dispose_the_engine(tmp_path, monkeypatch):
+    engine = create_async_db_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    monkeypatch.setattr(db, "_async_engine", engine)
+    with TestClient(api.app) as client:
+        assert client.get("/async/expenses/").json() == []
+        assert async_expense_routes._service is not None
+    assert async_expense_routes._service is None and db._async_engine is None
+
+def test_list_routes_serve_pre_encoded_json(client, service):
+    listing = client.get("/expenses/", params={"limit": 2})
+    assert listing.json() == [e.to_dict() for e in service.get_all_expenses()[:2]]
+    assert [e["id"] for e in client.get("/expenses/", params={"cursor": listing.headers["X-Next-Cursor"]}).json()] == [3]
+    assert client.get("/expenses/2").json() == service.get_expense_by_id(2).to_dict()
+    assert client.get("/expenses/9").status_code == 404
+    assert client.get("/expenses/filter/by-category/", params={"category": "food", "fields": "id,amount"}).json() == [
+        {"id": 1, "amount": 20.0}, {"id": 3, "amount": 30.0}]
+    by_date = client.get("/expenses/filter/by-date/", params={"start_date": "2024-05-02", "end_date": "2024-05-02"})
+    assert [e["id"] for e in by_date.json()] == [2, 3]
+    assert [e["id"] for e in client.get("/expenses/search/", params={"keyword": "taxi"}).json()] == [2]
+    assert client.get("/expenses/", params={"fields": "nope"}).status_code == 400
+
+def test_query_route_combines_filters(client):
+    query = client.get("/expenses/query/", params={"category": "FOOD", "min_amount": 25, "fields": "id,user_id"})
+    assert query.json() == [{"id": 3, "user_id": 2}]
+    first = client.get("/expenses/query/", params={"user_id": 1, "limit": 1})
+    assert [e["id"] for e in first.json()] == [1]
+    rest = client.get("/expenses/query/", params={"user_id": 1, "cursor": first.headers["X-Next-Cursor"]})
+    assert [e["id"] for e in rest.json()] == [2] and "X-Next-Cursor" not in rest.headers
+    assert client.get("/expenses/query/", params={"keyword": "taxi", "max_amount": 10}).json() == []
+
+def test_export_routes_stream_filtered_rows(client):
+    csv = client.get("/expenses/export/csv", params={"category": "food"})
+    assert csv.headers["content-type"].startswith("text/csv")
+    assert "attachment" in csv.headers["content-disposition"]
+    lines = csv.text.strip().splitlines()
+    assert len(lines) == 3 and "Lunch" in lines[1] and "Dinner" in lines[2]
+    exported = client.get("/expenses/export/json", params={"start_date": "2024-05-02"}).json()
+    assert [e["id"] for e in exported] == [2, 3]
+    assert client.get("/expenses/export/json", params={"user_id": 9}).json() == []
+
+def test_batch_routes(client, service):
+    created = client.post("/expenses/batch", json=[
+        {"user_id": 3, "amount": 12.5, "category": "Rent", "description": "Deposit", "date": "2024-05-03T10:00:00"},
+        {"user_id": 3, "amount": -1, "category": "Rent", "description": "Refund", "date": "2024-05-03T11:00:00"},
+    ]).json()
+    assert (created["succeeded"], created["failed"]) == (1, 1)
+    assert [(item["status"], item["id"]) for item in created["items"]] == [("created", 4), ("error", None)]
+    patched = client.patch("/expenses/batch", json={"items": [{"id": 4, "amount": 15.0}, {"id": 4, "amount": 16.0},
+                                                             {"id": 99, "amount": 1.0}]}).json()
+    assert [item["status"] for item in patched["items"]] == ["updated", "updated", "not_found"]
+    assert service.get_expense_by_id(4).amount == 16.0
+    by_filter = client.patch("/expenses/batch", json={"filter": {"user_id": 1}, "changes": {"description": "Work"}})
+    assert by_filter.json()["succeeded"] == 2 and service.get_expense_by_id(2).description == "Work"
+    assert client.patch("/expenses/batch", json={"filter": {"user_id": 1}}).status_code == 400
+    assert client.post("/expenses/batch/recategorize", json={"mapping": {"food": "Travel", "travel": "Food"}}).json() == {
+        "updated": 3}
+    assert client.post("/expenses/batch/discount", json={"category": "travel", "percent": 50}).json() == {"updated": 2}
+    assert client.post("/expenses/batch/discount", json={"category": "travel", "percent": 100}).status_code == 422
+    assert sorted(e.amount for e in service.filter_expenses_by_category("travel")) == [10.0, 15.0]
+    deleted = client.request("DELETE", "/expenses/batch", json={"ids": [1, 99]}).json()
+    assert [item["status"] for item in deleted["items"]] == ["deleted", "not_found"]
+    assert client.request("DELETE", "/expenses/batch", json={"filter": {"category": "rent"}}).json()["succeeded"] == 1
+    assert client.request("DELETE", "/expenses/batch", json={}).status_code == 400
+    assert sorted(e.id for e in service.get_all_expenses()) == [2, 3]
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from datetime import date, datetime
+from app.database.db import create_async_db_engine, init_async_db, to_async_url
+from app.models.expense import Expense
+from app.services.async_expense_service import AsyncExpenseService
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def make_service():
+    engine = create_async_db_engine("sqlite://")
+    await init_async_db(engine)
+    service = AsyncExpenseService.from_engine(engine)
+    await service.add_expenses([
+        Expense(id=None, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1, 12)),
+        Expense(id=None, user_id=1, amount=50.0, category="Travel", description="Taxi ride", date=datetime(2024, 5, 2, 9)),
+        Expense(id=None, user_id=2, amount=30.0, category="food", description="Dinner", date=datetime(2024, 5, 2, 20)),
+    ])
+    return engine, service
+
+def test_to_async_url():
+    assert to_async_url("sqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+    assert to_async_url("mysql+mysqlconnector://u:p@h:3306/db") == "mysql+aiomysql://u:p@h:3306/db"
+
+def test_async_crud_and_stats():
+    async def scenario():
+        engine, service = await make_service()
+        try:
+            assert (await service.get_expense_by_id(2)).description == "Taxi ride"
+            assert await service.update_expense(2, amount=60.0)
+            assert await service.get_total_expense() == {"total_expense": 110.0}
+            assert [e.id for e in await service.get_expenses_by_category("FOOD")] == [1, 3]
+            assert [e.id for e in await service.get_expenses_by_date_range(date(2024, 5, 2), date(2024, 5, 2))] == [2, 3]
+            assert (await service.get_top_expense_categories(1)) == [{"category": "Travel", "total_amount": 60.0}]
+            assert await service.get_peak_expense_day() == {"date": date(2024, 5, 2), "total_amount": 90.0}
+            assert [e.id for e in await service.search_expenses("din")] == [3]
+            assert await service.delete_expense(1)
+            assert await service.get_expense_by_id(1) is None
+        finally:
+            await engine.dispose()
+    run(scenario())
+
+def test_async_concurrent_reads():
+    async def scenario():
+        engine, service = await make_service()
+        try:
+            results = await asyncio.gather(*(service.get_total_expense() for _ in range(20)))
+            assert all(result == {"total_expense": 100.0} for result in results)
+        finally:
+            await engine.dispose()
+    run(scenario())
+
+def test_async_rejects_invalid():
+    async def scenario():
+        engine, service = await make_service()
+        try:
+            with pytest.raises(ValueError):
+                await service.add_expense(Expense(id=None, user_id=1, amount=-1.0, category="X", description="bad"))
+        finally:
+            await engine.dispose()
+    run(scenario())
@@ -0,0 +1,18 @@
+from benchmarks.ledger import generate_expenses
+from benchmarks.suite import Suite, compare
+
+def test_ledger_is_deterministic():
+    first, again = generate_expenses(500, seed=7), generate_expenses(500, seed=7)
+    assert [e.to_dict() for e in first] == [e.to_dict() for e in again]
+    assert [e.to_dict() for e in first] != [e.to_dict() for e in generate_expenses(500, seed=8)]
+    assert [e.id for e in first] == list(range(1, 501))
+    assert len({e.user_id for e in first}) > 1 and all(e.amount > 0 for e in first)
+
+def test_every_public_method_is_benchmarked():
+    assert Suite(200).missing_cases() == []
+
+def test_compare_flags_regressions():
+    baseline = [{"name": "fast", "median": 1.0}, {"name": "slow", "median": 1.0}, {"name": "gone", "median": 1.0}]
+    current = [{"name": "fast", "median": 0.9}, {"name": "slow", "median": 1.5}, {"name": "new", "median": 1.0}]
+    lines, regressions = compare(current, baseline, threshold=1.25)
+    assert regressions == ["slow"] and len(lines) == 2
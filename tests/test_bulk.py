@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime, timedelta
+from app.database.db import create_db_engine, init_db
+from app.models.expense import Expense
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.query import ExpenseQuery
+from app.services.sql_expense_service import SqlExpenseService
+
+def make_expenses(count=6):
+    return [
+        Expense(id=None, user_id=i % 2, amount=10.0 + i, category=["Food", "Travel", " food "][i % 3],
+                description=f"item {i}", date=datetime(2024, 5, 1) + timedelta(days=i))
+        for i in range(count)
+    ]
+
+def make_memory():
+    return ExpenseService(store=ExpenseStore())
+
+def make_columnar():
+    return ExpenseService(store=ColumnarExpenseStore())
+
+def make_sql():
+    engine = create_db_engine("sqlite://")
+    init_db(engine)
+    return SqlExpenseService.from_engine(engine)
+
+@pytest.fixture(params=[make_memory, make_columnar, make_sql])
+def service(request):
+    return request.param()
+
+def statuses(result):
+    return [(item["status"], item["id"]) for item in result.as_dict()["items"]]
+
+def test_create_many_reports_each_item(service):
+    service.add_expense(make_expenses(1)[0])
+    batch = make_expenses(3)
+    batch.append(Expense(id=None, user_id=1, amount=0.0, category="Food", description="free"))
+    batch.append(Expense(id=1, user_id=1, amount=5.0, category="Food", description="taken id"))
+    result = service.create_many(batch)
+    assert statuses(result)[:4] == [("created", 2), ("created", 3), ("created", 4), ("error", None)]
+    assert result.as_dict()["items"][4]["error"] == "Expense with id 1 already exists"
+    assert (result.succeeded, result.failed) == (3, 2)
+    assert len(service.get_all_expenses()) == 4
+
+def test_update_many_validates_before_writing(service):
+    service.add_expenses(make_expenses())
+    result = service.update_many([
+        {"id": 1, "amount": 99.0},
+        {"id": 2, "amount": -1.0},
+        {"id": 404, "description": "missing"},
+        {"id": 1, "description": "renamed"},
+    ])
+    assert statuses(result) == [("updated", 1), ("error", 2), ("not_found", 404), ("updated", 1)]
+    first = service.get_expense_by_id(1)
+    assert (first.amount, first.description) == (99.0, "renamed")
+    assert service.get_expense_by_id(2).amount == 11.0
+    assert service.verify_aggregates() == []
+
+def test_update_many_merges_items_repeating_an_id(service):
+    service.add_expenses(make_expenses())
+    result = service.update_many([{"id": 3, "amount": 1.0}, {"id": 3, "amount": 2.0, "description": "twice"},
+                                  {"id": 3, "amount": -5.0}])
+    assert statuses(result) == [("updated", 3), ("updated", 3), ("error", 3)]
+    third = service.get_expense_by_id(3)
+    assert (third.amount, third.description) == (2.0, "twice")
+    assert service.verify_aggregates() == []
+
+def test_update_and_delete_by_filter(service):
+    service.add_expenses(make_expenses())
+    result = service.update_where(ExpenseQuery(category="food", user_id=0), description="lunch")
+    assert [item["id"] for item in result.as_dict()["items"]] == [1, 3]
+    assert [e.id for e in service.search_expenses("lunch")] == [1, 3]
+    deleted = service.delete_where(ExpenseQuery(min_amount=14.0))
+    assert statuses(deleted) == [("deleted", 5), ("deleted", 6)]
+    result = service.delete_many([1, 1, 99])
+    assert statuses(result) == [("deleted", 1), ("deleted", 1), ("not_found", 99)]
+    assert sorted(e.id for e in service.get_all_expenses()) == [2, 3, 4]
+    assert service.verify_aggregates() == []
+
+def test_set_based_recategorize_and_discount(service):
+    service.add_expenses(make_expenses())
+    assert service.categorize_all({"food": "Meals"}) == 4
+    assert service.total_amount_by_category() == {"Meals": 10.0 + 12.0 + 13.0 + 15.0, "Travel": 11.0 + 14.0}
+    assert service.apply_discount_to_category("travel", 50) == 2
+    assert service.apply_discount_to_category("travel", 0) == 0
+    assert service.get_expense_by_id(2).amount == 5.5
+    assert service.verify_aggregates() == []
+
+def test_recategorize_swaps_categories(service):
+    service.add_expenses(make_expenses())
+    assert service.categorize_all({"FOOD": "Travel", "travel": "Food"}) == 6
+    assert [e.category for e in service.get_all_expenses()] == ["Travel", "Food", "Travel"] * 2
+    assert service.categorize_all({"food": "Food", "travel": "Travel", "rent": "Housing"}) == 6
+    assert service.verify_aggregates() == []
@@ -0,0 +1,112 @@
+import fnmatch
+import pytest
+from datetime import date, datetime
+from app.database.db import create_db_engine, init_db
+from app.models.expense import Expense
+from app.services.cache import MISSING, MemoryCache, RedisCache
+from app.services.expense_service import ExpenseService
+from app.services.sql_expense_service import SqlExpenseService
+
+class FakeRedis:
+    """The subset of redis.Redis commands RedisCache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(m.encode() for m in members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, ()))
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+def make_memory_cache():
+    return MemoryCache()
+
+def make_redis_cache():
+    return RedisCache(FakeRedis())
+
+@pytest.fixture(params=[make_memory_cache, make_redis_cache])
+def service(request):
+    svc = ExpenseService(cache=request.param())
+    svc.add_expense(Expense(id=1, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1, 12)))
+    svc.add_expense(Expense(id=2, user_id=2, amount=50.0, category="Travel", description="Taxi", date=datetime(2024, 6, 2, 9)))
+    return svc
+
+def test_repeated_queries_hit_the_cache(service):
+    first = service.get_monthly_summary(2024, 5)
+    assert service.get_monthly_summary(year=2024, month=5) == first == {
+        "year": 2024, "month": 5, "total": 20.0, "count": 1, "min": 20.0, "max": 20.0,
+        "by_category": {"Food": 20.0},
+    }
+    service.get_total_expense()
+    service.get_total_expense()
+    assert (service.cache.stats.hits, service.cache.stats.misses) == (2, 2)
+
+def test_writes_invalidate_only_the_touched_month(service):
+    service.get_monthly_summary(2024, 5)
+    service.get_monthly_summary(2024, 6)
+    service.add_expense(Expense(id=3, user_id=1, amount=5.0, category="Food", description="Snack", date=datetime(2024, 5, 9)))
+    assert service.get_monthly_summary(2024, 5)["total"] == 25.0
+    service.get_monthly_summary(2024, 6)
+    assert service.cache.stats.hits == 1
+
+def test_entries_are_kept_per_user(service):
+    assert service.get_expense_summary_by_category(1) == {"Food": 20.0}
+    assert service.get_expense_summary_by_category(2) == {"Travel": 50.0}
+    service.update_expense(2, amount=70.0)
+    assert service.get_expense_summary_by_category(1) == {"Food": 20.0}
+    assert service.get_expense_summary_by_category(2) == {"Travel": 70.0}
+    assert service.cache.stats.hits == 1
+
+def test_updates_invalidate_the_old_and_new_month(service):
+    assert service.get_monthly_summary(2024, 5)["count"] == 1
+    assert service.get_monthly_summary(2024, 6)["count"] == 1
+    service.update_expense(1, date=datetime(2024, 6, 15))
+    assert service.get_monthly_summary(2024, 5)["count"] == 0
+    assert service.get_monthly_summary(2024, 6)["count"] == 2
+
+def test_delete_invalidates_global_stats(service):
+    assert service.get_top_expense_categories(1) == [{"category": "Travel", "total_amount": 50.0}]
+    service.delete_expense(2)
+    assert service.get_top_expense_categories(1) == [{"category": "Food", "total_amount": 20.0}]
+    assert service.get_peak_expense_day() == {"date": date(2024, 5, 1), "total_amount": 20.0}
+
+def test_memory_cache_evicts_least_recently_used_and_expired_entries():
+    now = [0.0]
+    cache = MemoryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1, ["x"])
+    cache.set("b", 2, ["x"])
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    now[0] = 11.0
+    assert cache.get("a") is MISSING
+    assert len(cache) == 1
+
+def test_sql_service_caches_and_clears_on_set_based_updates():
+    engine = create_db_engine("sqlite://")
+    init_db(engine)
+    service = SqlExpenseService.from_engine(engine, cache=MemoryCache())
+    service.add_expense(Expense(id=None, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1)))
+    assert service.get_total_expense() == {"total_expense": 20.0}
+    assert service.get_total_expense() == {"total_expense": 20.0}
+    service.apply_discount_to_category("food", 50)
+    assert service.get_total_expense() == {"total_expense": 10.0}
+    assert service.cache.stats.hits == 1
@@ -0,0 +1,131 @@
+import random
+import sys
+import threading
+import pytest
+from datetime import datetime, timedelta
+from app.models.expense import Expense
+from app.services.concurrency import ReadWriteLock
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.columnar_store import ColumnarExpenseStore
+
+CATEGORIES = ["Food", "Travel", "Rent", "Fun", "Health"]
+WORDS = ["lunch", "taxi", "ticket", "rent", "pizza", "cinema", "pharmacy"]
+
+@pytest.fixture
+def fast_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def run_threads(targets):
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(t,)) for t in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+def random_expense(rng):
+    return Expense(
+        id=None,
+        user_id=rng.randint(1, 10),
+        amount=round(rng.uniform(1, 100), 2),
+        category=rng.choice(CATEGORIES),
+        description=" ".join(rng.sample(WORDS, 2)),
+        date=datetime(2024, 1, 1) + timedelta(hours=rng.randint(0, 24 * 90)),
+    )
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read_locked():
+            inside.wait()
+
+    run_threads([reader, reader])
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    events = []
+    writing = threading.Event()
+
+    def writer():
+        with lock.write_locked():
+            writing.set()
+            events.append("write start")
+            threading.Event().wait(0.05)
+            events.append("write end")
+
+    def reader():
+        writing.wait()
+        with lock.read_locked():
+            events.append("read")
+
+    run_threads([writer, reader])
+    assert events == ["write start", "write end", "read"]
+
+def test_lock_is_reentrant_and_refuses_upgrades():
+    lock = ReadWriteLock()
+    with lock.write_locked(), lock.write_locked(), lock.read_locked():
+        pass
+    with lock.read_locked(), lock.read_locked():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.write_locked():
+        pass
+
+@pytest.mark.parametrize("store_class", [ExpenseStore, ColumnarExpenseStore])
+def test_mixed_reads_and_writes_keep_invariants(store_class, fast_switching):
+    service = ExpenseService(store=store_class())
+    service.add_expenses([random_expense(random.Random(i)) for i in range(200)])
+    removed = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(300):
+            op = rng.random()
+            if op < 0.3:
+                service.add_expense(random_expense(rng))
+            elif op < 0.4:
+                service.add_expenses([random_expense(rng) for _ in range(5)])
+            elif op < 0.5:
+                expense_id = rng.randint(1, 200)
+                if service.delete_expense(expense_id):
+                    removed.append(expense_id)
+            elif op < 0.6:
+                service.update_expense(rng.randint(1, 200), amount=rng.uniform(1, 100),
+                                       category=rng.choice(CATEGORIES))
+            elif op < 0.7:
+                service.search_expenses(rng.choice(WORDS)[:3])
+            elif op < 0.8:
+                start = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 80))
+                for expense in service.filter_expenses_by_date_range(start, start + timedelta(days=7)):
+                    assert start <= expense.date <= start + timedelta(days=7)
+            elif op < 0.9:
+                service.get_top_expense_categories(3)
+                service.get_peak_expense_day()
+            else:
+                assert service.verify_aggregates() == []
+
+    run_threads([lambda seed=seed: worker(seed) for seed in range(8)])
+
+    expenses = service.get_all_expenses()
+    assert len(set(removed)) == len(removed)
+    assert len({e.id for e in expenses}) == len(expenses) == len(service.store)
+    assert service.verify_aggregates() == []
+    assert sorted(e.id for e in service.filter_expenses_by_date_range(datetime.min, datetime.max)) == \
+        sorted(e.id for e in expenses)
+    assert sum(len(service.get_expenses_by_user(user)) for user in range(1, 11)) == len(expenses)
+    assert sum(len(service.filter_expenses_by_category(c)) for c in CATEGORIES) == len(expenses)
+    assert len(service.text_index) == len(expenses)
@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timedelta
+from app.database.db import create_db_engine, init_db
+from app.models.expense import Expense
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.duplicates import DuplicateExpenseError, DuplicateIndex
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.sql_expense_service import SqlExpenseService
+
+NOON = datetime(2024, 5, 1, 12)
+
+def lunch(seconds=0, description="Team lunch", amount=20.0, user_id=1):
+    return Expense(id=None, user_id=user_id, amount=amount, category="Food", description=description,
+                   date=NOON + timedelta(seconds=seconds))
+
+def make_memory(**options):
+    return ExpenseService(store=ExpenseStore(), **options)
+
+def make_columnar(**options):
+    return ExpenseService(store=ColumnarExpenseStore(), **options)
+
+def make_sql(**options):
+    engine = create_db_engine("sqlite://")
+    init_db(engine)
+    return SqlExpenseService.from_engine(engine, **options)
+
+@pytest.fixture(params=[make_memory, make_columnar, make_sql])
+def make_service(request):
+    return request.param
+
+def test_reject_within_window(make_service):
+    service = make_service(duplicate_policy="reject", duplicate_window=30)
+    service.add_expense(lunch())
+    with pytest.raises(DuplicateExpenseError) as raised:
+        service.add_expense(lunch(5, description="  team   LUNCH "))
+    assert raised.value.original_id == 1
+    service.add_expense(lunch(31))
+    service.add_expense(lunch(5, amount=21.0))
+    service.add_expense(lunch(5, user_id=2))
+    with pytest.raises(DuplicateExpenseError):
+        service.add_expenses([lunch(600), lunch(610)])
+    assert len(service.get_all_expenses()) == 4
+
+def test_flag_and_find(make_service):
+    service = make_service(duplicate_policy="flag", duplicate_window=10)
+    service.add_expense(lunch())
+    service.add_expense(lunch(3, description="team lunch"))
+    service.add_expenses([lunch(100), lunch(104), lunch(200, description="Dinner")])
+    assert service.flagged_duplicates == {2, 4}
+    assert [e.id for e in service.find_duplicates()] == [2, 4]
+    service.delete_expense(2)
+    assert service.flagged_duplicates == {4}
+    assert [e.id for e in service.find_duplicates()] == [4]
+
+def test_allow_keeps_exact_duplicates_reportable():
+    service = make_memory()
+    service.add_expenses([lunch(), lunch(), lunch(1)])
+    assert service.flagged_duplicates == set()
+    assert [e.id for e in service.find_duplicates()] == [2]
+    service.update_expense(2, description="Other")
+    assert service.find_duplicates() == []
+
+def test_import_reports_duplicates_as_row_errors(make_service):
+    service = make_service(duplicate_policy="reject", duplicate_window=60)
+    service.add_expense(lunch())
+    records = [
+        {"user_id": 1, "amount": 20.0, "category": "Food", "description": "team lunch",
+         "date": (NOON + timedelta(seconds=20)).isoformat()},
+        {"user_id": 1, "amount": 9.0, "category": "Food", "description": "Snack", "date": NOON.isoformat()},
+        {"user_id": 1, "amount": 9.0, "category": "Food", "description": "snack", "date": NOON.isoformat()},
+    ]
+    report = service.import_records(records)
+    assert report.imported == 1
+    assert [(error.row, error.message) for error in report.errors] == [
+        (1, "Duplicate of expense 1"), (3, "Duplicate of another expense in the batch"),
+    ]
+
+def test_index_match_is_scoped_to_the_window():
+    index = DuplicateIndex(window=5)
+    first, second = lunch(), lunch(4)
+    first.id, second.id = 1, 2
+    index.add(first)
+    assert index.match(first) is None
+    assert index.match(second) == 1
+    assert index.match(lunch(-6)) is None
+    index.add(second)
+    assert index.duplicates() == [2]
+    index.remove(first)
+    assert index.duplicates() == [] and len(index) == 1
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ExpenseService(duplicate_policy="ignore")
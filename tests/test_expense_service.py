@@ -0,0 +1,293 @@
+import csv
+import io
+import json
+import pytest
+from datetime import date, datetime
+from app.models.expense import Expense
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.importers import MalformedRecord, parse_batch, parse_record
+from app.services.serialization import ExpenseSerializer
+
+def ids(expenses):
+    return sorted(e.id for e in expenses)
+
+@pytest.fixture(params=[ExpenseStore, ColumnarExpenseStore])
+def service(request):
+    svc = ExpenseService(store=request.param())
+    svc.add_expense(Expense(id=1, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1, 12)))
+    svc.add_expense(Expense(id=2, user_id=1, amount=50.0, category="Travel", description="Taxi ride", date=datetime(2024, 5, 2, 9)))
+    svc.add_expense(Expense(id=3, user_id=2, amount=30.0, category="food", description="Dinner", date=datetime(2024, 5, 2, 20)))
+    return svc
+
+def test_get_expense_by_id(service):
+    assert service.get_expense_by_id(2).description == "Taxi ride"
+    assert service.get_expense_by_id(99) is None
+
+def test_add_expense_assigns_id(service):
+    expense = Expense(id=None, user_id=3, amount=5.0, category="Misc", description="Pen")
+    service.add_expense(expense)
+    assert expense.id == 4
+    assert service.get_expense_by_id(4) == expense
+
+def test_add_expense_rejects_duplicate_id(service):
+    with pytest.raises(ValueError):
+        service.add_expense(Expense(id=1, user_id=1, amount=1.0, category="Misc", description="Dup"))
+
+def test_delete_expense_updates_indexes(service):
+    assert service.delete_expense(1)
+    assert not service.delete_expense(1)
+    assert ids(service.filter_expenses_by_category("Food")) == [3]
+    assert ids(service.get_expenses_by_user(1)) == [2]
+
+def test_update_expense_reindexes(service):
+    assert service.update_expense(2, category="Food", user_id=2)
+    assert ids(service.filter_expenses_by_category("food")) == [1, 2, 3]
+    assert service.filter_expenses_by_category("Travel") == []
+    assert ids(service.get_expenses_by_user(2)) == [2, 3]
+    assert not service.update_expense(42, amount=1.0)
+
+def test_categorize_all_reindexes(service):
+    service.categorize_all({"food": "Meals"})
+    assert service.filter_expenses_by_category("Food") == []
+    assert ids(service.filter_expenses_by_category("meals")) == [1, 3]
+
+def test_apply_discount_to_category(service):
+    service.apply_discount_to_category("FOOD", 50)
+    assert service.get_expense_by_id(1).amount == 10.0
+    assert service.get_expense_by_id(3).amount == 15.0
+    assert service.get_expense_by_id(2).amount == 50.0
+
+def test_aggregations(service):
+    assert service.total_amount() == 100.0
+    assert service.average_amount() == pytest.approx(100.0 / 3)
+    assert service.total_amount_by_category() == {"Food": 20.0, "Travel": 50.0, "food": 30.0}
+    service.delete_expense(2)
+    assert service.total_amount_by_category() == {"Food": 20.0, "food": 30.0}
+
+def test_filter_by_date_range(service):
+    result = service.filter_expenses_by_date_range(datetime(2024, 5, 2), datetime(2024, 5, 2, 23, 59))
+    assert ids(result) == [2, 3]
+    assert service.get_expense_by_id(3).date == datetime(2024, 5, 2, 20)
+
+def test_insertion_order_in_indexed_store():
+    svc = ExpenseService()
+    for i in (3, 1, 2):
+        svc.add_expense(Expense(id=i, user_id=1, amount=1.0, category="Misc", description=str(i)))
+    assert [e.id for e in svc.filter_expenses_by_category("misc")] == [3, 1, 2]
+
+def test_recent_expenses(service):
+    assert [e.id for e in service.get_recent_expenses(2)] == [3, 2]
+    service.update_expense(1, date=datetime(2024, 6, 1))
+    assert [e.id for e in service.get_recent_expenses(5)] == [1, 3, 2]
+    assert service.get_recent_expenses(0) == []
+
+def test_date_range_is_ordered_and_inclusive(service):
+    result = service.get_expenses_by_date_range(date(2024, 5, 1), date(2024, 5, 2))
+    assert [e.id for e in result] == [1, 2, 3]
+    service.delete_expense(2)
+    assert [e.id for e in service.get_expenses_by_date_range(date(2024, 5, 2), date(2024, 5, 2))] == [3]
+
+def test_daily_average(service):
+    result = service.get_daily_average()
+    assert result == {"average": 50.0, "start_date": date(2024, 5, 1), "end_date": date(2024, 5, 2)}
+    assert service.get_daily_average(date(2024, 5, 2), date(2024, 5, 5))["average"] == 20.0
+
+def test_search_expenses(service):
+    assert ids(service.search_expenses("taxi")) == [2]
+    assert ids(service.search_expenses("FOOD")) == [1, 3]
+    assert ids(service.search_expenses("din food")) == [3]
+    assert service.search_expenses("din food", prefix=False) == []
+    assert [e.id for e in service.search_expenses("food", limit=1)] == [1]
+    assert service.search_expenses("   ") == []
+
+def test_search_index_follows_writes(service):
+    service.update_expense(2, description="Airport shuttle")
+    assert service.search_expenses("taxi") == []
+    assert ids(service.search_expenses("shuttle")) == [2]
+    service.categorize_all({"food": "Meals"})
+    assert ids(service.search_expenses("meals")) == [1, 3]
+    service.delete_expense(1)
+    assert ids(service.search_expenses("meals")) == [3]
+
+def test_stats_endpoints_data(service):
+    assert service.get_total_expense() == {"total_expense": 100.0}
+    assert service.get_top_expense_categories(2) == [
+        {"category": "Travel", "total_amount": 50.0},
+        {"category": "food", "total_amount": 30.0},
+    ]
+    assert service.get_peak_expense_day() == {"date": date(2024, 5, 2), "total_amount": 80.0}
+    assert ExpenseService().get_peak_expense_day() == {"date": None, "total_amount": 0.0}
+
+def test_aggregates_follow_writes(service):
+    service.update_expense(1, amount=100.0, date=datetime(2024, 5, 3))
+    service.apply_discount_to_category("travel", 10)
+    service.categorize_all({"food": "Meals"})
+    service.delete_expense(3)
+    assert service.verify_aggregates() == []
+    assert service.total_amount_by_category() == {"Meals": 100.0, "Travel": 45.0}
+    assert service.get_peak_expense_day() == {"date": date(2024, 5, 3), "total_amount": 100.0}
+    assert service.average_amount() == 72.5
+
+def test_rollup_reports(service):
+    assert service.get_monthly_summary(2024, 5) == {
+        "year": 2024, "month": 5, "total": 100.0, "count": 3, "min": 20.0, "max": 50.0,
+        "by_category": {"Food": 20.0, "Travel": 50.0, "food": 30.0},
+    }
+    assert service.get_monthly_summary(2024, 5, user_id=2)["by_category"] == {"food": 30.0}
+    assert service.get_monthly_summary(2024, 6)["min"] is None
+    week = service.get_weekly_summary(date(2024, 5, 1), user_id=1)
+    assert (week["start_date"], week["end_date"], week["total"]) == (date(2024, 4, 29), date(2024, 5, 5), 70.0)
+    assert service.get_peak_expense_day(user_id=1) == {"date": date(2024, 5, 2), "total_amount": 50.0}
+    service.update_expense(2, amount=10.0, user_id=2)
+    service.delete_expense(3)
+    assert service.get_monthly_summary(2024, 5)["max"] == 20.0
+    assert service.get_peak_expense_day(user_id=1) == {"date": date(2024, 5, 1), "total_amount": 20.0}
+    assert service.get_peak_expense_day(user_id=2) == {"date": date(2024, 5, 2), "total_amount": 10.0}
+    assert service.verify_aggregates() == []
+
+def test_export_csv_empty_store(tmp_path):
+    path = tmp_path / "empty.csv"
+    ExpenseService().export_to_csv(str(path))
+    assert path.read_text().strip() == "id,user_id,amount,category,description,date"
+
+def test_export_csv_with_predicate(service, tmp_path):
+    path = tmp_path / "food.csv"
+    service.export_to_csv(str(path), predicate=lambda e: e.matches_category("food"))
+    lines = path.read_text().strip().splitlines()
+    assert len(lines) == 3
+    assert "Taxi ride" not in path.read_text()
+
+def test_export_json_round_trip(service, tmp_path):
+    path = tmp_path / "expenses.json"
+    service.export_to_json(str(path))
+    restored = ExpenseService()
+    restored.import_from_json(str(path))
+    assert sorted(restored.expenses, key=lambda e: e.id) == sorted(service.expenses, key=lambda e: e.id)
+
+def test_stream_json_chunks(service):
+    chunks = list(service.stream_json(chunk_size=1))
+    assert len(chunks) > 1
+    assert [e["id"] for e in json.loads("".join(chunks))] == [e.id for e in service.expenses]
+
+def test_batch_import_and_export_match_per_row_conversion(service):
+    records = [
+        {"user_id": 1, "amount": 2.5, "category": "Café", "description": 'say "hi", then\nleave', "date": "2024-05-03"},
+        {"user_id": 1, "amount": 3.0, "category": "Food", "description": "late", "date": datetime(2024, 5, 4, 9)},
+        {"user_id": 1, "amount": 4.0, "category": "Food", "description": "bad", "date": "05/03/2024"},
+        MalformedRecord("line 4: broken"),
+        ["not", "a", "record"],
+        {"user_id": 1, "amount": 5.0, "category": "Food", "description": "again", "date": "2024-05-03"},
+    ]
+    expenses, rows, errors = parse_batch(records)
+    assert rows == [1, 2, 6] and [e.date for e in expenses] == [parse_record(records[r - 1]).date for r in rows]
+    assert [(e.row, e.message) for e in errors] == [
+        (3, "Invalid isoformat string: '05/03/2024'"), (4, "line 4: broken"), (5, "'list' object has no attribute 'get'")]
+    service.add_expenses(expenses)
+    assert json.loads("".join(service.stream_json(chunk_size=2))) == [e.to_dict() for e in service.expenses]
+    chunks = list(service.stream_csv(chunk_size=2))
+    assert len(chunks) == 3
+    assert list(csv.reader(io.StringIO("".join(chunks))))[-1] == ["6", "1", "5.0", "Food", "again", "2024-05-03T00:00:00"]
+
+def test_import_ndjson_reports_row_errors(service, tmp_path):
+    path = tmp_path / "expenses.ndjson"
+    rows = [
+        {"user_id": 4, "amount": 12.5, "category": "Office", "description": "Paper", "date": "2024-05-03T10:00:00"},
+        {"user_id": 4, "amount": -1, "category": "Office", "description": "Bad", "date": "2024-05-03T10:00:00"},
+        {"id": 1, "user_id": 4, "amount": 3.0, "category": "Office", "description": "Taken id", "date": "2024-05-03"},
+        {"user_id": 4, "amount": 8.0, "category": "Office", "description": "No date"},
+        {"user_id": 4, "amount": 2.0, "category": "Office", "description": "Pens", "date": "not-a-date"},
+        {"user_id": 5, "amount": 7.5, "category": "Office", "description": "Stapler", "date": "2024-04-30T08:00:00"},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in rows))
+    report = service.import_file(str(path), batch_size=4)
+    assert report.imported == 2
+    assert [error.row for error in report.errors] == [2, 3, 4, 5]
+    assert ids(service.search_expenses("stapler")) == [5]
+    assert service.get_expenses_by_date_range(date(2024, 4, 30), date(2024, 4, 30))[0].description == "Stapler"
+    assert service.verify_aggregates() == []
+
+def test_import_csv(service, tmp_path):
+    path = tmp_path / "expenses.csv"
+    path.write_text(
+        "id,user_id,amount,category,description,date\n"
+        ",7,10.0,Books,Novel,2024-05-05T00:00:00\n"
+        "10,7,4.0,Books,Magazine,2024-05-06T00:00:00\n"
+    )
+    report = service.import_file(str(path))
+    assert report.imported == 2 and report.errors == []
+    assert ids(service.filter_expenses_by_category("books")) == [4, 10]
+    assert service.total_amount() == 114.0
+
+def test_import_reports_malformed_input_per_row(service, tmp_path):
+    good = {"user_id": 4, "amount": 12.5, "category": "Office", "description": "Paper", "date": "2024-05-03"}
+    ndjson = tmp_path / "expenses.ndjson"
+    ndjson.write_text(f"{json.dumps(good)}\n\n{{not json\n{json.dumps(good)}\n")
+    report = service.import_file(str(ndjson))
+    assert report.imported == 2
+    assert [(error.row, error.message.split(":")[0]) for error in report.errors] == [(2, "line 3")]
+
+    array = tmp_path / "expenses.json"
+    array.write_text(f"[{json.dumps(good)}, {{\"user_id\": oops}}, {json.dumps(good)}]")
+    report = service.import_file(str(array))
+    assert report.imported == 1 and [error.row for error in report.errors] == [2]
+
+    short = tmp_path / "expenses.csv"
+    short.write_text("user_id,amount,category,description,date\n7,10.0,Books\n7,4.0,Books,Magazine,2024-05-06\n")
+    report = service.import_file(str(short))
+    assert report.imported == 1
+    assert [(error.row, error.message) for error in report.errors] == [(1, "missing field 'date'")]
+
+def test_add_expenses_is_all_or_nothing(service):
+    with pytest.raises(ValueError):
+        service.add_expenses([
+            Expense(id=None, user_id=1, amount=1.0, category="Misc", description="ok"),
+            Expense(id=None, user_id=1, amount=0, category="Misc", description="bad"),
+        ])
+    assert len(service.expenses) == 3
+
+def test_bulk_insert_merges_date_index(service):
+    batch = [
+        Expense(id=None, user_id=9, amount=1.0, category="Bulk", description=f"item {i}",
+                date=datetime(2024, 4, 1) + (datetime(2024, 6, 1) - datetime(2024, 4, 1)) * ((i * 37) % 100) / 100)
+        for i in range(100)
+    ]
+    service.add_expenses(batch)
+    dates = [e.date for e in service.filter_expenses_by_date_range(datetime(2024, 1, 1), datetime(2025, 1, 1))]
+    assert len(dates) == 103 and dates == sorted(dates)
+    assert service.get_recent_expenses(1)[0].date == max(dates)
+
+def test_expenses_json_matches_to_dict(service):
+    data = service.expenses_json(service.filter_expenses_by_category, "food")
+    assert json.loads(data) == [e.to_dict() for e in service.filter_expenses_by_category("food")]
+    assert json.loads(service.expense_json(2)) == service.get_expense_by_id(2).to_dict()
+    assert service.expense_json(99) is None
+
+def test_expense_json_is_refreshed_after_writes(service):
+    service.expenses_json(service.get_all_expenses)
+    service.update_expense(1, amount=99.0)
+    service.apply_discount_to_category("travel", 50)
+    service.delete_expense(3)
+    assert json.loads(service.expenses_json(service.get_all_expenses)) == [e.to_dict() for e in service.get_all_expenses()]
+    assert json.loads(service.expense_json(1))["amount"] == 99.0
+    assert len(service.serializer) == 2
+
+def test_serializer_cache_is_bounded():
+    serializer = ExpenseSerializer(max_entries=2)
+    expenses = [Expense(id=i, user_id=1, amount=1.0, category="Food", description=f"e{i}") for i in range(1, 4)]
+    serializer.dumps_many(expenses[:2])
+    serializer.dumps_one(expenses[0])  # most recently served now
+    serializer.dumps_one(expenses[2])
+    assert len(serializer) == 2 and sorted(serializer._encoded) == [1, 3]
+    assert json.loads(serializer.dumps_many(expenses)) == [e.to_dict() for e in expenses]
+
+def test_expense_is_compact():
+    first = Expense(id=1, user_id=1, amount=1.0, category="".join("Food"), description="a")
+    second = Expense(id=2, user_id=1, amount=1.0, category="".join("Food"), description="b")
+    assert not hasattr(first, "__dict__")
+    assert first.category is second.category
+    first.update(category="".join("Travel"), unknown=1)
+    first.categorize({"travel": "".join("Food")})
+    assert first.category is second.category
+    assert first.clone(7) == first and Expense.from_dict(first.to_dict()) == first
@@ -0,0 +1,38 @@
+import pytest
+from datetime import date, datetime
+from app.models.expense import Expense
+from app.utils.helpers import (
+    format_currencies, format_currency, format_dates, format_rows, parse_date, parse_dates,
+)
+
+def test_parse_dates_matches_per_value_parsing():
+    values = ["2024-06-01", "2024-06-01T10:30:00", "2024-06-01", datetime(2020, 1, 2)]
+    assert parse_dates(values) == [datetime(2024, 6, 1), datetime(2024, 6, 1, 10, 30), datetime(2024, 6, 1),
+                                   datetime(2020, 1, 2)]
+    assert parse_dates(["01/06/2024", "bad", None, "01/06/2024"], "%d/%m/%Y", errors="coerce") == [
+        datetime(2024, 6, 1), None, None, datetime(2024, 6, 1)]
+    # The ISO fast path must not loosen strptime: non-padded and invalid values behave as before.
+    assert parse_date("2024-6-1") == datetime.strptime("2024-6-1", "%Y-%m-%d")
+    with pytest.raises(ValueError, match="does not match format"):
+        parse_date("2024-06-x1")
+    with pytest.raises(ValueError):
+        parse_dates(["2024-06-01", "nope"])
+
+def test_batch_formatting_matches_per_value_formatting():
+    amounts = [0, 1234.5, -3.456, 1e6]
+    assert format_currencies(amounts) == [f"${a:,.2f}" for a in amounts]
+    assert format_currencies(amounts, "{€}", ".", precision=1) == [f"{{€}}{a:,.1f}".replace(",", ".") for a in amounts]
+    assert format_currency(1234567.891, sep=" ") == "$1 234 567.89"
+    stamps = [datetime(2024, 6, 1, 13, 5), date(2024, 6, 2), datetime(2024, 6, 1, 8)]
+    assert format_dates(stamps, "%d %b") == ["01 Jun", "02 Jun", "01 Jun"]
+    assert format_dates(stamps, "%H:%M") == ["13:05", "00:00", "08:00"]
+    assert format_dates(stamps) == [s.isoformat() for s in stamps]
+    assert format_rows("{}|{:>3}", ["a\0b", "c"], [1, 2]) == ["a\0b|  1", "c|  2"]
+
+def test_expense_batch_methods_match_single_ones():
+    expenses = [Expense(id=i, user_id=1, amount=i * 10.5, category="Food", description=f"meal {i}",
+                        date=datetime(2024, 6, i, 12)) for i in range(1, 6)]
+    assert Expense.summaries(expenses)[1] == "2024-06-02 - Food: $21.00 (meal 2)" == expenses[1].summary()
+    assert Expense.formatted_all(expenses, "€") == [e.formatted("€") for e in expenses]
+    assert expenses[0].formatted() == "2024-06-01 | Food            | $   10.50 | meal 1"
+    assert Expense.from_dicts(e.to_dict() for e in expenses) == expenses
@@ -0,0 +1,73 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api.metrics import CONTENT_TYPE, MetricsMiddleware, metrics_endpoint
+from api.routes import expense_routes
+from app.models.expense import Expense
+from app.services.cache import MemoryCache
+from app.services.expense_service import ExpenseService
+from app.services.metrics import MetricsRegistry, instrument_service
+
+def test_render_exposition_format():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs run", ("kind",)).inc('say "hi"\n')
+    latency = registry.histogram("job_seconds", "Job latency", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3.0)
+    assert registry.render() == (
+        "# HELP job_seconds Job latency\n"
+        "# TYPE job_seconds histogram\n"
+        'job_seconds_bucket{le="0.1"} 1\n'
+        'job_seconds_bucket{le="1"} 2\n'
+        'job_seconds_bucket{le="+Inf"} 3\n'
+        "job_seconds_sum 3.55\n"
+        "job_seconds_count 3\n"
+        "# HELP jobs_total Jobs run\n"
+        "# TYPE jobs_total counter\n"
+        'jobs_total{kind="say \\"hi\\"\\n"} 1\n'
+    )
+    assert registry.counter("jobs_total", "Jobs run", ("kind",)) is registry.get("jobs_total")
+
+def test_service_operations_are_timed_once():
+    registry = MetricsRegistry()
+    service = ExpenseService(cache=MemoryCache())
+    instrument_service(service, registry)
+    service.add_expense(Expense(id=None, user_id=1, amount=5.0, category="Food", description="lunch"))
+    service.get_all_expenses()
+    service.get_total_expense()
+    service.get_total_expense()
+    try:
+        service.add_expense(Expense(id=None, user_id=1, amount=-1.0, category="Food", description="bad"))
+    except ValueError:
+        pass
+    operations = registry.get("expense_service_operation_seconds")
+    assert operations.count("get_all_expenses") == 1 and operations.count("expenses") == 0
+    assert operations.count("add_expense") == 2
+    assert registry.get("expense_service_operation_errors_total").value("add_expense") == 1
+    text = registry.render()
+    assert "expense_service_store_size 1\n" in text
+    assert "expense_service_cache_hit_ratio 0.5\n" in text
+
+def test_metrics_endpoint_reports_requests_by_route():
+    registry = MetricsRegistry()
+    service = ExpenseService()
+    service.add_expense(Expense(id=None, user_id=1, amount=5.0, category="Food", description="lunch"))
+    instrument_service(service, registry)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    app.include_router(expense_routes.router, prefix="/expenses")
+    app.add_api_route("/metrics", metrics_endpoint(registry))
+    app.dependency_overrides[expense_routes.get_service] = lambda: service
+    client = TestClient(app)
+    assert client.get("/expenses/1").status_code == 200
+    assert client.get("/expenses/7").status_code == 404
+    assert client.get("/nowhere").status_code == 404
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith(CONTENT_TYPE)
+    text = response.text
+    assert 'http_requests_total{method="GET",route="/expenses/{expense_id}",status="200"} 1\n' in text
+    assert 'http_requests_total{method="GET",route="/expenses/{expense_id}",status="404"} 1\n' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1\n' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/expenses/{expense_id}"} 2\n' in text
+    assert "http_requests_in_flight 1\n" in text
+    assert "expense_service_store_size 1\n" in text
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from app.database.db import create_async_db_engine, create_db_engine, init_async_db, init_db
+from app.models.expense import Expense
+from app.services.async_expense_service import AsyncExpenseService
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore, SortedDateIndex
+from app.services.pagination import MAX_PAGE_SIZE, decode_cursor, parse_fields
+from app.services.sql_expense_service import SqlExpenseService
+
+def make_expenses():
+    # Many rows share a timestamp so that ties are broken by id.
+    return [
+        Expense(id=None, user_id=i % 4, amount=1.0 + i, category=["Food", "Travel", "Rent"][i % 3],
+                description=f"item {i} {'taxi' if i % 5 == 0 else 'misc'}",
+                date=datetime(2024, 5, 1) + timedelta(hours=(i * 7) % 30))
+        for i in range(60)
+    ]
+
+def make_expenses_with_ids():
+    expenses = make_expenses()
+    for expense_id, expense in enumerate(expenses, start=1):
+        expense.id = expense_id
+    return expenses
+
+def make_memory():
+    return ExpenseService(store=ExpenseStore())
+
+def make_columnar():
+    return ExpenseService(store=ColumnarExpenseStore())
+
+def make_sql():
+    engine = create_db_engine("sqlite://")
+    init_db(engine)
+    return SqlExpenseService.from_engine(engine)
+
+@pytest.fixture(params=[make_memory, make_columnar, make_sql])
+def service(request):
+    svc = request.param()
+    svc.add_expenses(make_expenses())
+    return svc
+
+def walk(service, limit, cursor=None, **query):
+    items = []
+    while True:
+        page = service.get_page(limit=limit, cursor=cursor, **query)
+        assert len(page.items) <= limit
+        items.extend(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return items
+
+def keyset_order(expenses):
+    return [e.id for e in sorted(expenses, key=lambda e: (e.date, e.id))]
+
+def test_pages_cover_everything_in_keyset_order(service):
+    assert [e.id for e in walk(service, 7)] == keyset_order(service.get_all_expenses())
+
+def test_filtered_pages(service):
+    food = [e for e in service.get_all_expenses() if e.category == "Food"]
+    assert [e.id for e in walk(service, 4, category="food")] == keyset_order(food)
+    in_range = service.get_expenses_by_date_range(date(2024, 5, 1), date(2024, 5, 1))
+    assert [e.id for e in walk(service, 5, start_date=date(2024, 5, 1), end_date=date(2024, 5, 1))] == \
+        keyset_order(in_range)
+    taxi = [e for e in service.get_all_expenses() if "taxi" in e.description]
+    assert [e.id for e in walk(service, 3, keyword="taxi")] == keyset_order(taxi)
+    assert [e.id for e in walk(service, 3, keyword="taxi", category="food")] == \
+        keyset_order([e for e in taxi if e.category == "Food"])
+
+def test_cursor_survives_writes_between_pages(service):
+    first = service.get_page(limit=10)
+    service.delete_expense(first.items[-1].id)
+    service.add_expense(Expense(id=None, user_id=1, amount=1.0, category="Food", description="late",
+                                date=datetime(2024, 5, 1)))
+    rest = walk(service, 10, cursor=first.next_cursor) if first.next_cursor else []
+    ids = [e.id for e in first.items] + [e.id for e in rest]
+    assert len(ids) == len(set(ids))
+    assert all((e.date, e.id) > decode_cursor(first.next_cursor) for e in rest)
+
+def test_page_size_is_capped(service):
+    assert len(service.get_page(limit=10 ** 6).items) == 60 <= MAX_PAGE_SIZE
+    assert len(service.get_page(limit=0).items) == 1
+
+def test_page_json_projects_fields(service):
+    data, cursor = service.page_json(parse_fields("id, amount"), limit=2)
+    assert [set(row) for row in json.loads(data)] == [{"id", "amount"}] * 2
+    assert cursor is not None
+    with pytest.raises(ValueError):
+        parse_fields("id,secret")
+    with pytest.raises(ValueError):
+        service.get_page(cursor="not-a-cursor")
+
+def test_date_index_orders_ties_by_id():
+    index = SortedDateIndex()
+    for expense_id in (5, 2, 9, 1):
+        index.add(10, expense_id)
+    index.add_many([(10, 3), (5, 7)])
+    assert index.page(10) == [7, 1, 2, 3, 5, 9]
+    assert index.page(2, after=(10, 2)) == [3, 5]
+    index.remove(10, 3)
+    assert index.page(10, start=10, end=10) == [1, 2, 5, 9]
+
+def test_async_service_pages():
+    async def scenario():
+        engine = create_async_db_engine("sqlite://")
+        await init_async_db(engine)
+        service = AsyncExpenseService.from_engine(engine)
+        await service.add_expenses(make_expenses())
+        ids, cursor = [], None
+        while True:
+            page = await service.get_page(limit=8, cursor=cursor, category="travel")
+            ids.extend(e.id for e in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        await engine.dispose()
+        return ids
+
+    expected = keyset_order([e for e in make_expenses_with_ids() if e.category == "Travel"])
+    assert asyncio.run(scenario()) == expected
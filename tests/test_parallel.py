@@ -0,0 +1,56 @@
+import pytest
+from datetime import date, datetime, timedelta
+from app.models.expense import Expense
+from app.services import parallel
+from app.services.columnar_store import ColumnarExpenseStore, Columns
+from app.services.expense_service import ExpenseService
+from app.services.parallel import ParallelAnalytics, aggregate_rows
+
+def make_service(store=None, count=300):
+    service = ExpenseService(store=store)
+    service.add_expenses([
+        Expense(id=None, user_id=i % 5, amount=float(i % 17 + 1), category=["Food", "Travel", "Rent", "food"][i % 4],
+                description=f"item {i}", date=datetime(1969, 12, 20) + timedelta(hours=7 * i))
+        for i in range(count)
+    ])
+    return service
+
+@pytest.fixture(params=[None, ColumnarExpenseStore])
+def service(request):
+    return make_service(request.param() if request.param else None)
+
+def test_sequential_reports_match_the_service(service):
+    analytics = ParallelAnalytics(workers=1)
+    columns = service.columns()
+    assert analytics.amount_by_category(columns) == pytest.approx(service.total_amount_by_category())
+    assert analytics.top_categories(columns, 2) == service.get_top_expense_categories(2)
+    assert analytics.peak_day(columns) == service.get_peak_expense_day()
+    window = {"start_date": date(1969, 12, 28), "end_date": date(1970, 1, 9), "user_id": 3}
+    assert analytics.daily_totals(columns, **window) == pytest.approx(service.get_daily_totals(**window))
+    assert analytics.peak_day(columns, user_id=3) == service.get_peak_expense_day(3)
+
+def test_plain_loops_match_numpy(monkeypatch):
+    columns = make_service().columns()
+    arrays = (columns.amounts, columns.codes, columns.timestamps, columns.user_ids)
+    vectorized = aggregate_rows(*arrays, 10, 250, 2, -5, 12)
+    monkeypatch.setattr(parallel, "np", None)
+    looped = aggregate_rows(*arrays, 10, 250, 2, -5, 12)
+    assert looped.counts == vectorized.counts
+    assert looped.sums == pytest.approx(vectorized.sums)
+    assert looped.days == pytest.approx(vectorized.days)
+
+def test_process_pool_matches_sequential():
+    columns = make_service(ColumnarExpenseStore(), count=2000).columns()
+    with ParallelAnalytics(workers=3, threshold=100) as analytics:
+        pooled = analytics.aggregate(columns, start_date=date(1970, 1, 1))
+        assert analytics.daily_totals(Columns()) == {}
+    expected = ParallelAnalytics(workers=1).aggregate(columns, start_date=date(1970, 1, 1))
+    assert pooled.counts == expected.counts
+    assert pooled.sums == pytest.approx(expected.sums)
+    assert pooled.days == pytest.approx(expected.days)
+
+def test_empty_columns_skip_the_pool():
+    with ParallelAnalytics(workers=2, threshold=0) as analytics:
+        assert analytics.peak_day(Columns()) == {"date": None, "total_amount": 0.0}
+        assert analytics.amount_by_category(Columns()) == {}
+        assert analytics._pool is None
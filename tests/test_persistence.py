@@ -0,0 +1,169 @@
+import os
+import pytest
+from datetime import datetime, timedelta
+from app.models.expense import Expense
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.expense_service import ExpenseService
+from app.services.persistence import WriteAheadLog, read_records
+
+def make_expenses(count=5):
+    return [
+        Expense(id=None, user_id=i % 2, amount=10.0 + i, category=["Food", "Café"][i % 2],
+                description=f"item {i} ✓", date=datetime(2024, 5, 1) + timedelta(hours=5 * i, microseconds=i))
+        for i in range(count)
+    ]
+
+def state(service):
+    return sorted((e.to_dict() for e in service.get_all_expenses()), key=lambda row: row["id"])
+
+def write_some(service):
+    service.add_expenses(make_expenses())
+    service.add_expense(Expense(id=None, user_id=3, amount=7.5, category="Travel", description="taxi"))
+    service.update_expense(2, amount=99.0, description="changed")
+    service.delete_expense(4)
+    service.categorize_all({"café": "Coffee"})
+
+@pytest.mark.parametrize("fsync", ["always", "group", "interval", "never"])
+def test_restart_replays_the_log(tmp_path, fsync):
+    service = ExpenseService.open(str(tmp_path), fsync=fsync)
+    write_some(service)
+    expected = state(service)
+    service.close()
+    restarted = ExpenseService.open(str(tmp_path))
+    assert state(restarted) == expected
+    assert restarted.total_amount_by_category() == pytest.approx(service.total_amount_by_category())
+    assert restarted.verify_aggregates() == []
+    restarted.close()
+
+def test_checkpoint_replaces_the_log_it_covers(tmp_path):
+    service = ExpenseService.open(str(tmp_path), store=ColumnarExpenseStore())
+    write_some(service)
+    snapshot = service.checkpoint()
+    service.update_expense(1, category="Rent")
+    service.delete_expense(3)
+    expected = state(service)
+    service.close()
+    files = sorted(os.listdir(tmp_path))
+    assert files == [os.path.basename(snapshot), "wal-00000002.log"]
+    restarted = ExpenseService.open(str(tmp_path))
+    assert state(restarted) == expected
+    restarted.checkpoint()
+    restarted.close()
+    assert state(ExpenseService.open(str(tmp_path))) == expected
+
+def test_torn_tail_is_ignored(tmp_path):
+    service = ExpenseService.open(str(tmp_path), fsync="always")
+    service.add_expenses(make_expenses(3))
+    expected = state(service)
+    service.add_expense(Expense(id=None, user_id=1, amount=1.0, category="Food", description="lost"))
+    service.close()
+    path = tmp_path / "wal-00000001.log"
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    assert len(list(read_records(str(path)))) == 3
+    assert state(ExpenseService.open(str(tmp_path))) == expected
+
+def test_log_checkpoints_when_full(tmp_path):
+    service = ExpenseService.open(str(tmp_path), sync_interval=0.01, checkpoint_bytes=200)
+    service.add_expenses(make_expenses(10))
+    for _ in range(200):
+        if any(name.startswith("snapshot-") for name in os.listdir(tmp_path)):
+            break
+        service.journal._stopped.wait(0.01)
+    service.close()
+    assert any(name.startswith("snapshot-") for name in os.listdir(tmp_path))
+    assert len(ExpenseService.open(str(tmp_path)).get_all_expenses()) == 10
+
+def test_background_thread_survives_checkpoint_errors(tmp_path, monkeypatch):
+    synced, calls = [], []
+    log = WriteAheadLog(str(tmp_path), fsync="never", sync_interval=0.01, checkpoint_bytes=10)
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+
+    def on_full():
+        calls.append(1)
+        raise OSError("disk full")
+
+    log.on_full = on_full
+    log.append([expense.clone(expense_id) for expense_id, expense in enumerate(make_expenses(2), 1)])
+    for _ in range(200):
+        if len(calls) >= 2:
+            break
+        log._stopped.wait(0.01)
+    assert len(calls) >= 2 and log._thread.is_alive()
+    log.close()
+    # "never" leaves syncing to the OS, even with the checkpoint thread running.
+    assert synced == []
+
+def test_group_commit_shares_fsyncs_between_waiting_writers(tmp_path, monkeypatch):
+    from threading import Barrier, Thread
+    import time
+    log = WriteAheadLog(str(tmp_path), fsync="group")
+    real_fsync, synced = os.fsync, []
+
+    def slow_fsync(fd):
+        time.sleep(0.01)
+        synced.append(log._written)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    start, acknowledged = Barrier(8), []
+
+    def writer(expense):
+        start.wait()
+        log.append([expense])
+        # Acknowledged only once an fsync has covered this append.
+        acknowledged.append(log._synced >= 1 and bool(synced))
+
+    expenses = [expense.clone(expense_id) for expense_id, expense in enumerate(make_expenses(8), 1)]
+    threads = [Thread(target=writer, args=(expense,)) for expense in expenses]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert acknowledged == [True] * 8 and log._synced == 8
+    assert 1 <= len(synced) < 8
+    log.close()
+    assert len(list(read_records(str(tmp_path / "wal-00000001.log")))) == 8
+
+def test_service_writes_return_after_the_group_fsync(tmp_path):
+    service = ExpenseService.open(str(tmp_path))
+    write_some(service)
+    assert service.journal._synced == service.journal._written > 0
+    service.close()
+
+def test_interval_policy_acknowledges_before_syncing(tmp_path):
+    log = WriteAheadLog(str(tmp_path), fsync="interval", sync_interval=60)
+    log.append([make_expenses(1)[0].clone(1)])
+    assert log._synced < log._written
+    log.close()
+    assert log._synced == log._written
+
+def test_failed_journal_append_rolls_the_store_back(tmp_path, monkeypatch):
+    service = ExpenseService.open(str(tmp_path))
+    write_some(service)
+    expected, total = state(service), service.total_amount()
+
+    def disk_full(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(service.journal, "append", disk_full)
+    writes = [
+        lambda: service.add_expense(Expense(id=None, user_id=1, amount=5.0, category="Food", description="lost")),
+        lambda: service.add_expenses(make_expenses(3)),
+        lambda: service.update_expense(2, amount=1.0, category="Rent"),
+        lambda: service.delete_expense(1),
+        lambda: service.apply_discount_to_category("coffee", 50),
+    ]
+    for write in writes:
+        with pytest.raises(OSError):
+            write()
+        assert state(service) == expected
+    assert service.total_amount() == total and service.verify_aggregates() == []
+    assert [e.id for e in service.search_expenses("lost")] == []
+    monkeypatch.undo()
+    service.close()
+    assert state(ExpenseService.open(str(tmp_path))) == expected
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        WriteAheadLog(str(tmp_path), fsync="sometimes")
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from app.database.db import create_async_db_engine, create_db_engine, init_async_db, init_db
+from app.models.expense import Expense
+from app.services.async_expense_service import AsyncExpenseService
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.expense_service import ExpenseService
+from app.services.expense_store import ExpenseStore
+from app.services.query import ExpenseQuery
+from app.services.sql_expense_service import SqlExpenseService
+
+def make_expenses():
+    return [
+        Expense(id=None, user_id=i % 5, amount=float(i % 40 + 1), category=["Food", "Travel", "Rent", "Misc"][i % 4],
+                description=f"row {i} {'taxi' if i % 6 == 0 else 'shop'}",
+                date=datetime(2024, 1, 1) + timedelta(hours=i * 5))
+        for i in range(400)
+    ]
+
+def make_memory():
+    return ExpenseService(store=ExpenseStore())
+
+def make_columnar():
+    return ExpenseService(store=ColumnarExpenseStore())
+
+def make_sql():
+    engine = create_db_engine("sqlite://")
+    init_db(engine)
+    return SqlExpenseService.from_engine(engine)
+
+@pytest.fixture(params=[make_memory, make_columnar, make_sql])
+def service(request):
+    svc = request.param()
+    svc.add_expenses(make_expenses())
+    return svc
+
+QUERIES = [
+    {},
+    {"category": "food"},
+    {"min_amount": 10, "max_amount": 12},
+    {"user_id": 3, "min_amount": 30},
+    {"start_date": date(2024, 1, 20), "end_date": date(2024, 1, 31), "category": "Rent"},
+    {"user_id": 0, "category": "Travel", "start_date": date(2024, 2, 1)},
+    {"keyword": "taxi", "max_amount": 20},
+    {"keyword": "taxi", "user_id": 2, "end_date": date(2024, 2, 15)},
+    {"min_amount": 1000},
+]
+
+def brute_force(expenses, category=None, min_amount=None, max_amount=None, start_date=None,
+                end_date=None, user_id=None, keyword=None):
+    def ok(e):
+        return ((category is None or e.category.lower() == category.lower()) and
+                (min_amount is None or e.amount >= min_amount) and
+                (max_amount is None or e.amount <= max_amount) and
+                (start_date is None or e.date.date() >= start_date) and
+                (end_date is None or e.date.date() <= end_date) and
+                (user_id is None or e.user_id == user_id) and
+                (keyword is None or keyword in e.description))
+    return [e.id for e in sorted(expenses, key=lambda e: (e.date, e.id)) if ok(e)]
+
+def walk(service, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        page = service.get_page(limit=limit, cursor=cursor, **filters)
+        ids.extend(e.id for e in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids
+
+@pytest.mark.parametrize("filters", QUERIES)
+def test_query_matches_brute_force(service, filters):
+    expected = brute_force(service.get_all_expenses(), **filters)
+    assert walk(service, 7, **filters) == expected
+    assert [e.id for e in service.iter_query(ExpenseQuery.build(**filters), chunk_size=11)] == expected
+
+def test_plan_picks_most_selective_index():
+    service = make_memory()
+    service.add_expenses(make_expenses())
+    engine = service.query_engine
+    assert engine.plan(ExpenseQuery())[0] == "scan"
+    assert engine.plan(ExpenseQuery(keyword="taxi", category="Food"))[0] == "keyword"
+    narrow = ExpenseQuery.build(category="Food", user_id=1,
+                                start_date=date(2024, 1, 2), end_date=date(2024, 1, 2))
+    assert engine.plan(narrow) == ("date", None)
+    assert engine.plan(ExpenseQuery(category="Food", user_id=1)) == ("user", None)
+    assert engine.plan(ExpenseQuery(category="Food", user_id=99))[0] == "user"
+
+@pytest.mark.parametrize("make", [make_memory, make_columnar])
+def test_filtered_pages_walk_key_indexes(make):
+    service = make()
+    service.add_expenses(make_expenses())
+    service.update_expense(4, category="Travel", user_id=3)
+    service.update_expense(9, date=datetime(2023, 12, 31))
+    service.delete_expense(13)
+    fetched = []
+    get_many = service.store.get_many
+    service.store.get_many = lambda ids: fetched.append(len(ids)) or get_many(ids)
+    for filters in ({"category": "travel"}, {"user_id": 3}, {"user_id": 4, "start_date": date(2024, 2, 1)}):
+        fetched.clear()
+        assert len(service.get_page(limit=5, **filters).items) == 5
+        # Only the page and its lookahead row are read, not every candidate.
+        assert sum(fetched) == 6
+        assert walk(service, 7, **filters) == brute_force(service.get_all_expenses(), **filters)
+    assert walk(service, 50, category="food") == brute_force(service.get_all_expenses(), category="food")
+
+def test_store_counts_agree():
+    for store in (ExpenseStore(), ColumnarExpenseStore()):
+        store.add_many(make_expenses())
+        assert store.count_for_category("FOOD") == 100
+        assert store.count_for_user(4) == 80
+        assert store.count_between(datetime(2024, 1, 1), datetime(2024, 1, 1, 23)) == 5
+        assert store.count_between(None, None) == 400
+
+def test_export_uses_query(service, tmp_path):
+    path = tmp_path / "out.json"
+    query = ExpenseQuery.build(category="Travel", min_amount=35)
+    service.export_to_json(str(path), query=query)
+    rows = json.loads(path.read_text())
+    assert [row["id"] for row in rows] == brute_force(service.get_all_expenses(), category="Travel", min_amount=35)
+
+def test_async_query():
+    async def scenario():
+        engine = create_async_db_engine("sqlite://")
+        await init_async_db(engine)
+        service = AsyncExpenseService.from_engine(engine)
+        await service.add_expenses(make_expenses())
+        page = await service.get_page(limit=1000, user_id=1, max_amount=5)
+        await engine.dispose()
+        return [e.id for e in page.items]
+
+    expenses = make_expenses()
+    for expense_id, expense in enumerate(expenses, start=1):
+        expense.id = expense_id
+    assert asyncio.run(scenario()) == brute_force(expenses, user_id=1, max_amount=5)
@@ -0,0 +1,105 @@
+import pytest
+from datetime import date, datetime, timedelta
+from app.models.expense import Expense
+from app.services.columnar_store import ColumnarExpenseStore
+from app.services.duplicates import DuplicateExpenseError
+from app.services.expense_service import ExpenseService
+from app.services.sharding import ShardedExpenseService
+
+def make_expenses(count=40):
+    return [
+        Expense(id=None, user_id=i % 7, amount=float(i % 13 + 1), category=["Food", "Travel", "Rent"][i % 3],
+                description=f"item {i}", date=datetime(2024, 5, 1) + timedelta(hours=17 * i))
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def pair():
+    single, sharded = ExpenseService(), ShardedExpenseService(shards=3)
+    single.add_expenses(make_expenses())
+    sharded.add_expenses(make_expenses())
+    return single, sharded
+
+def ids(expenses):
+    return [e.id for e in expenses]
+
+def test_reads_match_a_single_service(pair):
+    single, sharded = pair
+    assert ids(sharded.get_all_expenses()) == ids(single.get_all_expenses())
+    assert ids(sharded.get_expenses_by_user(3)) == ids(single.get_expenses_by_user(3))
+    assert ids(sharded.filter_expenses_by_category("food")) == ids(single.filter_expenses_by_category("food"))
+    window = (date(2024, 5, 3), date(2024, 5, 12))
+    assert ids(sharded.get_expenses_by_date_range(*window)) == ids(single.get_expenses_by_date_range(*window))
+    assert ids(sharded.get_recent_expenses(4)) == ids(single.get_recent_expenses(4))
+    assert ids(sharded.search_expenses("item", limit=5)) == ids(single.search_expenses("item", limit=5))
+
+def test_aggregates_match_a_single_service(pair):
+    single, sharded = pair
+    assert sharded.total_amount() == pytest.approx(single.total_amount())
+    assert sharded.average_amount() == pytest.approx(single.average_amount())
+    assert sharded.total_amount_by_category() == pytest.approx(single.total_amount_by_category())
+    assert sharded.get_top_expense_categories(2) == single.get_top_expense_categories(2)
+    assert sharded.get_monthly_summary(2024, 5) == single.get_monthly_summary(2024, 5)
+    assert sharded.get_monthly_summary(2024, 5, user_id=2) == single.get_monthly_summary(2024, 5, user_id=2)
+    assert sharded.get_weekly_summary(date(2024, 5, 8)) == single.get_weekly_summary(date(2024, 5, 8))
+    assert sharded.get_peak_expense_day() == single.get_peak_expense_day()
+    assert sharded.get_daily_average() == pytest.approx(single.get_daily_average())
+    assert sharded.verify_aggregates() == []
+
+def test_pages_walk_every_shard_in_order(pair):
+    single, sharded = pair
+    walked, cursor = [], None
+    while True:
+        page = sharded.get_page(limit=7, cursor=cursor, category="travel")
+        walked.extend(ids(page.items))
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert walked == ids(single.get_page(limit=100, category="travel").items)
+
+def test_writes_route_by_id_and_move_between_shards(pair):
+    _, sharded = pair
+    expense = sharded.get_expense_by_id(5)
+    old_shard, new_user = sharded.shard_for(expense.user_id), expense.user_id
+    while sharded.shard_for(new_user) == old_shard:
+        new_user += 1
+    assert sharded.update_expense(5, user_id=new_user, amount=99.0)
+    assert sharded.get_expense_by_id(5).amount == 99.0
+    assert 5 in ids(sharded.get_expenses_by_user(new_user))
+    assert sharded.delete_expense(6) and not sharded.delete_expense(6)
+    sharded.add_expense(Expense(id=None, user_id=1, amount=3.0, category="Food", description="late"))
+    assert sharded.get_all_expenses()[-1].id == 41
+    assert sharded.categorize_all({"rent": "Housing"}) == 12
+    assert sharded.verify_aggregates() == []
+    with pytest.raises(ValueError):
+        sharded.add_expense(Expense(id=41, user_id=2, amount=1.0, category="Food", description="clash"))
+
+def test_rejected_move_keeps_the_expense_on_its_shard():
+    sharded = ShardedExpenseService(shards=2, duplicate_policy="reject")
+    users = [0, next(u for u in range(1, 10) if sharded.shard_for(u) != sharded.shard_for(0))]
+    sharded.add_expenses([Expense(id=None, user_id=user, amount=5.0, category="Food", description="same",
+                                  date=datetime(2024, 5, 1)) for user in users])
+    with pytest.raises(DuplicateExpenseError):
+        sharded.update_expense(1, user_id=users[1])
+    assert sharded.get_expense_by_id(1).user_id == users[0]
+    assert ids(sharded.get_expenses_by_user(users[0])) == [1]
+    assert sharded.expense_count() == 2 and sharded.total_amount() == 10.0
+    assert sharded.verify_aggregates() == []
+
+def test_worker_processes():
+    single = ExpenseService()
+    single.add_expenses(make_expenses())
+    with ShardedExpenseService(shards=2, store_factory=ColumnarExpenseStore, processes=True) as sharded:
+        sharded.add_expenses(make_expenses())
+        assert sharded.update_expense(3, amount=50.0)
+        single.update_expense(3, amount=50.0)
+        assert ids(sharded.get_all_expenses()) == ids(single.get_all_expenses())
+        assert sharded.total_amount_by_category() == pytest.approx(single.total_amount_by_category())
+        assert sharded.get_monthly_summary(2024, 5) == single.get_monthly_summary(2024, 5)
+
+def test_worker_processes_raise_duplicate_errors():
+    with ShardedExpenseService(shards=2, processes=True, duplicate_policy="reject") as sharded:
+        sharded.add_expenses(make_expenses(4))
+        with pytest.raises(DuplicateExpenseError) as error:
+            sharded.add_expense(make_expenses(2)[1])
+        assert error.value.original_id == 2 and error.value.expense.description == "item 1"
@@ -0,0 +1,105 @@
+import pytest
+from datetime import date, datetime
+from sqlalchemy.pool import StaticPool
+from app.database.db import create_db_engine, init_db, drop_db
+from app.models.expense import Expense
+from app.services.sql_expense_service import SqlExpenseService
+
+@pytest.fixture
+def engine():
+    engine = create_db_engine("sqlite://")
+    init_db(engine)
+    yield engine
+    drop_db(engine)
+    engine.dispose()
+
+@pytest.fixture
+def service(engine):
+    svc = SqlExpenseService.from_engine(engine)
+    svc.add_expense(Expense(id=None, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1, 12)))
+    svc.add_expense(Expense(id=None, user_id=1, amount=50.0, category="Travel", description="Taxi ride", date=datetime(2024, 5, 2, 9)))
+    svc.add_expense(Expense(id=None, user_id=2, amount=30.0, category="food", description="Dinner", date=datetime(2024, 5, 2, 20)))
+    return svc
+
+def test_engine_uses_static_pool_for_memory_sqlite(engine):
+    assert isinstance(engine.pool, StaticPool)
+    assert engine.echo is False
+
+def test_engine_pool_settings_for_server_databases():
+    engine = create_db_engine("mysql+mysqlconnector://u:p@localhost/db")
+    assert engine.pool.size() == 10
+    assert engine.pool._max_overflow == 20
+    assert engine.pool._pre_ping is True
+    assert engine.pool._recycle == 1800
+
+def test_crud_round_trip(service):
+    expense = service.get_expense_by_id(2)
+    assert expense.description == "Taxi ride" and expense.date == datetime(2024, 5, 2, 9)
+    assert service.update_expense(2, amount=55.0, category="Transport")
+    assert service.get_expense_by_id(2).amount == 55.0
+    assert [e.id for e in service.filter_expenses_by_category("transport")] == [2]
+    assert service.delete_expense(2)
+    assert not service.delete_expense(2)
+    assert service.get_expense_by_id(2) is None
+
+def test_aggregates_pushed_down(service):
+    assert service.total_amount() == 100.0
+    assert service.total_amount_by_category() == {"Food": 20.0, "Travel": 50.0, "food": 30.0}
+    assert service.get_top_expense_categories(1) == [{"category": "Travel", "total_amount": 50.0}]
+    assert service.get_peak_expense_day() == {"date": date(2024, 5, 2), "total_amount": 80.0}
+    assert service.get_daily_average()["average"] == 50.0
+
+def test_rollup_reports_pushed_down(service):
+    assert service.get_monthly_summary(2024, 5) == {
+        "year": 2024, "month": 5, "total": 100.0, "count": 3, "min": 20.0, "max": 50.0,
+        "by_category": {"Food": 20.0, "Travel": 50.0, "food": 30.0},
+    }
+    assert service.get_weekly_summary(date(2024, 5, 1), user_id=2)["total"] == 30.0
+    assert service.get_peak_expense_day(user_id=1) == {"date": date(2024, 5, 2), "total_amount": 50.0}
+    assert service.get_daily_average(date(2024, 5, 2), date(2024, 5, 5))["average"] == 20.0
+
+def test_date_queries(service):
+    assert [e.id for e in service.get_expenses_by_date_range(date(2024, 5, 2), date(2024, 5, 2))] == [2, 3]
+    assert [e.id for e in service.get_recent_expenses(2)] == [3, 2]
+
+def test_bulk_insert_and_set_based_updates(service):
+    service.add_expenses([
+        Expense(id=None, user_id=3, amount=float(i + 1), category="Bulk", description=f"row {i}", date=datetime(2024, 6, 1))
+        for i in range(100)
+    ])
+    assert len(service.store) == 103
+    service.apply_discount_to_category("bulk", 50)
+    assert service.total_amount_by_category()["Bulk"] == pytest.approx(5050 / 2)
+    service.categorize_all({"food": "Meals"})
+    assert sorted(e.id for e in service.filter_expenses_by_category("meals")) == [1, 3]
+    with pytest.raises(ValueError):
+        service.add_expenses([Expense(id=1, user_id=1, amount=1.0, category="Dup", description="dup")])
+    assert len(service.store) == 103
+
+def test_search_and_import(service, tmp_path):
+    assert [e.id for e in service.search_expenses("taxi")] == [2]
+    path = tmp_path / "rows.csv"
+    path.write_text("user_id,amount,category,description,date\n9,4.0,Books,Atlas,2024-05-09T00:00:00\n9,-1,Books,Bad,2024-05-09\n")
+    report = service.import_file(str(path))
+    assert report.imported == 1 and [error.row for error in report.errors] == [2]
+    assert [e.description for e in service.search_expenses("atlas")] == ["Atlas"]
+
+def test_import_checks_ids_and_duplicates_in_bulk(engine):
+    from sqlalchemy import event
+    service = SqlExpenseService.from_engine(engine, duplicate_policy="reject", duplicate_window=60)
+    service.add_expense(Expense(id=None, user_id=1, amount=20.0, category="Food", description="Lunch", date=datetime(2024, 5, 1, 12)))
+    selects = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: selects.append(statement) if statement.startswith("SELECT") else None)
+    records = [{"id": 1 if i == 1 else 100 + i, "user_id": 1, "amount": 20.0 if i == 0 else i + 0.5,
+                "category": "food", "description": "lunch", "date": f"{2024 + i // 365}-05-01T12:00:30"}
+               for i in range(1200)]
+    report = service.import_records(records, batch_size=1200)
+    assert report.imported == 1198
+    assert [(error.row, error.message) for error in report.errors] == [
+        (1, "Duplicate of expense 1"), (2, "Expense with id 1 already exists"),
+    ]
+    # 1200 rows: three IN (...) chunks for the ids, and three for the duplicate candidates on each of
+    # the two policy checks (row errors first, then add_expenses), instead of a query per row.
+    assert 1 <= len([s for s in selects if "expenses.id IN" in s]) <= 3
+    assert 1 <= len([s for s in selects if "expenses.category_key IN" in s]) <= 6
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import pytest
+
+# Cumulative import time allowed, in microseconds. The service module took ~550ms while the
+# package imported SQLAlchemy, built the engine and read settings eagerly; `api` took ~830ms
+# while it also loaded the async router's SQLAlchemy stack (FastAPI alone is ~250ms of it).
+IMPORT_BUDGET_US = {"app.services.expense_service": 250_000, "api": 650_000}
+
+def run(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+def test_importing_the_service_is_cheap_and_side_effect_free():
+    loaded = run(
+        "import locale, sys\n"
+        "before = locale.setlocale(locale.LC_ALL)\n"
+        "import app, app.services.expense_service, app.utils.helpers\n"
+        "heavy = ('sqlalchemy', 'numpy', 'pydantic', 'config.settings')\n"
+        "print(sorted(name for name in heavy if name in sys.modules), locale.setlocale(locale.LC_ALL) == before)\n"
+    )
+    assert loaded.split() == ["[]", "True"]
+
+def test_database_module_defers_engine_and_settings():
+    state = run(
+        "import app.database.db as db\n"
+        "from config.settings import get_settings\n"
+        "print(db._engine, db._async_engine, get_settings.cache_info().currsize)\n"
+    )
+    assert state.split() == ["None", "None", "0"]
+
+def test_route_module_builds_the_service_on_first_use(tmp_path):
+    state = run(
+        "import os\n"
+        f"os.environ['WAL_DIR'] = {str(tmp_path / 'wal')!r}\n"
+        "import threading\n"
+        "from api.routes import expense_routes\n"
+        "print(expense_routes._service, os.path.exists(os.environ['WAL_DIR']))\n"
+        "service = expense_routes.get_service()\n"
+        "print(service is expense_routes.get_service(), service.journal is not None)\n"
+        "expense_routes.close_service()\n"
+        "print(expense_routes._service, any(t.name == 'expense-wal' for t in threading.enumerate()))\n"
+    )
+    assert state.split() == ["None", "False", "True", "True", "None", "False"]
+
+def test_app_reads_settings_when_built_and_defers_sqlalchemy():
+    state = run(
+        "import sys\n"
+        "import api\n"
+        "from config.settings import get_settings\n"
+        "print(get_settings.cache_info().currsize, 'sqlalchemy' in sys.modules)\n"
+        "app = api.app\n"
+        "print(app is api.app, get_settings.cache_info().currsize, 'sqlalchemy' in sys.modules)\n"
+    )
+    assert state.split() == ["0", "False", "True", "1", "False"]
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_US))
+def test_import_time_budget(module):
+    timings = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, check=True).stderr
+    cumulative = int(timings.strip().splitlines()[-1].split("|")[1])
+    assert cumulative < IMPORT_BUDGET_US[module], timings